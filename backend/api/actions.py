@@ -0,0 +1,240 @@
+import logging
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import clustering, coalescing, dashboard, heatmap, notifications, sharding, sync, tracks
+from .models import Incident, IncidentEvent, IncidentTrailPoint, TouristProfile
+
+
+# Set-based bulk operations shared by the admin and the API. Each runs a
+# fixed number of queries regardless of how many rows are selected.
+
+logger = logging.getLogger(__name__)
+
+# Keeps each id__in list well under SQLite's bound-parameter limit
+ID_BATCH_SIZE = 500
+
+
+class Conflict(Exception):
+    """A conditional update matched fewer rows than were selected."""
+
+
+def verify_authorities(queryset):
+    """Mark authority profiles verified and activate their user accounts."""
+    with transaction.atomic():
+        user_ids = queryset.exclude(user__isnull=True).values('user_id')
+        User.objects.filter(id__in=user_ids).update(is_active=True)
+        return queryset.update(is_verified=True)
+
+
+def deactivate_departed_tourists(queryset, today=None):
+    """Deactivate the user accounts of tourists whose trip has ended."""
+    today = today or timezone.localdate()
+    with sharding.atomic():
+        user_ids = queryset.filter(departure_date__lt=today).exclude(user__isnull=True).values('user_id')
+        return User.objects.filter(id__in=user_ids, is_active=True).update(is_active=False)
+
+
+# ---------------------------
+# Incident lifecycle
+# ---------------------------
+def _transition(queryset, kind, changes, authority=None):
+    """Apply ``changes`` to every incident in ``queryset`` as conditional UPDATEs.
+
+    ``queryset`` carries the precondition (state and, for single-row
+    transitions, the expected version). Rows are locked, updated with a
+    version bump and logged to the delta feed in one transaction.
+    Returns [(id, lat, lng, created_at, new_version)] for changed rows.
+    """
+    with sharding.atomic():
+        rows = list(
+            queryset.select_for_update()
+            .order_by('id')
+            .values_list('id', 'lat', 'lng', 'created_at', 'version')
+        )
+        for start in range(0, len(rows), ID_BATCH_SIZE):
+            ids = [row[0] for row in rows[start:start + ID_BATCH_SIZE]]
+            updated = queryset.filter(id__in=ids).update(version=F('version') + 1, **changes)
+            if updated != len(ids):
+                raise Conflict(f"{len(ids) - updated} incidents changed concurrently")
+
+        changed = [(pk, lat, lng, created_at, version + 1) for pk, lat, lng, created_at, version in rows]
+        IncidentEvent.objects.bulk_create(
+            [IncidentEvent(incident_id=row[0], kind=kind, authority=authority, version=row[4]) for row in changed],
+            batch_size=ID_BATCH_SIZE,
+        )
+        sync.incidents_changed(row[0] for row in changed)
+    if changed:
+        dashboard.invalidate()
+    return changed
+
+
+def acknowledge_incidents(queryset, authority=None):
+    """Acknowledge open incidents that nobody has acknowledged yet."""
+    return _transition(
+        queryset.filter(resolved=False, acknowledged_at__isnull=True),
+        'acknowledged',
+        {'acknowledged_at': timezone.now()},
+        authority,
+    )
+
+
+def assign_incidents(queryset, assignee, authority=None):
+    """Assign open incidents to ``assignee`` (acknowledging them if needed)."""
+    return _transition(
+        queryset.filter(resolved=False),
+        'assigned',
+        {'assigned_to': assignee, 'acknowledged_at': Coalesce(F('acknowledged_at'), timezone.now())},
+        authority,
+    )
+
+
+def resolve_incidents(queryset, authority=None):
+    """Resolve open incidents and adjust the rollups in aggregate."""
+    with sharding.atomic():
+        changed = _transition(
+            queryset.filter(resolved=False),
+            'resolved',
+            {'resolved': True, 'resolved_at': timezone.now()},
+            authority,
+        )
+        heatmap.mark_resolved((lat, lng, created_at) for _, lat, lng, created_at, _ in changed)
+        dashboard.adjust("open_alerts", -len(changed))
+    if changed:
+        clustering.invalidate("incidents")
+    return changed
+
+
+def stored_key(record):
+    """A queued SOS record's idempotency key as stored: prefixed with its
+    profile id, since clients only keep their own keys unique."""
+    return f"{record['profile_id']}:{record['key']}"
+
+
+def create_sos_incidents(records):
+    """Store queued SOS records, coalescing repeats into open incidents.
+
+    An alert from a profile whose last SOS was within SOS_COALESCE_SECONDS
+    and SOS_COALESCE_METERS bumps that incident's hit count instead of
+    opening a new one; every alert is kept as a trail point. Records whose
+    idempotency key is already stored for their tourist, or whose profile
+    no longer exists, are logged and skipped. Returns the newly created
+    incidents.
+    """
+    keys = {stored_key(record) for record in records}
+    profile_ids = {record["profile_id"] for record in records}
+    existing = set()
+    key_list = list(keys)
+    for start in range(0, len(key_list), ID_BATCH_SIZE):
+        existing.update(
+            IncidentTrailPoint.objects.filter(idempotency_key__in=key_list[start:start + ID_BATCH_SIZE])
+            .values_list('idempotency_key', flat=True)
+        )
+    profiles = set(TouristProfile.objects.filter(id__in=profile_ids).values_list('id', flat=True))
+
+    recent = coalescing.recent_alerts
+    # Another drainer process may have handled these profiles' last alerts
+    earliest = min(datetime.fromisoformat(record["received_at"]) for record in records)
+    recent.refresh(profile_ids, earliest - recent.window)
+
+    new_incidents = []
+    merged = {}  # incident id -> (extra hits, last seen)
+    trail = []  # (Incident or incident id, record, recorded_at)
+    for record in records:
+        key = stored_key(record)
+        if record["profile_id"] not in profiles:
+            logger.warning("Dropping SOS record %s: tourist profile %s no longer exists",
+                           record["key"], record["profile_id"])
+            continue
+        if key in existing:
+            logger.info("Skipping SOS record %s of profile %s: already stored", record["key"], record["profile_id"])
+            continue
+        existing.add(key)
+        at = datetime.fromisoformat(record["received_at"])
+        lat, lng = record["lat"], record["lng"]
+
+        entry = recent.match(record["profile_id"], lat, lng, at)
+        if entry is None:
+            target = Incident(
+                profile_id=record["profile_id"],
+                title="SOS Alert",
+                description=record["description"],
+                lat=lat,
+                lng=lng,
+                resolved=False,
+                idempotency_key=key,
+                last_seen_at=at,
+            )
+            new_incidents.append(target)
+        else:
+            target = entry.target
+            if isinstance(target, Incident):
+                target.hit_count += 1
+                target.last_seen_at = at
+            else:
+                hits, _ = merged.get(target, (0, None))
+                merged[target] = (hits + 1, at)
+        recent.remember(record["profile_id"], target, lat, lng, at)
+        trail.append((target, record, at))
+
+    if not trail:
+        return []
+
+    try:
+        created = _store_sos_batch(new_incidents, merged, trail)
+    except Exception:
+        recent.reset()
+        raise
+    recent.resolve_targets()
+    recent.prune()
+    if created:
+        clustering.invalidate("incidents")
+    return created
+
+
+def _store_sos_batch(new_incidents, merged, trail):
+    with sharding.atomic():
+        created = Incident.objects.bulk_create(new_incidents, batch_size=ID_BATCH_SIZE)
+
+        for pk, (hits, last_seen) in merged.items():
+            Incident.objects.filter(id=pk).update(
+                hit_count=F('hit_count') + hits,
+                last_seen_at=last_seen,
+                version=F('version') + 1,
+            )
+        IncidentTrailPoint.objects.bulk_create(
+            [
+                IncidentTrailPoint(
+                    incident_id=target.pk if isinstance(target, Incident) else target,
+                    lat=record["lat"],
+                    lng=record["lng"],
+                    recorded_at=at,
+                    idempotency_key=stored_key(record),
+                )
+                for target, record, at in trail
+            ],
+            batch_size=ID_BATCH_SIZE,
+        )
+        # SOS pings are location fixes too
+        tracks.record((record["profile_id"], at, record["lat"], record["lng"]) for _, record, at in trail)
+
+        events = [IncidentEvent(incident_id=incident.id, kind='created', version=0) for incident in created]
+        if merged:
+            versions = Incident.objects.filter(id__in=list(merged)).values_list('id', 'version')
+            events += [IncidentEvent(incident_id=pk, kind='updated', version=version) for pk, version in versions]
+        IncidentEvent.objects.bulk_create(events, batch_size=ID_BATCH_SIZE)
+        sync.changed('incident', [(incident.id, incident.profile_id) for incident in created])
+        sync.incidents_changed(merged)
+
+        heatmap.add_created((incident.lat, incident.lng, incident.created_at) for incident in created)
+        # Committed with the incidents, so a crash cannot lose the fan-out
+        notifications.queue_sos(created)
+        dashboard.adjust("incidents", len(created))
+        dashboard.adjust("open_alerts", len(created))
+        dashboard.invalidate()
+    return created
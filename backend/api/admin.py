@@ -1,31 +1,87 @@
 from django.contrib import admin
-from .models import TouristProfile, EmergencyContact, Place, Incident, AuthorityProfile
+from .models import TouristProfile, EmergencyContact, Place, Incident, AuthorityProfile, TouristCredential
+from . import actions, search, tourist_ids
+from .changelists import LargeTableAdmin, NationalityFilter
+
+
+TOURIST_SEARCH_LIMIT = 500
 
 
 @admin.register(TouristProfile)
-class TouristProfileAdmin(admin.ModelAdmin):
+class TouristProfileAdmin(LargeTableAdmin):
     list_display = ['name', 'email', 'nationality', 'current_location', 'created_at']
     search_fields = ['name', 'email', 'nationality']
-    list_filter = ['nationality', 'created_at']
+    list_filter = [NationalityFilter, 'created_at']
+    date_hierarchy = 'created_at'
+    raw_id_fields = ['user']
+    actions = ['deactivate_departed_tourists']
+
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index instead of icontains table scans
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        ids = [pk for pk, _ in search.search_tourists(search_term, limit=TOURIST_SEARCH_LIMIT)]
+        return queryset.filter(id__in=ids), False
+
+    def deactivate_departed_tourists(self, request, queryset):
+        count = actions.deactivate_departed_tourists(queryset)
+        self.message_user(request, f"{count} tourist accounts past their departure date deactivated.")
+    deactivate_departed_tourists.short_description = "Deactivate tourists past departure date"
 
 
 @admin.register(AuthorityProfile)
-class AuthorityProfileAdmin(admin.ModelAdmin):
+class AuthorityProfileAdmin(LargeTableAdmin):
     list_display = ['full_name', 'official_email', 'agency_type', 'agency_name', 'is_verified', 'created_at']
     search_fields = ['full_name', 'official_email', 'agency_name', 'authority_id']
     list_filter = ['agency_type', 'is_verified', 'created_at']
+    date_hierarchy = 'created_at'
+    raw_id_fields = ['user']
     actions = ['verify_authorities']
 
     def verify_authorities(self, request, queryset):
-        queryset.update(is_verified=True)
-        for profile in queryset:
-            if profile.user:
-                profile.user.is_active = True
-                profile.user.save()
-        self.message_user(request, f"{queryset.count()} authority profiles verified.")
+        count = actions.verify_authorities(queryset)
+        self.message_user(request, f"{count} authority profiles verified.")
     verify_authorities.short_description = "Verify selected authorities"
 
 
-admin.site.register(EmergencyContact)
-admin.site.register(Place)
-admin.site.register(Incident)
\ No newline at end of file
+@admin.register(Incident)
+class IncidentAdmin(LargeTableAdmin):
+    list_display = ['title', 'profile', 'created_at', 'resolved', 'assigned_to']
+    list_select_related = ['profile', 'assigned_to']
+    list_filter = ['resolved']
+    date_hierarchy = 'created_at'
+    autocomplete_fields = ['profile', 'assigned_to']
+    actions = ['resolve_incidents']
+
+    def resolve_incidents(self, request, queryset):
+        count = len(actions.resolve_incidents(queryset))
+        self.message_user(request, f"{count} incidents resolved.")
+    resolve_incidents.short_description = "Resolve selected incidents"
+
+
+@admin.register(TouristCredential)
+class TouristCredentialAdmin(LargeTableAdmin):
+    list_display = ['id', 'profile', 'key_id', 'issued_at', 'expires_at', 'revoked_at']
+    list_select_related = ['profile']
+    list_filter = ['revoked_at', 'expires_at']
+    autocomplete_fields = ['profile']
+    readonly_fields = ['token']
+    actions = ['revoke_credentials']
+
+    def revoke_credentials(self, request, queryset):
+        count = tourist_ids.revoke(queryset)
+        self.message_user(request, f"{count} Tourist IDs revoked.")
+    revoke_credentials.short_description = "Revoke selected Tourist IDs"
+
+
+@admin.register(EmergencyContact)
+class EmergencyContactAdmin(LargeTableAdmin):
+    list_display = ['name', 'relation', 'phone', 'profile']
+    list_select_related = ['profile']
+    autocomplete_fields = ['profile']
+
+
+@admin.register(Place)
+class PlaceAdmin(LargeTableAdmin):
+    list_display = ['name', 'place_type', 'address']
+    list_filter = ['place_type']
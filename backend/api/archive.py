@@ -0,0 +1,225 @@
+import gzip
+import heapq
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import sharding
+from .models import Incident, IncidentArchiveSegment, IncidentEvent, IncidentTrailPoint
+
+
+# Cold storage for resolved incidents. `manage.py archive_incidents` moves
+# resolved incidents created more than INCIDENT_ARCHIVE_AFTER_DAYS ago out
+# of the Incident table, a batch at a time, into gzipped NDJSON segment
+# files partitioned by creation month. An IncidentArchiveSegment row per
+# file, in the same shard, records its id and creation time range, so the
+# hot table stays small and readers open only the files a date range
+# reaches.
+#
+# An archived incident keeps its fields, a snapshot of its tourist and its
+# trail. Its events (the alert change feed) are dropped. It is removed
+# without model signals, so the heatmap and dashboard rollups still count
+# it; their rebuild() reads the archive too.
+
+DATETIME_FIELDS = ('created_at', 'acknowledged_at', 'resolved_at', 'last_seen_at')
+FIELDS = (
+    'id', 'profile_id', 'title', 'description', 'lat', 'lng', 'evidence', 'resolved', 'assigned_to_id',
+    'version', 'idempotency_key', 'hit_count',
+) + DATETIME_FIELDS
+PROFILE_FIELDS = ('name', 'email', 'phone', 'nationality')
+# Keeps id__in lists well under SQLite's bound-parameter limit
+ID_BATCH_SIZE = 500
+
+
+def _root():
+    return Path(settings.INCIDENT_ARCHIVE_DIR)
+
+
+# ---------------------------
+# Archiving
+# ---------------------------
+def archive(days=None, batch_size=None):
+    """Move resolved incidents of the current shard created more than
+    ``days`` (default INCIDENT_ARCHIVE_AFTER_DAYS) ago into the archive;
+    returns how many were moved."""
+    days = settings.INCIDENT_ARCHIVE_AFTER_DAYS if days is None else days
+    before = timezone.now() - timedelta(days=days)
+    batch_size = batch_size or settings.INCIDENT_ARCHIVE_BATCH_SIZE
+    candidates = Incident.objects.filter(resolved=True, created_at__lt=before).order_by('id')
+    moved = 0
+    after = 0
+    while True:
+        ids = list(candidates.filter(id__gt=after).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return moved
+        moved += _archive_batch(ids, before)
+        after = ids[-1]
+
+
+def _archive_batch(ids, before):
+    database = sharding.current_database()
+    with sharding.atomic():
+        # Locked (where the database can) so no transition slips in between
+        # writing the files and deleting the rows
+        incidents = list(
+            Incident.objects.select_for_update(of=('self',))
+            .filter(id__in=ids, resolved=True, created_at__lt=before)
+            .select_related('profile')
+            .order_by('id')
+        )
+        if not incidents:
+            return 0
+        ids = [incident.id for incident in incidents]
+        trails = defaultdict(list)
+        for start in range(0, len(ids), ID_BATCH_SIZE):
+            points = (
+                IncidentTrailPoint.objects.filter(incident_id__in=ids[start:start + ID_BATCH_SIZE])
+                .order_by('recorded_at', 'id')
+                .values_list('incident_id', 'lat', 'lng', 'recorded_at')
+            )
+            for incident_id, lat, lng, recorded_at in points:
+                trails[incident_id].append((lat, lng, recorded_at))
+
+        months = defaultdict(list)
+        for incident in incidents:
+            months[timezone.localtime(incident.created_at).date().replace(day=1)].append(incident)
+        for month, group in months.items():
+            path = Path(database) / f"{month:%Y-%m}" / f"{group[0].id}-{group[-1].id}.ndjson.gz"
+            _write(path, (_record(incident, trails[incident.id]) for incident in group))
+            IncidentArchiveSegment.objects.create(
+                month=month,
+                path=str(path),
+                first_id=group[0].id,
+                last_id=group[-1].id,
+                first_created_at=min(incident.created_at for incident in group),
+                last_created_at=max(incident.created_at for incident in group),
+                rows=len(group),
+            )
+
+        for start in range(0, len(ids), ID_BATCH_SIZE):
+            batch = ids[start:start + ID_BATCH_SIZE]
+            IncidentTrailPoint.objects.filter(incident_id__in=batch).delete()
+            IncidentEvent.objects.filter(incident_id__in=batch).delete()
+            # Plain DELETE: model signals would take the incidents out of
+            # the rollups, which keep counting archived ones
+            with connections[database].cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {Incident._meta.db_table} WHERE id IN ({', '.join(['%s'] * len(batch))})",
+                    batch,
+                )
+    return len(incidents)
+
+
+def _isoformat(value):
+    # DjangoJSONEncoder would cut datetimes to milliseconds
+    return value.isoformat() if value else None
+
+
+def _record(incident, trail):
+    record = {field: getattr(incident, field) for field in FIELDS}
+    for field in DATETIME_FIELDS:
+        record[field] = _isoformat(record[field])
+    record['profile'] = {field: getattr(incident.profile, field) for field in PROFILE_FIELDS}
+    record['trail'] = [(lat, lng, _isoformat(recorded_at)) for lat, lng, recorded_at in trail]
+    return record
+
+
+def _write(path, records):
+    """Write ``records`` to a segment file, durably, replacing any leftover
+    from a batch whose transaction did not commit."""
+    path = _root() / path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    with open(tmp, "wb") as f:
+        with gzip.GzipFile(fileobj=f, mode="wb", mtime=0) as out:
+            for record in records:
+                out.write((encoder.encode(record) + "\n").encode())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ---------------------------
+# Reading
+# ---------------------------
+def _decode(line):
+    record = json.loads(line)
+    for field in DATETIME_FIELDS:
+        if record[field]:
+            record[field] = parse_datetime(record[field])
+    record['trail'] = [(lat, lng, parse_datetime(at)) for lat, lng, at in record['trail']]
+    return record
+
+
+def _read(segment):
+    with gzip.open(_root() / segment.path, "rt") as f:
+        for line in f:
+            yield _decode(line)
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def segments(date_from=None, date_to=None, database=None, after=None):
+    """Segments of a shard (default: the current one) holding incidents
+    created between the dates (inclusive, local time), and with ids above
+    ``after``."""
+    queryset = IncidentArchiveSegment.objects.using(database or sharding.current_database())
+    if after:
+        queryset = queryset.filter(last_id__gt=after)
+    if date_from:
+        queryset = queryset.filter(last_created_at__gte=_day_start(date_from))
+    if date_to:
+        queryset = queryset.filter(first_created_at__lt=_day_start(date_to + timedelta(days=1)))
+    return list(queryset.order_by('first_id'))
+
+
+def records(date_from=None, date_to=None, database=None, after=None):
+    """Archived incidents created between the dates, with ids above
+    ``after``, as dicts in id order.
+
+    Only the segments overlapping the range are read; none when it lies
+    after everything archived.
+    """
+    merged = heapq.merge(*(_read(segment) for segment in segments(date_from, date_to, database, after)),
+                         key=lambda record: record['id'])
+    for record in merged:
+        if after and record['id'] <= after:
+            continue
+        day = timezone.localdate(record['created_at'])
+        if (date_from is None or day >= date_from) and (date_to is None or day <= date_to):
+            yield record
+
+
+def find(pk, database=None):
+    """The archived incident with id ``pk``, or None."""
+    candidates = IncidentArchiveSegment.objects.using(database or sharding.current_database()).filter(
+        first_id__lte=pk, last_id__gte=pk
+    )
+    for segment in candidates:
+        for record in _read(segment):
+            if record['id'] == pk:
+                return record
+    return None
+
+
+def to_incident(record):
+    """An unsaved Incident with an archived record's fields, for serializers."""
+    return Incident(**{field: record[field] for field in FIELDS})
+
+
+def count(database=None):
+    """How many incidents a shard (default: the current one) has archived."""
+    queryset = IncidentArchiveSegment.objects.using(database or sharding.current_database())
+    return queryset.aggregate(total=Sum('rows'))['total'] or 0
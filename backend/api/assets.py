@@ -0,0 +1,142 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.template.loader import render_to_string
+from django.utils._os import safe_join
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip variants are written
+    brotli = None
+
+
+# Production path for the built frontend: `collectstatic` writes hashed
+# copies of every asset plus pre-compressed siblings, and serve_asset
+# streams them with sendfile (via FileResponse / wsgi.file_wrapper).
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+MIN_COMPRESS_SIZE = 1024
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _compressors():
+    if brotli is not None:
+        yield ".br", lambda data: brotli.compress(data, quality=11)
+    yield ".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Hashed static files with .br/.gz variants written next to each one."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not isinstance(processed, Exception):
+                names.update((name, hashed_name))
+            yield name, hashed_name, processed
+        if not dry_run:
+            for name in sorted(names):
+                self._compress(name)
+
+    def _compress(self, name):
+        content_type, _ = mimetypes.guess_type(name)
+        if not content_type or not content_type.startswith(COMPRESSIBLE_TYPES):
+            return
+        path = self.path(name)
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        for suffix, compress in _compressors():
+            compressed = compress(data)
+            # Not worth a Content-Encoding round trip for tiny savings
+            if len(compressed) < len(data) * 0.9:
+                with open(path + suffix, "wb") as f:
+                    f.write(compressed)
+
+
+@lru_cache(maxsize=1)
+def _hashed_names():
+    return frozenset(getattr(staticfiles_storage, "hashed_files", {}).values())
+
+
+def _accepted_encodings(request):
+    accepted = set()
+    for item in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        token, _, params = item.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(token.strip().lower())
+    return accepted
+
+
+def compress_body(request, body, brotli_quality=5, gzip_level=6):
+    """Compress a dynamic response body for the client; returns (body, encoding or None).
+
+    The default levels are much faster than the ones used for static
+    files, which are compressed once at build time.
+    """
+    if len(body) < MIN_COMPRESS_SIZE:
+        return body, None
+    accepted = _accepted_encodings(request)
+    if brotli is not None and "br" in accepted:
+        return brotli.compress(body, quality=brotli_quality), "br"
+    if "gzip" in accepted:
+        return gzip.compress(body, compresslevel=gzip_level, mtime=0), "gzip"
+    return body, None
+
+
+def serve_asset(request, path):
+    """Serve a collected static file, pre-compressed when the client allows it."""
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Invalid path")
+    if not os.path.isfile(full_path):
+        raise Http404("File not found")
+
+    content_type, _ = mimetypes.guess_type(full_path)
+    accepted = _accepted_encodings(request)
+    encoding = None
+    for name, suffix in ENCODINGS:
+        if name in accepted and os.path.isfile(full_path + suffix):
+            encoding = name
+            full_path += suffix
+            break
+
+    response = FileResponse(
+        open(full_path, "rb"),
+        content_type=content_type or "application/octet-stream",
+        filename=os.path.basename(path),
+    )
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["Vary"] = "Accept-Encoding"
+    response["Cache-Control"] = IMMUTABLE if path in _hashed_names() else REVALIDATE
+    return response
+
+
+@lru_cache(maxsize=1)
+def _index_page():
+    body = render_to_string("index.html").encode("utf-8")
+    return body, f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def index_response(request):
+    """The pre-rendered SPA shell, rendered once per process and revalidated by ETag."""
+    body, etag = _index_page()
+    if etag in request.META.get("HTTP_IF_NONE_MATCH", ""):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type="text/html; charset=utf-8")
+    response["ETag"] = etag
+    response["Cache-Control"] = REVALIDATE
+    return response
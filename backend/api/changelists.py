@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F, Max, Min, QuerySet
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import dashboard
+
+
+# Admin changelists for tables with hundreds of thousands of rows. An
+# unfiltered changelist of a large table shows the planner's row estimate
+# instead of running COUNT(*), and no changelist runs the second,
+# unfiltered COUNT(*) behind "N results (M total)". Filter choices come
+# from maintained rollups rather than DISTINCT scans, and the date
+# hierarchy walks the date column's index instead of truncating every row.
+
+
+def estimated_count(queryset):
+    """The database's row estimate for the table of ``queryset``, or None
+    when it has no statistics."""
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+            row = cursor.fetchone()
+            # -1 until the table is first vacuumed or analyzed
+            return row[0] if row and row[0] >= 0 else None
+        if connection.vendor == "sqlite":
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            # The first number of each row is the count ANALYZE saw
+            cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s", [table])
+            counts = [int(stat.split()[0]) for stat, in cursor.fetchall()]
+            return max(counts) if counts else None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Counts unfiltered querysets from table statistics once they are
+    past ADMIN_EXACT_COUNT_LIMIT; filtered ones are counted exactly."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset)
+            if estimate is not None and estimate > settings.ADMIN_EXACT_COUNT_LIMIT:
+                return estimate
+        return super().count
+
+
+def _period_start(value, kind):
+    if kind == "year":
+        value = value.replace(month=1, day=1)
+    elif kind == "month":
+        value = value.replace(day=1)
+    if isinstance(value, datetime):
+        value = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return value
+
+
+def _next_period(start, kind):
+    if kind == "year":
+        return start.replace(year=start.year + 1)
+    if kind == "month":
+        return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    return start + timedelta(days=1)
+
+
+class IndexedDatesQuerySet(QuerySet):
+    """dates() and datetimes() by year, month or day found with one
+    index seek per period (a loose index scan), rather than a DISTINCT
+    over every row; used for the admin date hierarchy. Min() and Max()
+    of a column are likewise read from either end of its index."""
+
+    def _first(self, field_name, after=None, descending=False):
+        """Smallest (or largest) non-null ``field_name`` at or after ``after``."""
+        bounds = {f"{field_name}__isnull": False}
+        if after is not None:
+            bounds[f"{field_name}__gte"] = after
+        # The new bound goes first: SQLite starts its index range at the
+        # first of several lower bounds on a column
+        queryset = self.model._base_manager.db_manager(self.db).filter(**bounds)
+        if self.query.distinct:
+            queryset = queryset.distinct()
+        queryset = (queryset & self).order_by(f"-{field_name}" if descending else field_name)
+        return queryset.values_list(field_name, flat=True).first()
+
+    def _periods(self, field_name, kind, order, tzinfo=None):
+        periods = []
+        value = self._first(field_name)
+        while value is not None:
+            if isinstance(value, datetime) and timezone.is_aware(value):
+                value = timezone.localtime(value, tzinfo)
+            start = _period_start(value, kind)
+            periods.append(start)
+            value = self._first(field_name, after=_next_period(start, kind))
+        return periods[::-1] if order == "DESC" else periods
+
+    def dates(self, field_name, kind, order="ASC"):
+        if kind not in ("year", "month", "day"):
+            return super().dates(field_name, kind, order)
+        return self._periods(field_name, kind, order)
+
+    def datetimes(self, field_name, kind, order="ASC", tzinfo=None, **kwargs):
+        if kind not in ("year", "month", "day") or kwargs:
+            return super().datetimes(field_name, kind, order, tzinfo, **kwargs)
+        return self._periods(field_name, kind, order, tzinfo)
+
+    def aggregate(self, *args, **kwargs):
+        # A query computing both MIN and MAX scans the whole index
+        edges = {}
+        for name, expression in kwargs.items():
+            source = expression.get_source_expressions()
+            if args or not isinstance(expression, (Min, Max)) or expression.filter is not None \
+                    or len(source) != 1 or not isinstance(source[0], F):
+                return super().aggregate(*args, **kwargs)
+            edges[name] = (source[0].name, isinstance(expression, Max))
+        return {name: self._first(field, descending=descending) for name, (field, descending) in edges.items()}
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # Skips the unfiltered COUNT(*) behind "N results (M total)"
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if self.date_hierarchy:
+            queryset = IndexedDatesQuerySet(
+                model=queryset.model, query=queryset.query, using=queryset._db, hints=queryset._hints
+            )
+        return queryset
+
+
+class NationalityFilter(admin.SimpleListFilter):
+    """Nationality choices read from the dashboard counters instead of a
+    DISTINCT scan of the profile table."""
+
+    title = "nationality"
+    parameter_name = "nationality"
+
+    def lookups(self, request, model_admin):
+        return [(nationality, nationality) for nationality in dashboard.nationalities()]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(nationality=self.value())
+        return queryset
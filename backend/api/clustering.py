@@ -0,0 +1,197 @@
+import threading
+import time
+from math import ceil, floor
+
+from django.conf import settings
+
+from . import sharding
+from .models import Place, Incident
+from .utils import latlng_to_mercator, mercator_to_latlng
+
+
+# Supercluster-style defaults: cluster radius in pixels of a 512px tile
+MIN_ZOOM = 0
+MAX_ZOOM = 16
+CLUSTER_RADIUS = 40
+TILE_EXTENT = 512
+
+
+def _radius(zoom):
+    """Cluster radius at ``zoom`` in normalized (0..1) Mercator units."""
+    return CLUSTER_RADIUS / (TILE_EXTENT * (1 << zoom))
+
+
+class _Node:
+    __slots__ = ('x', 'y', 'count', 'zoom', 'cluster_id', 'props')
+
+    def __init__(self, x, y, count=1, cluster_id=None, props=None):
+        self.x = x
+        self.y = y
+        self.count = count
+        self.zoom = MAX_ZOOM + 1
+        self.cluster_id = cluster_id
+        self.props = props
+
+
+class _Grid:
+    """Uniform grid hash over nodes for neighbour and bbox lookups."""
+
+    def __init__(self, nodes, cell):
+        self.cell = cell
+        self.cells = {}
+        for node in nodes:
+            key = (floor(node.x / cell), floor(node.y / cell))
+            self.cells.setdefault(key, []).append(node)
+
+    def within(self, x, y, r):
+        cell = self.cell
+        r2 = r * r
+        cx, cy = floor(x / cell), floor(y / cell)
+        span = ceil(r / cell)
+        for i in range(cx - span, cx + span + 1):
+            for j in range(cy - span, cy + span + 1):
+                for node in self.cells.get((i, j), ()):
+                    dx = node.x - x
+                    dy = node.y - y
+                    if dx * dx + dy * dy <= r2:
+                        yield node
+
+    def range(self, min_x, min_y, max_x, max_y):
+        cell = self.cell
+        x0, x1 = floor(min_x / cell), floor(max_x / cell)
+        y0, y1 = floor(min_y / cell), floor(max_y / cell)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.cells):
+            keys = [k for k in self.cells if x0 <= k[0] <= x1 and y0 <= k[1] <= y1]
+        else:
+            keys = [(i, j) for i in range(x0, x1 + 1) for j in range(y0, y1 + 1)]
+        for key in keys:
+            for node in self.cells.get(key, ()):
+                if min_x <= node.x <= max_x and min_y <= node.y <= max_y:
+                    yield node
+
+
+class ClusterIndex:
+    """Hierarchical point clusters for every zoom level in MIN_ZOOM..MAX_ZOOM."""
+
+    def __init__(self, points):
+        """``points`` yields (lat, lng, props); props are returned as-is for leaves."""
+        leaves = []
+        for lat, lng, props in points:
+            x, y = latlng_to_mercator(lat, lng)
+            leaves.append(_Node(x, y, props=props))
+
+        self.size = len(leaves)
+        self._next_id = 0
+        self.grids = {MAX_ZOOM + 1: _Grid(leaves, _radius(MAX_ZOOM))}
+        nodes = leaves
+        for zoom in range(MAX_ZOOM, MIN_ZOOM - 1, -1):
+            nodes = self._cluster(nodes, self.grids[zoom + 1], zoom)
+            self.grids[zoom] = _Grid(nodes, _radius(max(zoom - 1, MIN_ZOOM)))
+
+    def _cluster(self, nodes, grid, zoom):
+        r = _radius(zoom)
+        clustered = []
+        for node in nodes:
+            if node.zoom <= zoom:
+                continue
+            node.zoom = zoom
+
+            count = node.count
+            wx = node.x * count
+            wy = node.y * count
+            for neighbor in grid.within(node.x, node.y, r):
+                if neighbor.zoom <= zoom:
+                    continue
+                neighbor.zoom = zoom
+                wx += neighbor.x * neighbor.count
+                wy += neighbor.y * neighbor.count
+                count += neighbor.count
+
+            if count == node.count:
+                clustered.append(node)
+            else:
+                self._next_id += 1
+                clustered.append(_Node(wx / count, wy / count, count, cluster_id=self._next_id))
+        return clustered
+
+    def query(self, bbox, zoom):
+        """Clusters and leaf points inside ``bbox`` (south, west, north, east)."""
+        zoom = max(MIN_ZOOM, min(int(zoom), MAX_ZOOM + 1))
+        south, west, north, east = bbox
+        grid = self.grids[zoom]
+
+        if west > east:
+            # Viewport crosses the antimeridian
+            ranges = [(west, 180.0), (-180.0, east)]
+        else:
+            ranges = [(west, east)]
+
+        features = []
+        for lng0, lng1 in ranges:
+            min_x, min_y = latlng_to_mercator(north, lng0)
+            max_x, max_y = latlng_to_mercator(south, lng1)
+            for node in grid.range(min_x, min_y, max_x, max_y):
+                if node.cluster_id is not None:
+                    lat, lng = mercator_to_latlng(node.x, node.y)
+                    features.append({
+                        "cluster": True,
+                        "cluster_id": node.cluster_id,
+                        "count": node.count,
+                        "lat": lat,
+                        "lng": lng,
+                    })
+                else:
+                    features.append(node.props)
+        return features
+
+
+# ---------------------------
+# Per-process index cache
+# ---------------------------
+def _place_points():
+    rows = Place.objects.values_list('id', 'lat', 'lng', 'name', 'place_type')
+    for pk, lat, lng, name, place_type in rows.iterator(chunk_size=5000):
+        yield lat, lng, {
+            "layer": "places", "id": pk, "lat": lat, "lng": lng, "name": name, "place_type": place_type,
+        }
+
+
+def _incident_points():
+    rows = sharding.gather(
+        lambda database: list(
+            Incident.objects.filter(resolved=False).values_list('id', 'lat', 'lng', 'title', 'created_at')
+        )
+    )
+    for pk, lat, lng, title, created_at in rows:
+        yield lat, lng, {
+            "layer": "incidents", "id": pk, "lat": lat, "lng": lng, "title": title, "created_at": created_at,
+        }
+
+
+LAYERS = {
+    "places": _place_points,
+    "incidents": _incident_points,
+}
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def get_index(layer):
+    """Cached index for a layer, rebuilt when invalidated or stale."""
+    max_age = getattr(settings, "MAP_CLUSTER_MAX_AGE", 60)
+    entry = _indexes.get(layer)
+    if entry and time.monotonic() - entry[0] < max_age:
+        return entry[1]
+
+    with _lock:
+        entry = _indexes.get(layer)
+        if entry and time.monotonic() - entry[0] < max_age:
+            return entry[1]
+        index = ClusterIndex(LAYERS[layer]())
+        _indexes[layer] = (time.monotonic(), index)
+        return index
+
+
+def invalidate(layer):
+    _indexes.pop(layer, None)
@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Incident
+from .utils import is_inside_geofence
+
+
+# Keeps profile_id__in lists well under SQLite's bound-parameter limit
+ID_BATCH_SIZE = 500
+
+
+class RecentAlert:
+    __slots__ = ('target', 'lat', 'lng', 'last_seen')
+
+    def __init__(self, target, lat, lng, last_seen):
+        self.target = target  # Incident id, or an unsaved Incident from this batch
+        self.lat = lat
+        self.lng = lng
+        self.last_seen = last_seen
+
+
+class RecentAlertIndex:
+    """Latest open SOS incident per tourist profile, held by the queue drainer.
+
+    Lets the drainer decide whether an SOS repeats a recent one without a
+    query per alert. The entries of a batch's profiles are reloaded from
+    the database before the batch, since any process may have drained the
+    previous one. Entries expire after SOS_COALESCE_SECONDS of silence.
+    """
+
+    def __init__(self):
+        self.entries = {}
+
+    @property
+    def window(self):
+        return timedelta(seconds=settings.SOS_COALESCE_SECONDS)
+
+    def refresh(self, profile_ids, since):
+        """Replace the entries of these profiles with their latest open
+        incident seen at or after ``since``, in one query per batch of ids."""
+        profile_ids = list(profile_ids)
+        for profile_id in profile_ids:
+            self.entries.pop(profile_id, None)
+        for start in range(0, len(profile_ids), ID_BATCH_SIZE):
+            rows = (
+                Incident.objects.filter(
+                    profile_id__in=profile_ids[start:start + ID_BATCH_SIZE],
+                    resolved=False,
+                    last_seen_at__gte=since,
+                )
+                .order_by('last_seen_at', 'id')
+                .values_list('id', 'profile_id', 'lat', 'lng', 'last_seen_at')
+            )
+            # The latest incident of each profile comes last
+            for pk, profile_id, lat, lng, last_seen in rows:
+                self.entries[profile_id] = RecentAlert(pk, lat, lng, last_seen)
+
+    def match(self, profile_id, lat, lng, at):
+        """The entry this alert should merge into, or None."""
+        entry = self.entries.get(profile_id)
+        if entry is None or at - entry.last_seen > self.window:
+            return None
+        if not is_inside_geofence(lat, lng, entry.lat, entry.lng, settings.SOS_COALESCE_METERS):
+            return None
+        return entry
+
+    def remember(self, profile_id, target, lat, lng, at):
+        self.entries[profile_id] = RecentAlert(target, lat, lng, at)
+
+    def resolve_targets(self):
+        """Swap unsaved Incident objects for their ids once they have pks."""
+        for entry in self.entries.values():
+            if isinstance(entry.target, Incident):
+                entry.target = entry.target.pk
+
+    def reset(self):
+        """Drop everything, e.g. after a failed batch left unsaved targets behind."""
+        self.entries.clear()
+
+    def prune(self, now=None):
+        cutoff = (now or timezone.now()) - self.window
+        for profile_id in [p for p, entry in self.entries.items() if entry.last_seen < cutoff]:
+            del self.entries[profile_id]
+
+
+recent_alerts = RecentAlertIndex()
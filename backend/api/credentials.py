@@ -0,0 +1,246 @@
+import base64
+import hashlib
+import hmac
+import math
+import struct
+import time
+
+try:
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+except ImportError:  # Optional: without it only HMAC-signed credentials are available
+    Ed25519PrivateKey = Ed25519PublicKey = InvalidSignature = None
+
+
+# Compact signed Tourist ID credentials and the revocation filter.
+#
+# This module has no Django imports, so checkpoint software can ship it
+# on its own and verify scans offline with the issuer's public key and
+# the last downloaded revocation filter. Token layout, before base32:
+#
+#   header      version, algorithm, key id, serial, profile id,
+#               issued at, expires at (unix seconds)
+#   name        uint8 length + utf-8
+#   nationality uint8 length + utf-8
+#   signature   over PREFIX + everything above
+#
+# Base32 keeps the payload in the QR alphanumeric character set, which
+# encodes denser than byte mode does for base64.
+
+PREFIX = "TID1:"
+VERSION = 1
+HEADER = struct.Struct(">BBBIIII")
+HS256 = 1
+ED25519 = 2
+ALGORITHM_NAMES = {HS256: "HS256", ED25519: "Ed25519"}
+HMAC_TAG_BYTES = 16
+ED25519_SIGNATURE_BYTES = 64
+MAX_NAME_BYTES = 48
+MAX_NATIONALITY_BYTES = 32
+
+
+class InvalidCredential(Exception):
+    """A token that does not verify; ``reason`` is a short machine-readable code."""
+
+    def __init__(self, reason, message=None):
+        super().__init__(message or reason)
+        self.reason = reason
+
+
+class Credential:
+    __slots__ = ('serial', 'profile_id', 'name', 'nationality', 'issued_at', 'expires_at', 'key_id', 'algorithm')
+
+    def __init__(self, serial, profile_id, name, nationality, issued_at, expires_at, key_id, algorithm):
+        self.serial = serial
+        self.profile_id = profile_id
+        self.name = name
+        self.nationality = nationality
+        self.issued_at = issued_at
+        self.expires_at = expires_at
+        self.key_id = key_id
+        self.algorithm = algorithm
+
+    def as_dict(self):
+        return {
+            "serial": self.serial,
+            "profile_id": self.profile_id,
+            "name": self.name,
+            "nationality": self.nationality,
+            "issued_at": self.issued_at,
+            "expires_at": self.expires_at,
+            "key_id": self.key_id,
+            "algorithm": ALGORITHM_NAMES[self.algorithm],
+        }
+
+
+# ---------------------------
+# Keys
+# ---------------------------
+class HmacKey:
+    """Shared-secret key: whoever can verify can also issue."""
+    algorithm = HS256
+    signature_bytes = HMAC_TAG_BYTES
+
+    def __init__(self, key_id, secret):
+        self.key_id = key_id
+        self.secret = secret
+
+    def sign(self, data):
+        return hmac.new(self.secret, data, hashlib.sha256).digest()[:HMAC_TAG_BYTES]
+
+    def verify(self, data, signature):
+        return hmac.compare_digest(self.sign(data), signature)
+
+
+class Ed25519Key:
+    """Public-key signatures: checkpoints hold only the public half."""
+    algorithm = ED25519
+    signature_bytes = ED25519_SIGNATURE_BYTES
+
+    def __init__(self, key_id, private_key=None, public_key=None):
+        if Ed25519PrivateKey is None:
+            raise RuntimeError("Ed25519 credentials need the 'cryptography' package")
+        self.key_id = key_id
+        self.private_key = Ed25519PrivateKey.from_private_bytes(private_key) if private_key else None
+        if public_key:
+            self.public_key = Ed25519PublicKey.from_public_bytes(public_key)
+        else:
+            self.public_key = self.private_key.public_key()
+
+    def public_bytes(self):
+        from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+        return self.public_key.public_bytes(Encoding.Raw, PublicFormat.Raw)
+
+    def sign(self, data):
+        if self.private_key is None:
+            raise RuntimeError(f"Key {self.key_id} can only verify")
+        return self.private_key.sign(data)
+
+    def verify(self, data, signature):
+        try:
+            self.public_key.verify(signature, data)
+        except InvalidSignature:
+            return False
+        return True
+
+
+# ---------------------------
+# Tokens
+# ---------------------------
+def _short(text, limit):
+    data = (text or "").encode("utf-8")[:limit]
+    # Do not leave half a multi-byte character at the end
+    return data.decode("utf-8", "ignore").encode("utf-8")
+
+
+def _b32encode(data):
+    return base64.b32encode(data).decode("ascii").rstrip("=")
+
+
+def _b32decode(text):
+    return base64.b32decode(text + "=" * (-len(text) % 8))
+
+
+def encode(key, serial, profile_id, name, nationality, issued_at, expires_at):
+    """Signed token for one credential; times are unix seconds."""
+    name = _short(name, MAX_NAME_BYTES)
+    nationality = _short(nationality, MAX_NATIONALITY_BYTES)
+    payload = (
+        HEADER.pack(VERSION, key.algorithm, key.key_id, serial, profile_id, int(issued_at), int(expires_at))
+        + bytes([len(name)]) + name
+        + bytes([len(nationality)]) + nationality
+    )
+    signature = key.sign(PREFIX.encode("ascii") + payload)
+    return PREFIX + _b32encode(payload + signature)
+
+
+def decode(token, keys, now=None):
+    """Verify ``token`` against ``keys`` {key id: key}; returns a Credential.
+
+    Raises InvalidCredential for malformed, forged or expired tokens.
+    Revocation is checked separately (see RevocationFilter).
+    """
+    token = (token or "").strip()
+    if not token.upper().startswith(PREFIX):
+        raise InvalidCredential("malformed", "Not a Tourist ID credential")
+    try:
+        raw = _b32decode(token[len(PREFIX):].upper())
+        version, algorithm, key_id, serial, profile_id, issued_at, expires_at = HEADER.unpack_from(raw)
+        offset = HEADER.size
+        name_length = raw[offset]
+        name = raw[offset + 1:offset + 1 + name_length].decode("utf-8")
+        offset += 1 + name_length
+        nationality_length = raw[offset]
+        nationality = raw[offset + 1:offset + 1 + nationality_length].decode("utf-8")
+        offset += 1 + nationality_length
+    except (ValueError, struct.error, IndexError):
+        raise InvalidCredential("malformed", "Credential could not be decoded")
+    if version != VERSION:
+        raise InvalidCredential("malformed", f"Unsupported credential version {version}")
+
+    key = keys.get(key_id)
+    if key is None or key.algorithm != algorithm:
+        raise InvalidCredential("unknown_key", f"No verification key {key_id}")
+    payload, signature = raw[:offset], raw[offset:]
+    if len(signature) != key.signature_bytes or not key.verify(PREFIX.encode("ascii") + payload, signature):
+        raise InvalidCredential("bad_signature", "Signature does not match")
+    if (time.time() if now is None else now) >= expires_at:
+        raise InvalidCredential("expired", "Credential has expired")
+    return Credential(serial, profile_id, name, nationality, issued_at, expires_at, key_id, algorithm)
+
+
+# ---------------------------
+# Revocation filter
+# ---------------------------
+class RevocationFilter:
+    """Bloom filter over revoked credential serials.
+
+    A miss means "not revoked" for certain; a hit means "probably
+    revoked" and can be confirmed with the issuer. File layout: MAGIC,
+    bit count, hash count, item count, generated at, then the bits.
+    """
+    MAGIC = b"TIDR"
+    FILE_HEADER = struct.Struct(">4sIBIQ")
+
+    def __init__(self, bits, hashes, data=None, count=0, generated_at=0):
+        self.bits = bits
+        self.hashes = hashes
+        self.data = bytearray(data) if data is not None else bytearray((bits + 7) // 8)
+        self.count = count
+        self.generated_at = generated_at
+
+    @classmethod
+    def for_capacity(cls, items, false_positive_rate=0.001):
+        items = max(items, 1)
+        bits = max(64, math.ceil(-items * math.log(false_positive_rate) / math.log(2) ** 2))
+        # Optimal count for the target rate, whatever the size
+        hashes = max(1, round(-math.log2(false_positive_rate)))
+        return cls(bits, hashes)
+
+    def _positions(self, serial):
+        digest = hashlib.blake2b(serial.to_bytes(8, "big"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, serial):
+        for position in self._positions(serial):
+            self.data[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, serial):
+        data = self.data
+        return all(data[position >> 3] & (1 << (position & 7)) for position in self._positions(serial))
+
+    def to_bytes(self):
+        return self.FILE_HEADER.pack(self.MAGIC, self.bits, self.hashes, self.count, self.generated_at) + bytes(self.data)
+
+    @classmethod
+    def from_bytes(cls, raw):
+        magic, bits, hashes, count, generated_at = cls.FILE_HEADER.unpack_from(raw)
+        if magic != cls.MAGIC:
+            raise ValueError("Not a revocation filter")
+        data = raw[cls.FILE_HEADER.size:]
+        if len(data) != (bits + 7) // 8:
+            raise ValueError("Truncated revocation filter")
+        return cls(bits, hashes, data, count, generated_at)
@@ -0,0 +1,144 @@
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from . import archive, sharding
+from .models import DashboardCounter, Incident, TouristProfile
+
+
+AUTHORITY_CACHE_KEY = "dashboard:authority"
+
+
+def tourist_keys(nationality, arrival_date, departure_date):
+    """Counter keys one tourist profile contributes to."""
+    keys = ["tourists"]
+    if nationality:
+        keys.append(f"nationality:{nationality}")
+    if arrival_date:
+        keys.append(f"arrivals:{arrival_date}")
+    if departure_date:
+        keys.append(f"departures:{departure_date}")
+    return keys
+
+
+def incident_keys(resolved):
+    """Counter keys one incident contributes to."""
+    return ["incidents"] if resolved else ["incidents", "open_alerts"]
+
+
+def bump(key, delta):
+    """Atomically add ``delta`` to a counter, creating it if needed."""
+    if not delta:
+        return
+    if DashboardCounter.objects.filter(key=key).update(value=F('value') + delta):
+        return
+    try:
+        with sharding.atomic():
+            DashboardCounter.objects.create(key=key, value=delta)
+    except IntegrityError:
+        # Another writer created the row first
+        DashboardCounter.objects.filter(key=key).update(value=F('value') + delta)
+
+
+def apply_change(old_keys, new_keys):
+    """Move one row's contribution from old_keys to new_keys."""
+    deltas = Counter(new_keys)
+    deltas.subtract(old_keys or ())
+    changed = False
+    for key, delta in deltas.items():
+        if delta:
+            bump(key, delta)
+            changed = True
+    if changed:
+        cache.delete(AUTHORITY_CACHE_KEY)
+
+
+def invalidate():
+    cache.delete(AUTHORITY_CACHE_KEY)
+
+
+def adjust(key, delta):
+    """Add ``delta`` to one counter; for bulk updates that bypass signals."""
+    if delta:
+        bump(key, delta)
+        cache.delete(AUTHORITY_CACHE_KEY)
+
+
+def summary():
+    """Counts for the authority dashboard, read in a single query per shard."""
+    today = timezone.localdate().isoformat()
+    arrivals_key = f"arrivals:{today}"
+    departures_key = f"departures:{today}"
+
+    def counters(database):
+        return list(
+            DashboardCounter.objects.filter(
+                Q(key__in=["tourists", "incidents", "open_alerts", arrivals_key, departures_key])
+                | Q(key__startswith="nationality:")
+            ).values_list('key', 'value')
+        )
+
+    # Each shard counts its own tourists and incidents
+    values = Counter()
+    for key, value in sharding.gather(counters):
+        values[key] += value
+    nationalities = [
+        {"nationality": key.split(":", 1)[1], "count": value}
+        for key, value in values.items()
+        if key.startswith("nationality:") and value > 0
+    ]
+    nationalities.sort(key=lambda row: -row["count"])
+
+    return {
+        "tourists": values.get("tourists", 0),
+        "incidents": values.get("incidents", 0),
+        "open_alerts": values.get("open_alerts", 0),
+        "arrivals_today": values.get(arrivals_key, 0),
+        "departures_today": values.get(departures_key, 0),
+        "nationalities": nationalities,
+    }
+
+
+def nationalities():
+    """Nationalities with at least one tourist in the current shard, sorted."""
+    keys = DashboardCounter.objects.filter(key__startswith="nationality:", value__gt=0).values_list('key', flat=True)
+    return sorted(key.split(":", 1)[1] for key in keys)
+
+
+def rebuild():
+    """Recompute every counter of the current shard from its source tables
+    (and the incident archive)."""
+    counts = Counter()
+    counts["tourists"] = TouristProfile.objects.count()
+    for field, prefix in (
+        ('nationality', 'nationality'),
+        ('arrival_date', 'arrivals'),
+        ('departure_date', 'departures'),
+    ):
+        rows = (
+            TouristProfile.objects.exclude(**{f"{field}__isnull": True})
+            .values(field)
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        for row in rows:
+            if row[field]:
+                counts[f"{prefix}:{row[field]}"] = row['count']
+
+    incidents = Incident.objects.aggregate(
+        total=Count('id'),
+        open=Count('id', filter=Q(resolved=False)),
+    )
+    counts["incidents"] = incidents['total'] + archive.count()
+    counts["open_alerts"] = incidents['open']
+
+    with sharding.atomic():
+        DashboardCounter.objects.all().delete()
+        DashboardCounter.objects.bulk_create(
+            [DashboardCounter(key=key, value=value) for key, value in counts.items()]
+        )
+    cache.delete(AUTHORITY_CACHE_KEY)
+    return len(counts)
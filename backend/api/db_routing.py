@@ -0,0 +1,101 @@
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# Read/write splitting across DATABASE_REPLICAS.
+#
+# Only requests read from replicas: ReadReplicaMiddleware opens a routing
+# scope per request, and code running outside one (management commands,
+# the SOS queue writer) always uses the primary, since it usually reads
+# what it is about to write. Inside a request:
+#
+# - POST/PUT/PATCH/DELETE requests use the primary throughout, since
+#   they read what they are about to change;
+# - writes, select_for_update() and anything in a transaction on the
+#   primary go to the primary;
+# - after the first write every later query of the request does too
+#   (read your writes), and the client gets a short-lived cookie so its
+#   next requests do the same until replicas have caught up;
+# - all other reads go to one replica, picked once per request, so a
+#   request never sees two replicas at different points of their lag.
+
+PIN_COOKIE = "db_primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_scope = ContextVar("db_routing_scope", default=None)
+
+
+class _Scope:
+    __slots__ = ('pinned', 'wrote', 'replica')
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+
+
+def replicas():
+    return settings.DATABASE_REPLICAS
+
+
+def pin():
+    """Send the rest of this request, and the client's next few, to the primary.
+
+    Called on every routed write; views call it themselves when they
+    write somewhere the router cannot see (e.g. the SOS queue).
+    """
+    scope = _scope.get()
+    if scope is not None:
+        scope.pinned = scope.wrote = True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        scope = _scope.get()
+        if scope is None or scope.pinned or not replicas():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if scope.replica is None:
+            scope.replica = random.choice(replicas())
+        return scope.replica
+
+    def db_for_write(self, model, **hints):
+        pin()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        return db not in replicas()
+
+
+class ReadReplicaMiddleware:
+    """Routing scope per request, plus the read-your-writes cookie."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            pinned = float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            pinned = False
+        pinned = pinned or request.method not in SAFE_METHODS
+        scope = _Scope(pinned)
+        token = _scope.set(scope)
+        try:
+            response = self.get_response(request)
+        finally:
+            _scope.reset(token)
+        if scope.wrote and replicas():
+            seconds = settings.DATABASE_REPLICA_PIN_SECONDS
+            response.set_cookie(PIN_COOKIE, f"{time.time() + seconds:.3f}", max_age=seconds, samesite="Lax")
+        return response
@@ -0,0 +1,165 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_date
+
+from . import archive
+from .models import TouristProfile, Incident
+
+
+# Rows fetched per round trip when streaming a queryset
+EXPORT_CHUNK_SIZE = 2000
+
+TOURIST_EXPORT_FIELDS = [
+    'id',
+    'name',
+    'email',
+    'phone',
+    'country',
+    'nationality',
+    'current_location',
+    'from_address',
+    'to_address',
+    'arrival_date',
+    'departure_date',
+    'hotel_name',
+    'hotel_address',
+    'created_at',
+    'updated_at',
+]
+
+INCIDENT_EXPORT_FIELDS = [
+    'id',
+    'profile_id',
+    'profile__name',
+    'profile__email',
+    'title',
+    'description',
+    'created_at',
+    'lat',
+    'lng',
+    'resolved',
+]
+
+
+class Echo:
+    """File-like object that hands back whatever is written to it."""
+
+    def write(self, value):
+        return value
+
+
+def _parse_bool(value):
+    if value is None or value == "":
+        return None
+    value = str(value).lower()
+    if value in ("1", "true", "yes"):
+        return True
+    if value in ("0", "false", "no"):
+        return False
+    raise ValueError(f"Invalid boolean value: {value}")
+
+
+def parse_date_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f"Invalid date for '{name}', expected YYYY-MM-DD")
+    return parsed
+
+
+def filter_tourists(params, queryset=None):
+    """Apply export filters (date range on created_at, nationality)."""
+    if queryset is None:
+        queryset = TouristProfile.objects.all()
+
+    date_from = parse_date_param(params, "from")
+    date_to = parse_date_param(params, "to")
+    nationality = params.get("nationality")
+
+    if date_from:
+        queryset = queryset.filter(created_at__date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(created_at__date__lte=date_to)
+    if nationality:
+        queryset = queryset.filter(nationality__iexact=nationality)
+    return queryset.order_by('id')
+
+
+def filter_incidents(params, queryset=None):
+    """Apply export filters (date range on created_at, nationality, resolved)."""
+    if queryset is None:
+        queryset = Incident.objects.all()
+
+    date_from = parse_date_param(params, "from")
+    date_to = parse_date_param(params, "to")
+    nationality = params.get("nationality")
+    resolved = _parse_bool(params.get("resolved"))
+
+    if date_from:
+        queryset = queryset.filter(created_at__date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(created_at__date__lte=date_to)
+    if nationality:
+        queryset = queryset.filter(profile__nationality__iexact=nationality)
+    if resolved is not None:
+        queryset = queryset.filter(resolved=resolved)
+    return queryset.order_by('id')
+
+
+def filter_archived_incidents(params, database=None, after=None):
+    """Archived incidents of a shard matching the same filters as
+    filter_incidents(), with ids above ``after``, as archive records in
+    id order."""
+    date_from = parse_date_param(params, "from")
+    date_to = parse_date_param(params, "to")
+    nationality = (params.get("nationality") or "").lower()
+    resolved = _parse_bool(params.get("resolved"))
+
+    # Only resolved incidents are archived
+    if resolved is False:
+        return
+    for record in archive.records(date_from, date_to, database, after):
+        if nationality and (record['profile']['nationality'] or "").lower() != nationality:
+            continue
+        yield record
+
+
+def archived_row(record, fields):
+    """An export row from an archive record; profile__ fields come from its
+    tourist snapshot."""
+    return {
+        field: record['profile'][field[len('profile__'):]] if field.startswith('profile__') else record[field]
+        for field in fields
+    }
+
+
+def iter_rows(queryset, fields, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield plain dicts from the database in chunks, without model instances."""
+    return queryset.values(*fields).iterator(chunk_size=chunk_size)
+
+
+def stream_ndjson(rows):
+    """Encode each row as one JSON line."""
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    for row in rows:
+        yield encoder.encode(row) + "\n"
+
+
+def stream_csv(rows, fields):
+    """Encode rows as CSV, header first, one line per yielded chunk."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([
+            "" if row[field] is None else _csv_value(row[field])
+            for field in fields
+        ])
+
+
+def _csv_value(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
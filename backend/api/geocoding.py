@@ -0,0 +1,246 @@
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from bisect import bisect_left
+from functools import lru_cache
+from math import cos, floor, radians, sqrt
+
+from django.conf import settings
+
+from .utils import mock_reverse_geocode
+
+
+# Offline reverse geocoder over a GeoNames-style gazetteer (plus a
+# place-name lookup for free-text addresses).
+#
+# `manage.py build_gazetteer` packs the dump into one binary file that is
+# memory-mapped read-only, so every worker shares the same pages and
+# startup does not parse anything. Layout (little endian):
+#
+#   header      MAGIC, count, cell count, name bytes
+#   cell_start  uint32[CELLS + 1]  first point of each 1x1 degree cell
+#   lat, lng    float32[count]     points sorted by cell
+#   name_end    uint32[count]      end offset of each name in the names blob
+#   country     2 bytes * count    ISO country code (padded to 4 bytes)
+#   name_order  uint32[count]      points ordered by lowercased name, for
+#                                  forward lookups by bisection
+#   names       utf-8 blob
+
+MAGIC = b"GZT2"
+HEADER = struct.Struct("<4sIII")
+CELLS = 180 * 360
+MAX_RING = 2  # cells searched around the point, about 220 km at the equator
+KM_PER_DEGREE = 111.195
+
+
+def cell_of(lat, lng):
+    row = min(max(int(floor(lat)) + 90, 0), 179)
+    col = int(floor(lng)) % 360
+    return row * 360 + col
+
+
+def _pad4(n):
+    return (n + 3) & ~3
+
+
+def write_gazetteer(path, places):
+    """Write ``places`` [(name, lat, lng, country_code)] as a gazetteer file."""
+    places = sorted(places, key=lambda p: cell_of(p[1], p[2]))
+    count = len(places)
+
+    cell_start = [0] * (CELLS + 1)
+    for _, lat, lng, _ in places:
+        cell_start[cell_of(lat, lng) + 1] += 1
+    for i in range(CELLS):
+        cell_start[i + 1] += cell_start[i]
+
+    names = bytearray()
+    name_end = []
+    for name, _, _, _ in places:
+        names += name.encode("utf-8")
+        name_end.append(len(names))
+    countries = b"".join((cc or "").encode("ascii", "replace")[:2].ljust(2) for _, _, _, cc in places)
+    # Stable, so the first point wins among places sharing a name
+    name_order = sorted(range(count), key=lambda i: places[i][0].lower())
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, count, CELLS, len(names)))
+        f.write(struct.pack(f"<{CELLS + 1}I", *cell_start))
+        f.write(struct.pack(f"<{count}f", *(p[1] for p in places)))
+        f.write(struct.pack(f"<{count}f", *(p[2] for p in places)))
+        f.write(struct.pack(f"<{count}I", *name_end))
+        f.write(countries.ljust(_pad4(len(countries)), b"\0"))
+        f.write(struct.pack(f"<{count}I", *name_order))
+        f.write(bytes(names))
+    return count
+
+
+class Gazetteer:
+    """Read-only, memory-mapped view of a gazetteer file."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, cells, _ = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or cells != CELLS:
+            raise ValueError(f"{path} is not a gazetteer file (rebuild it with manage.py build_gazetteer)")
+
+        view = memoryview(self._mm)
+        offset = HEADER.size
+        self.cell_start = view[offset:offset + 4 * (CELLS + 1)].cast("I")
+        offset += 4 * (CELLS + 1)
+        self.lat = view[offset:offset + 4 * count].cast("f")
+        offset += 4 * count
+        self.lng = view[offset:offset + 4 * count].cast("f")
+        offset += 4 * count
+        self.name_end = view[offset:offset + 4 * count].cast("I")
+        offset += 4 * count
+        self.country = view[offset:offset + 2 * count]
+        offset += _pad4(2 * count)
+        self.name_order = view[offset:offset + 4 * count].cast("I")
+        offset += 4 * count
+        self.names = view[offset:]
+        self.count = count
+
+    def name(self, i):
+        start = self.name_end[i - 1] if i else 0
+        return bytes(self.names[start:self.name_end[i]]).decode("utf-8")
+
+    def find(self, name):
+        """Index of the first place called ``name`` (case-insensitive), or None."""
+        name = name.lower()
+        pos = bisect_left(self.name_order, name, key=lambda i: self.name(i).lower())
+        if pos < self.count and self.name(self.name_order[pos]).lower() == name:
+            return self.name_order[pos]
+        return None
+
+    def country_code(self, i):
+        return bytes(self.country[2 * i:2 * i + 2]).decode("ascii").strip()
+
+    def nearest(self, lat, lng):
+        """(index, distance_km) of the closest place within MAX_RING cells, or None."""
+        row = min(max(int(floor(lat)) + 90, 0), 179)
+        col = int(floor(lng)) % 360
+        kx = cos(radians(lat))
+        best = None
+        best_d2 = float("inf")
+        found_at = None
+
+        for ring in range(MAX_RING + 1):
+            for r in range(row - ring, row + ring + 1):
+                if not 0 <= r < 180:
+                    continue
+                edge = r in (row - ring, row + ring)
+                step = 1 if edge else 2 * ring or 1
+                for c in range(col - ring, col + ring + 1, step):
+                    cell = r * 360 + c % 360
+                    for i in range(self.cell_start[cell], self.cell_start[cell + 1]):
+                        dlng = (self.lng[i] - lng + 180.0) % 360.0 - 180.0
+                        dx = dlng * kx
+                        dy = self.lat[i] - lat
+                        d2 = dx * dx + dy * dy
+                        if d2 < best_d2:
+                            best, best_d2 = i, d2
+            if best is not None:
+                if found_at is None:
+                    # A closer point may still sit in the next ring out
+                    found_at = ring
+                elif ring > found_at:
+                    break
+        if best is None:
+            return None
+        return best, sqrt(best_d2) * KM_PER_DEGREE
+
+
+# ---------------------------
+# Shared gazetteer per process
+# ---------------------------
+_current = {"gazetteer": None, "stat": None, "checked": None}
+_lock = threading.Lock()
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns
+
+
+def get_gazetteer():
+    """The shared gazetteer, or None when no file has been built.
+
+    The file is re-stat'ed every GAZETTEER_RECHECK_SECONDS, so a rebuilt
+    (or newly built) gazetteer is mapped without a restart.
+    """
+    now = time.monotonic()
+    checked = _current["checked"]
+    if checked is not None and now - checked < settings.GAZETTEER_RECHECK_SECONDS:
+        return _current["gazetteer"]
+
+    with _lock:
+        stat = _stat(settings.GAZETTEER_PATH)
+        if stat != _current["stat"]:
+            try:
+                gazetteer = Gazetteer(settings.GAZETTEER_PATH) if stat else None
+            except FileNotFoundError:
+                gazetteer, stat = None, None
+            _current["gazetteer"], _current["stat"] = gazetteer, stat
+            # Cached addresses came from the old file
+            _cached_lookup().cache_clear()
+        _current["checked"] = time.monotonic()
+        return _current["gazetteer"]
+
+
+def _round(value):
+    return round(value, settings.GEOCODE_CACHE_PRECISION)
+
+
+@lru_cache(maxsize=1)
+def _cached_lookup():
+    # Built on first use so GEOCODE_CACHE_SIZE is read from settings
+    return lru_cache(maxsize=settings.GEOCODE_CACHE_SIZE)(_lookup)
+
+
+def _lookup(lat, lng):
+    gazetteer = get_gazetteer()
+    if gazetteer is None:
+        return mock_reverse_geocode(lat, lng)
+    hit = gazetteer.nearest(lat, lng)
+    if hit is None:
+        return {'address': f'{lat:.5f}, {lng:.5f}', 'city': '', 'country': ''}
+    i, distance_km = hit
+    city = gazetteer.name(i)
+    country = gazetteer.country_code(i)
+    return {
+        'address': f'{city}, {country}' if country else city,
+        'city': city,
+        'country': country,
+        'distance_km': round(distance_km, 1)
+    }
+
+
+def forward_geocode(text):
+    """(lat, lng) of the first comma-separated part of ``text`` that names a
+    gazetteer place, or None. "Hotel Sunrise, MG Road, Mysore, India" resolves
+    to Mysore; there is no street-level matching.
+    """
+    gazetteer = get_gazetteer()
+    if gazetteer is None or not text:
+        return None
+    for part in text.split(","):
+        i = gazetteer.find(re.sub(r"\s+", " ", part).strip())
+        if i is not None:
+            return float(gazetteer.lat[i]), float(gazetteer.lng[i])
+    return None
+
+
+def reverse_geocode(lat, lng):
+    """Nearest gazetteer place for a point, cached by rounded coordinates.
+
+    Falls back to mock_reverse_geocode when no gazetteer has been built.
+    """
+    return _cached_lookup()(_round(float(lat)), _round(float(lng)))
@@ -0,0 +1,148 @@
+import itertools
+from collections import Counter
+
+from django.db import IntegrityError
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from . import archive, sharding
+from .models import Incident, IncidentTile
+from .utils import MAX_TILE_ZOOM, latlng_to_tile
+
+
+def rollup_state(lat, lng, created_at, resolved):
+    """Rollup bucket (tile_x, tile_y, day) plus resolved flag for an incident."""
+    if lat is None or lng is None or created_at is None:
+        return None
+    x, y = latlng_to_tile(lat, lng, MAX_TILE_ZOOM)
+    return (x, y, timezone.localdate(created_at), bool(resolved))
+
+
+def incident_state(incident):
+    return rollup_state(incident.lat, incident.lng, incident.created_at, incident.resolved)
+
+
+def bump_tile(tile_x, tile_y, day, total=0, unresolved=0):
+    """Atomically add deltas to one rollup row, creating it if needed."""
+    if not total and not unresolved:
+        return
+    lookup = dict(tile_x=tile_x, tile_y=tile_y, day=day)
+    changes = dict(total=F('total') + total, unresolved=F('unresolved') + unresolved)
+
+    if IncidentTile.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with sharding.atomic():
+            IncidentTile.objects.create(total=total, unresolved=unresolved, **lookup)
+    except IntegrityError:
+        # Another writer created the row first
+        IncidentTile.objects.filter(**lookup).update(**changes)
+
+
+def apply_change(old_state, new_state):
+    """Move one incident's contribution from old_state to new_state."""
+    if old_state == new_state:
+        return
+    if old_state and new_state and old_state[:3] == new_state[:3]:
+        # Same tile and day, only the resolved flag flipped
+        bump_tile(*new_state[:3], unresolved=1 if old_state[3] else -1)
+        return
+    if old_state:
+        bump_tile(*old_state[:3], total=-1, unresolved=0 if old_state[3] else -1)
+    if new_state:
+        bump_tile(*new_state[:3], total=1, unresolved=0 if new_state[3] else 1)
+
+
+def add_created(incidents):
+    """Count newly inserted open incidents given as (lat, lng, created_at).
+
+    Used where bulk_create() bypasses model signals.
+    """
+    deltas = Counter()
+    for lat, lng, created_at in incidents:
+        state = rollup_state(lat, lng, created_at, False)
+        if state:
+            deltas[state[:3]] += 1
+    for (tile_x, tile_y, day), delta in deltas.items():
+        bump_tile(tile_x, tile_y, day, total=delta, unresolved=delta)
+
+
+def mark_resolved(incidents, resolved=True):
+    """Adjust the rollup for incidents whose resolved flag is set in bulk.
+
+    ``incidents`` yields (lat, lng, created_at) for rows that actually
+    changed; used where queryset.update() bypasses model signals.
+    """
+    deltas = Counter()
+    for lat, lng, created_at in incidents:
+        state = rollup_state(lat, lng, created_at, resolved)
+        if state:
+            deltas[state[:3]] += -1 if resolved else 1
+    for (tile_x, tile_y, day), delta in deltas.items():
+        bump_tile(tile_x, tile_y, day, unresolved=delta)
+
+
+def rebuild(chunk_size=5000):
+    """Recompute the current shard's rollup from its Incident table and
+    incident archive."""
+    totals = Counter()
+    unresolved = Counter()
+    rows = itertools.chain(
+        Incident.objects.values_list('lat', 'lng', 'created_at', 'resolved').iterator(chunk_size=chunk_size),
+        ((r['lat'], r['lng'], r['created_at'], r['resolved']) for r in archive.records()),
+    )
+    for lat, lng, created_at, resolved in rows:
+        state = rollup_state(lat, lng, created_at, resolved)
+        if not state:
+            continue
+        totals[state[:3]] += 1
+        if not resolved:
+            unresolved[state[:3]] += 1
+
+    with sharding.atomic():
+        IncidentTile.objects.all().delete()
+        IncidentTile.objects.bulk_create(
+            [
+                IncidentTile(tile_x=x, tile_y=y, day=day, total=count, unresolved=unresolved[(x, y, day)])
+                for (x, y, day), count in totals.items()
+            ],
+            batch_size=chunk_size,
+        )
+    return len(totals)
+
+
+def heatmap(zoom, date_from=None, date_to=None, unresolved_only=False, bbox=None):
+    """Incident counts grouped into tiles at ``zoom`` using SQL GROUP BY.
+
+    Returns a list of (tile_x, tile_y, count). ``bbox`` is
+    (south, west, north, east) in degrees. Shards holding regions that
+    overlap ``bbox`` are queried in parallel and their counts summed.
+    """
+    if not 0 <= zoom <= MAX_TILE_ZOOM:
+        raise ValueError(f"Zoom must be between 0 and {MAX_TILE_ZOOM}")
+
+    divisor = 1 << (MAX_TILE_ZOOM - zoom)
+    tiles = IncidentTile.objects.all()
+    if date_from:
+        tiles = tiles.filter(day__gte=date_from)
+    if date_to:
+        tiles = tiles.filter(day__lte=date_to)
+    if bbox:
+        south, west, north, east = bbox
+        min_x, min_y = latlng_to_tile(north, west, MAX_TILE_ZOOM)
+        max_x, max_y = latlng_to_tile(south, east, MAX_TILE_ZOOM)
+        tiles = tiles.filter(tile_x__range=(min_x, max_x), tile_y__range=(min_y, max_y))
+
+    count_field = 'unresolved' if unresolved_only else 'total'
+    grouped = (
+        tiles.annotate(x=F('tile_x') / divisor, y=F('tile_y') / divisor)
+        .values('x', 'y')
+        .annotate(count=Sum(count_field))
+        .filter(count__gt=0)
+        .order_by()
+    )
+    counts = Counter()
+    for row in sharding.gather(lambda database: list(grouped.all()), sharding.databases_for_bbox(bbox)):
+        counts[(row['x'], row['y'])] += row['count']
+    return [(x, y, count) for (x, y), count in counts.items()]
+
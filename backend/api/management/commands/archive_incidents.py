@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api import archive, sharding
+
+
+class Command(BaseCommand):
+    help = "Move resolved incidents older than INCIDENT_ARCHIVE_AFTER_DAYS into compressed archive segments"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None)
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        count = sum(sharding.scatter(
+            lambda database: archive.archive(options["days"], options["batch_size"])
+        ))
+        self.stdout.write(self.style.SUCCESS(f"Archived {count} incidents"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api import sharding, sync
+
+
+class Command(BaseCommand):
+    help = "Add sync log entries for rows that have none (run once after upgrading)"
+
+    def handle(self, *args, **options):
+        added = sum(sharding.scatter(lambda database: sync.backfill()))
+        self.stdout.write(self.style.SUCCESS(f"Logged {added} rows for delta sync"))
@@ -0,0 +1,136 @@
+import time
+from datetime import timedelta
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.utils import timezone
+
+from api import dashboard
+from api.admin import EmergencyContactAdmin, IncidentAdmin, TouristProfileAdmin
+from api.models import EmergencyContact, Incident, TouristProfile
+
+
+class Rollback(Exception):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+# The admin as it was: exact counts, DISTINCT filter choices, FK columns
+# loaded per row and <select> widgets listing every profile
+class LegacyTouristProfileAdmin(admin.ModelAdmin):
+    list_display = TouristProfileAdmin.list_display
+    search_fields = TouristProfileAdmin.search_fields
+    list_filter = ['nationality', 'created_at']
+
+
+class LegacyIncidentAdmin(admin.ModelAdmin):
+    list_display = IncidentAdmin.list_display
+
+
+class LegacyEmergencyContactAdmin(admin.ModelAdmin):
+    list_display = EmergencyContactAdmin.list_display
+
+
+LEGACY = {
+    TouristProfile: LegacyTouristProfileAdmin,
+    Incident: LegacyIncidentAdmin,
+    EmergencyContact: LegacyEmergencyContactAdmin,
+}
+NATIONALITIES = ("IN", "GB", "US", "DE", "FR", "JP", "AU", "CN")
+
+
+class Command(BaseCommand):
+    help = "Time admin changelist and add-form renders against N synthetic tourists (rolled back afterwards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000000, help="Tourists, each with an incident and a contact")
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._seed(options["rows"])
+                user = User.objects.create_superuser("admin-bench", "admin-bench@bench.example", "x")
+                year = str(timezone.now().year)
+                pages = [
+                    # The legacy nationality filter takes its own parameter
+                    ("tourist changelist", TouristProfile, "changelist", {}, {}),
+                    ("tourists, one nationality", TouristProfile, "changelist",
+                     {"nationality__exact": "GB"}, {"nationality": "GB"}),
+                    ("tourists, one year", TouristProfile, "changelist", {"created_at__year": year},
+                     {"created_at__year": year}),
+                    ("incidents, open", Incident, "changelist", {"resolved__exact": "0"}, {"resolved__exact": "0"}),
+                    ("incident changelist", Incident, "changelist", {}, {}),
+                    ("contact changelist", EmergencyContact, "changelist", {}, {}),
+                    ("incident add form", Incident, "add", {}, {}),
+                ]
+                for label, model, view, legacy_query, query in pages:
+                    before = self._render(LEGACY[model](model, admin.site), view, legacy_query, user,
+                                          options["repeat"])
+                    after = self._render(admin.site._registry[model], view, query, user, options["repeat"])
+                    self.stdout.write(
+                        f"{label}: {before[0] * 1000:.0f} ms / {before[1]} queries before, "
+                        f"{after[0] * 1000:.0f} ms / {after[1]} queries after"
+                    )
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _seed(self, rows):
+        self.stdout.write(f"Seeding {rows} tourists, incidents and contacts...")
+        now = timezone.now()
+        for start in range(0, rows, 20000):
+            profiles = TouristProfile.objects.bulk_create([
+                TouristProfile(name=f"Bench {i}", email=f"admin-bench-{i}@bench.example",
+                               nationality=NATIONALITIES[i % len(NATIONALITIES)])
+                for i in range(start, min(start + 20000, rows))
+            ])
+            Incident.objects.bulk_create([
+                Incident(profile=profile, title="admin bench", lat=12.97, lng=77.59)
+                for profile in profiles
+            ])
+            EmergencyContact.objects.bulk_create([
+                EmergencyContact(profile=profile, name="Contact", phone="+911234567890") for profile in profiles
+            ])
+            # auto_now_add overrides created_at on insert; spread the rows over a year
+            created_at = now - timedelta(days=365 * start // rows)
+            TouristProfile.objects.filter(id__range=(profiles[0].id, profiles[-1].id)).update(created_at=created_at)
+            Incident.objects.filter(profile__gte=profiles[0].id, profile__lte=profiles[-1].id).update(created_at=created_at)
+        # Bulk inserts skip the signals that keep the counters and statistics current
+        dashboard.rebuild()
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                cursor.execute("ANALYZE")
+            elif connection.vendor == "postgresql":
+                cursor.execute("ANALYZE api_touristprofile, api_incident, api_emergencycontact")
+
+    def _render(self, model_admin, view, query, user, repeat):
+        """Best render time and query count of one admin view."""
+        best, queries = None, 0
+        for _ in range(repeat):
+            request = RequestFactory().get("/admin/", query)
+            request.user = user
+            counter = QueryCounter()
+            start = time.perf_counter()
+            with connection.execute_wrapper(counter):
+                if view == "add":
+                    response = model_admin.add_view(request)
+                else:
+                    response = model_admin.changelist_view(request)
+                response.render()
+            elapsed = time.perf_counter() - start
+            assert response.status_code == 200, (model_admin, view, response.status_code)
+            if best is None or elapsed < best:
+                best, queries = elapsed, counter.count
+        return best, queries
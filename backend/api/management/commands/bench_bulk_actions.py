@@ -0,0 +1,102 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api import actions, dashboard, heatmap
+from api.models import AuthorityProfile, Incident, TouristProfile
+
+
+class Rollback(Exception):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = "Time the bulk admin actions against N synthetic rows (rolled back afterwards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        try:
+            with transaction.atomic():
+                self._seed(rows)
+                authorities = AuthorityProfile.objects.filter(authority_id__startswith="bench-")
+                self._run("legacy per-row verify", self._legacy_verify, authorities)
+                authorities.update(is_verified=False)
+                User.objects.filter(authorityprofile__in=authorities).update(is_active=False)
+                self._run("verify_authorities", actions.verify_authorities, authorities)
+                self._run("resolve_incidents", actions.resolve_incidents,
+                          Incident.objects.filter(title="bench"))
+                self._run("deactivate_departed_tourists", actions.deactivate_departed_tourists,
+                          TouristProfile.objects.filter(email__startswith="bench-"))
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _seed(self, rows):
+        self.stdout.write(f"Seeding {rows} users, authorities, tourists and incidents...")
+        users = User.objects.bulk_create(
+            [User(username=f"bench-{i}", is_active=i >= rows) for i in range(rows * 2)],
+            batch_size=1000,
+        )
+        AuthorityProfile.objects.bulk_create(
+            [
+                AuthorityProfile(
+                    user=user, full_name=user.username, official_email=f"{user.username}@example.com",
+                    agency_type="police", agency_name="Bench", authority_id=user.username,
+                )
+                for user in users[:rows]
+            ],
+            batch_size=1000,
+        )
+        departed = timezone.localdate() - timedelta(days=1)
+        profiles = TouristProfile.objects.bulk_create(
+            [
+                TouristProfile(user=user, name=user.username, email=f"{user.username}@example.com",
+                               departure_date=departed)
+                for user in users[rows:]
+            ],
+            batch_size=1000,
+        )
+        Incident.objects.bulk_create(
+            [
+                Incident(profile=profile, title="bench", lat=12.0 + i * 1e-4, lng=77.0 + i * 1e-4,
+                         created_at=timezone.now())
+                for i, profile in enumerate(profiles)
+            ],
+            batch_size=1000,
+        )
+        heatmap.rebuild()
+        dashboard.rebuild()
+
+    def _legacy_verify(self, queryset):
+        queryset.update(is_verified=True)
+        for profile in queryset:
+            if profile.user:
+                profile.user.is_active = True
+                profile.user.save()
+        return queryset.count()
+
+    def _run(self, label, func, queryset):
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            start = time.perf_counter()
+            count = func(queryset)
+            if isinstance(count, list):
+                count = len(count)
+            elapsed = time.perf_counter() - start
+        self.stdout.write(f"{label:32} {count:>7} rows  {elapsed * 1000:9.1f} ms  {queries.count:>6} queries")
@@ -0,0 +1,69 @@
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+
+from api.models import TouristProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Show reads spread over replicas and read-your-writes after a write; run with replicas configured, "
+        "e.g. DJANGO_DB_REPLICAS=/tmp/replica1.sqlite3,/tmp/replica2.sqlite3"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=60, help="Authority dashboard reads")
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("No replicas configured (set DJANGO_DB_REPLICAS)")
+
+        user = User.objects.create(username="db-routing-bench")
+        profile = TouristProfile.objects.create(user=user, name="Routing Bench", email="routing@bench.example",
+                                                phone="+911111111111")
+        try:
+            call_command("refresh_sqlite_replicas", stdout=self.stdout)
+            self._reads(profile, options["requests"])
+            self._read_your_writes(user)
+        finally:
+            profile.delete()
+            user.delete()
+
+    def _counting(self, queries):
+        stack = ExitStack()
+        for alias in ["default", *settings.DATABASE_REPLICAS]:
+            def count(execute, sql, params, many, context, alias=alias):
+                queries[alias] += 1
+                return execute(sql, params, many, context)
+            stack.enter_context(connections[alias].execute_wrapper(count))
+        return stack
+
+    def _reads(self, profile, count):
+        queries = Counter()
+        paths = ["/api/authority/sos-alerts/", f"/api/authority/tourists/{profile.id}/", "/api/authority/dashboard/"]
+        with self._counting(queries):
+            for i in range(count):
+                # A fresh client per request, as with many dashboard users
+                response = Client().get(paths[i % len(paths)])
+                assert response.status_code == 200, response.content[:200]
+        self.stdout.write(f"{count} dashboard reads: " + ", ".join(
+            f"{alias} {queries[alias]} queries" for alias in ["default", *settings.DATABASE_REPLICAS]
+        ))
+
+    def _read_your_writes(self, user):
+        writer, other = Client(), Client()
+        queries = Counter()
+        with self._counting(queries):
+            writer.put("/api/profile/tourist/", {"user_id": user.id, "phone_number": "+912222222222"},
+                       content_type="application/json")
+            writer_sees = writer.get("/api/tourist/profile/", {"user_id": user.id}).json()["phone"]
+            other_sees = other.get("/api/tourist/profile/", {"user_id": user.id}).json()["phone"]
+        self.stdout.write(f"after a write: the writer reads {writer_sees} (primary, pinned by cookie), "
+                          f"another client reads {other_sees} (replica, not refreshed yet)")
+        self.stdout.write("  queries: " + ", ".join(f"{alias} {n}" for alias, n in sorted(queries.items())))
@@ -0,0 +1,113 @@
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+
+from api import archive
+from api.models import Incident, TouristProfile
+from api.views import IncidentViewSet, get_sos_alerts
+
+
+class Rollback(Exception):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = "Time incident reads before and after archiving old resolved incidents (rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--incidents", type=int, default=200000)
+        parser.add_argument("--days", type=int, default=730, help="Spread incidents over this many days")
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        # Segment files go to a scratch directory removed afterwards
+        with tempfile.TemporaryDirectory() as root, override_settings(INCIDENT_ARCHIVE_DIR=root):
+            try:
+                with transaction.atomic():
+                    self._run(options["incidents"], options["days"], options["repeat"])
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def _seed(self, count, days):
+        rng = random.Random(5)
+        profile = TouristProfile.objects.create(name="Archive Bench", email="archive-bench@bench.example")
+        now = timezone.now()
+        for start in range(0, count, 20000):
+            size = min(20000, count - start)
+            incidents = Incident.objects.bulk_create([
+                Incident(profile=profile, title="archive bench", lat=12.97 + rng.uniform(-0.1, 0.1),
+                         lng=77.59 + rng.uniform(-0.1, 0.1), resolved=rng.random() > 0.01)
+                for _ in range(size)
+            ])
+            # auto_now_add overrides created_at on insert; oldest first, a
+            # step every 500 rows
+            for offset in range(0, size, 500):
+                created_at = now - timedelta(days=days * (count - start - offset) / count)
+                Incident.objects.filter(
+                    id__range=(incidents[offset].id, incidents[min(offset + 500, size) - 1].id)
+                ).update(created_at=created_at)
+        # A few open alerts from today
+        Incident.objects.bulk_create([
+            Incident(profile=profile, title="archive bench open", lat=12.97, lng=77.59) for _ in range(50)
+        ])
+
+    def _run(self, count, days, repeat):
+        self.stdout.write(f"Seeding {count:,} incidents over {days} days...")
+        self._seed(count, days)
+        today = timezone.localdate()
+        pages = [
+            ("open SOS alerts", get_sos_alerts, {}),
+            ("incidents, last 7 days", IncidentViewSet.as_view({"get": "list"}),
+             {"from": (today - timedelta(days=7)).isoformat(), "limit": 1000}),
+            ("incidents, one old month", IncidentViewSet.as_view({"get": "list"}),
+             {"from": (today - timedelta(days=days // 2)).isoformat(),
+              "to": (today - timedelta(days=days // 2 - 30)).isoformat(), "limit": 1000}),
+        ]
+        before = {label: self._time(view, query, repeat) for label, view, query in pages}
+        hot_before = Incident.objects.count()
+
+        started = time.perf_counter()
+        moved = archive.archive()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"archive: moved {moved:,} incidents into {len(archive.segments()):,} segments "
+                          f"in {elapsed:.1f} s; hot table {hot_before:,} -> {Incident.objects.count():,} rows")
+
+        for label, view, query in pages:
+            after = self._time(view, query, repeat)
+            assert after[2] == before[label][2], (label, after[2], before[label][2])
+            self.stdout.write(
+                f"{label}: {before[label][2]:,} rows, {before[label][0] * 1000:.0f} ms / {before[label][1]} queries "
+                f"before, {after[0] * 1000:.0f} ms / {after[1]} queries after"
+            )
+
+    def _time(self, view, query, repeat):
+        """Best time, query count and row count of one GET."""
+        best, queries, rows = None, 0, 0
+        for _ in range(repeat):
+            request = RequestFactory().get("/", query)
+            counter = QueryCounter()
+            start = time.perf_counter()
+            with connection.execute_wrapper(counter):
+                response = view(request)
+            elapsed = time.perf_counter() - start
+            assert response.status_code == 200, (view, response.status_code, response.data)
+            if best is None or elapsed < best:
+                data = response.data
+                best, queries, rows = elapsed, counter.count, data["count"] if isinstance(data, dict) else len(data)
+        return best, queries, rows
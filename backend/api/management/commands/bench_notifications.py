@@ -0,0 +1,80 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from api.notifications import Dispatcher, LocalTransport, Notification, WebhookTransport
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled connections are reused
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.requests += 1
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = "Measure notification dispatch throughput with local stand-in transports"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=20000)
+        parser.add_argument("--concurrency", type=int, default=16, help="Senders per channel")
+        parser.add_argument("--latency-ms", type=float, default=2.0, help="Simulated time per send")
+        parser.add_argument("--failure-rate", type=float, default=0.0)
+        parser.add_argument("--http", action="store_true",
+                            help="Send the webhook channel to a local keep-alive HTTP server")
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        concurrency = options["concurrency"]
+        latency = options["latency_ms"] / 1000
+
+        def local():
+            return LocalTransport(concurrency, latency=latency, failure_rate=options["failure_rate"])
+
+        server = None
+        transports = {"email": local(), "sms": local(), "webhook": local()}
+        url = None
+        if options["http"]:
+            server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+            server.daemon_threads = True
+            server.requests = 0
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            url = f"http://127.0.0.1:{server.server_port}/sos"
+            transports["webhook"] = WebhookTransport(concurrency)
+
+        channels = list(transports)
+        notifications = [
+            Notification(channels[i % 3], url if channels[i % 3] == "webhook" and url else f"recipient-{i}",
+                         f"SOS alert #{i}", "bench", {"incident_id": i})
+            for i in range(count)
+        ]
+        dispatcher = Dispatcher(transports, retry_base=0.05, retry_max=0.5)
+        start = time.perf_counter()
+        dispatcher.submit(notifications)
+        submitted = time.perf_counter() - start
+        dispatcher.flush()
+        elapsed = time.perf_counter() - start
+        dispatcher.close()
+        if server:
+            server.shutdown()
+
+        stats = dispatcher.stats
+        self.stdout.write(
+            f"{count} notifications, {concurrency} senders per channel, "
+            f"{options['latency_ms']} ms per send, failure rate {options['failure_rate']}"
+        )
+        self.stdout.write(f"  submit()   {submitted * 1000:8.1f} ms (what the caller waits for)")
+        self.stdout.write(
+            f"  delivered  {elapsed:8.2f} s  {stats['sent'] / elapsed:8.0f}/s  "
+            f"sent {stats['sent']}, retried {stats['retried']}, failed {stats['failed']}"
+        )
+        if server:
+            self.stdout.write(f"  webhook    {server.requests} requests over pooled keep-alive connections")
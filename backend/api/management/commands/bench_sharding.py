@@ -0,0 +1,133 @@
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count
+from django.test import Client
+from django.utils import timezone
+
+from api import sharding
+from api.models import Incident, SyncChange, TouristProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Show region-scoped reads touching one shard and time scatter-gather against serial shard queries; "
+        "run with the sharded profile (DJANGO_SETTINGS_MODULE=backend.settings_sharded) after init_shards"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tourists", type=int, default=5000, help="Tourists (one open incident each) per region")
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        if not sharding.is_sharded():
+            raise CommandError("Only one database configured (use backend.settings_sharded)")
+        regions = {name: config for name, config in settings.SHARD_REGIONS.items() if config.get("bbox")}
+
+        # Shard transactions cannot be rolled back together, so the rows
+        # are deleted afterwards instead
+        seeded = {}
+        try:
+            for name, config in regions.items():
+                with sharding.use_region(name):
+                    seeded[config["database"]] = self._seed(name, config["bbox"], options["tourists"])
+            self._scoped_reads(regions, seeded)
+            self._scatter(options["repeat"])
+        finally:
+            self._clean_up(seeded)
+
+    def _seed(self, region, bbox, count):
+        self.stdout.write(f"Seeding {count} tourists and incidents in {region}...")
+        south, west, north, east = bbox
+        users = User.objects.bulk_create(
+            [User(username=f"shard-bench-{region}-{i}") for i in range(count)], batch_size=1000
+        )
+        profiles = TouristProfile.objects.bulk_create(
+            [
+                TouristProfile(user=user, name=user.username, email=f"{user.username}@bench.example",
+                               nationality=("IN", "GB", "US", "DE")[i % 4], region=region)
+                for i, user in enumerate(users)
+            ],
+            batch_size=1000,
+        )
+        now = timezone.now()
+        Incident.objects.bulk_create(
+            [
+                Incident(profile=profile, title="shard bench", created_at=now,
+                         lat=south + (north - south) * (i % 997) / 997, lng=west + (east - west) * (i % 991) / 991)
+                for i, profile in enumerate(profiles)
+            ],
+            batch_size=1000,
+        )
+        return profiles[0].id
+
+    def _counting(self, queries):
+        stack = ExitStack()
+        for alias in sharding.databases():
+            def count(execute, sql, params, many, context, alias=alias):
+                queries[alias] += 1
+                return execute(sql, params, many, context)
+            stack.enter_context(connections[alias].execute_wrapper(count))
+        return stack
+
+    def _scoped_reads(self, regions, seeded):
+        # Scatter workers use their own connections, which the wrappers
+        # above do not see; scoped reads run inline on this thread
+        for name, config in regions.items():
+            tourist_id = seeded[config["database"]]
+            for path in (f"/api/authority/sos-alerts/?region={name}", f"/api/authority/tourists/{tourist_id}/"):
+                queries = Counter()
+                with self._counting(queries):
+                    response = Client().get(path)
+                assert response.status_code == 200, response.content[:200]
+                self.stdout.write(f"GET {path}: " + ", ".join(
+                    f"{alias} {queries[alias]} queries" for alias in sharding.databases()
+                ))
+
+    def _scatter(self, repeat):
+        def open_alerts(database):
+            return list(Incident.objects.filter(resolved=False).select_related('profile').order_by('-created_at'))
+
+        def by_nationality(database):
+            return list(
+                Incident.objects.filter(resolved=False).values('profile__nationality').annotate(n=Count('id'))
+            )
+
+        for label, func in (("open alerts (rows to Python)", open_alerts),
+                            ("open alerts by nationality (in SQL)", by_nationality)):
+            serial = self._best(repeat, lambda: [self._inline(func, database) for database in sharding.databases()])
+            parallel = self._best(repeat, lambda: sharding.scatter(func))
+            self.stdout.write(f"{label}: serial {serial * 1000:.1f} ms, scatter-gather {parallel * 1000:.1f} ms "
+                              f"over {len(sharding.databases())} shards")
+
+    def _inline(self, func, database):
+        with sharding.use_database(database):
+            return func(database)
+
+    def _best(self, repeat, func):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    def _clean_up(self, seeded):
+        for database in seeded:
+            with sharding.use_database(database):
+                profiles = TouristProfile.objects.filter(email__endswith="@bench.example",
+                                                         user__username__startswith="shard-bench-")
+                profile_ids = list(profiles.values_list('id', flat=True))
+                Incident.objects.filter(profile_id__in=profile_ids).delete()
+                profiles.delete()
+                User.objects.filter(username__startswith="shard-bench-").delete()
+                SyncChange.objects.filter(profile_id__in=profile_ids).delete()
+        # The rows were bulk-created without signals but deleted with them
+        for command in ("rebuild_dashboard_summary", "rebuild_incident_tiles", "rebuild_occupancy"):
+            call_command(command, stdout=self.stdout)
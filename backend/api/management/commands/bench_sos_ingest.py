@@ -0,0 +1,68 @@
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import RequestFactory, override_settings
+
+from api import sos_queue
+from api.models import Incident, IncidentTrailPoint, TouristProfile
+from api.views import create_sos_alert
+
+
+class Command(BaseCommand):
+    help = "Fire a burst of SOS requests at the ingest path and time acks and drain"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=5000)
+        parser.add_argument("--threads", type=int, default=32)
+
+    def handle(self, *args, **options):
+        profile = TouristProfile.objects.exclude(user__isnull=True).first()
+        if profile is None:
+            raise CommandError("Needs at least one tourist profile with a user")
+
+        count = options["count"]
+        factory = RequestFactory()
+
+        def send(i):
+            request = factory.post(
+                "/api/tourist/sos/",
+                {"user_id": profile.user_id, "lat": 12.9 + i * 1e-5, "lng": 77.5, "idempotency_key": f"bench-{i}"},
+                content_type="application/json",
+            )
+            start = time.perf_counter()
+            response = create_sos_alert(request)
+            elapsed = time.perf_counter() - start
+            close_old_connections()
+            return response.status_code, elapsed
+
+        with tempfile.TemporaryDirectory() as queue_dir, \
+                override_settings(SOS_QUEUE_DIR=queue_dir, SOS_QUEUE_DRAIN_IN_PROCESS=False):
+            start = time.perf_counter()
+            with ThreadPoolExecutor(options["threads"]) as pool:
+                # Every key is sent twice to exercise idempotent retries
+                results = list(pool.map(send, [i % count for i in range(count * 2)]))
+            ingest = time.perf_counter() - start
+
+            start = time.perf_counter()
+            drained = sos_queue.drain()
+            drain = time.perf_counter() - start
+
+        failed = sum(1 for code, _ in results if code != 202)
+        latencies = sorted(elapsed for _, elapsed in results)
+        points = IncidentTrailPoint.objects.filter(idempotency_key__startswith=f"{profile.id}:bench-")
+        stored = points.count()
+        created = Incident.objects.filter(id__in=points.values('incident_id'))
+        incidents = created.count()
+
+        self.stdout.write(f"requests:    {len(results)} ({failed} failed) in {ingest:.2f}s "
+                          f"= {len(results) / ingest:.0f}/s")
+        self.stdout.write(f"ack latency: p50 {statistics.median(latencies) * 1000:.1f} ms, "
+                          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+        self.stdout.write(f"drain:       {drained} records -> {stored} alerts coalesced into "
+                          f"{incidents} incidents in {drain:.2f}s")
+
+        created.delete()
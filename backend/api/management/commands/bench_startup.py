@@ -0,0 +1,109 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+PROBE_PATH = "/api/places/nearest/"
+PROBE_QUERY = "lat=0&lng=0"
+
+# Runs in a fresh interpreter so nothing is already imported
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter() - start
+
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+statuses = []
+environ = {
+    "REQUEST_METHOD": "GET", "PATH_INFO": %(path)r, "QUERY_STRING": %(query)r,
+    "SERVER_NAME": "localhost", "SERVER_PORT": "80", "wsgi.url_scheme": "http",
+    "wsgi.input": __import__("io").BytesIO(), "wsgi.errors": sys.stderr,
+}
+b"".join(application(environ, lambda status, headers: statuses.append(status)))
+first_request = time.perf_counter() - start
+
+print(json.dumps({
+    "setup": setup,
+    "first_request": first_request,
+    "status": statuses[0],
+    "modules": len(sys.modules),
+    "loaded": [name for name in %(watch)r if name in sys.modules],
+}))
+"""
+
+# Modules that should only load when something actually needs them
+WATCHED = ["PIL", "django.contrib.admin", "django.contrib.sessions", "django.contrib.messages"]
+
+
+class Command(BaseCommand):
+    help = "Measure import time and time-to-first-request per settings profile against STARTUP_BUDGET_SECONDS"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--settings-module", action="append", dest="profiles",
+                            help="settings profile to measure (repeatable)")
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--importtime", type=int, default=0, metavar="N",
+                            help="also list the N slowest imports of each profile")
+
+    def handle(self, *args, **options):
+        profiles = options["profiles"] or ["backend.settings", "backend.settings_api"]
+        over_budget = []
+        for profile in profiles:
+            runs = [self._run(profile) for _ in range(options["runs"])]
+            wall = statistics.median(run["wall"] for run in runs)
+            setup = statistics.median(run["setup"] for run in runs)
+            first = statistics.median(run["first_request"] for run in runs)
+            last = runs[-1]
+            self.stdout.write(
+                f"{profile:24} process {wall * 1000:6.0f} ms  django.setup {setup * 1000:6.0f} ms  "
+                f"first request {first * 1000:6.0f} ms ({last['status']})  {last['modules']} modules"
+            )
+            if last["loaded"]:
+                self.stdout.write(f"  eagerly loaded: {', '.join(last['loaded'])}")
+            if options["importtime"]:
+                self._importtime(profile, options["importtime"])
+            if profile == "backend.settings_api" and wall > settings.STARTUP_BUDGET_SECONDS:
+                over_budget.append(f"{profile} took {wall:.2f} s")
+
+        if over_budget:
+            raise CommandError(
+                f"Over the startup budget of {settings.STARTUP_BUDGET_SECONDS} s: {'; '.join(over_budget)}"
+            )
+
+    def _child(self, profile, *flags):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=profile)
+        code = CHILD % {"path": PROBE_PATH, "query": PROBE_QUERY, "watch": WATCHED}
+        return subprocess.run(
+            [sys.executable, *flags, "-c", code],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+
+    def _run(self, profile):
+        start = time.perf_counter()
+        result = self._child(profile)
+        wall = time.perf_counter() - start
+        if result.returncode:
+            raise CommandError(f"{profile} failed to start:\n{result.stderr}")
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        data["wall"] = wall
+        return data
+
+    def _importtime(self, profile, limit):
+        result = self._child(profile, "-X", "importtime")
+        rows = []
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            head, cumulative_us, name = line.split("|")
+            rows.append((int(cumulative_us), int(head.split(":")[1]), name.strip()))
+        for cumulative_us, self_us, name in sorted(rows, reverse=True)[:limit]:
+            self.stdout.write(f"  {cumulative_us / 1000:7.1f} ms  (self {self_us / 1000:5.1f} ms)  {name}")
@@ -0,0 +1,125 @@
+import gzip
+import json
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+
+from api import actions
+from api.assets import brotli
+from api.models import EmergencyContact, Incident, Place, TouristProfile
+from api.serializers import PlaceSerializer, TouristProfileSerializer
+from api.views import tourist_sync
+
+
+class Rollback(Exception):
+    pass
+
+
+BBOX = (12.90, 77.50, 13.10, 77.70)
+
+
+class Command(BaseCommand):
+    help = "Compare full snapshots with delta sync for one tourist (seed data is rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--places", type=int, default=3000, help="Places inside the tourist's bbox")
+        parser.add_argument("--others", type=int, default=2000, help="Other tourists, each with an incident")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options["places"], options["others"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, place_count, other_count):
+        rng = random.Random(7)
+        user = User.objects.create(username="sync-bench")
+        profile = TouristProfile.objects.create(
+            user=user, name="Sync Bench", email="sync-bench@bench.example", nationality="India",
+            hotel_name="Bench Hotel", hotel_address="1 MG Road, Bengaluru",
+        )
+        for i in range(5):
+            EmergencyContact.objects.create(profile=profile, name=f"Contact {i}", relation="family", phone=f"+91{i:010}")
+        for i in range(20):
+            Incident.objects.create(profile=profile, title=f"Report {i}", description="Lost wallet near the market",
+                                    lat=12.97, lng=77.59, resolved=True)
+        places = [
+            Place.objects.create(
+                name=f"Place {i}", place_type=rng.choice(["hospital", "police", "restaurant", "hotel"]),
+                description="Open 24 hours", address=f"{i} Bench Street, Bengaluru",
+                lat=rng.uniform(BBOX[0], BBOX[2]), lng=rng.uniform(BBOX[1], BBOX[3]),
+            )
+            for i in range(place_count)
+        ]
+        others = [
+            TouristProfile.objects.create(name=f"Other {i}", email=f"sync-other-{i}@bench.example")
+            for i in range(other_count)
+        ]
+        for other in others:
+            Incident.objects.create(profile=other, title="SOS Alert", lat=12.95, lng=77.6)
+
+        factory = RequestFactory()
+        snapshot = (
+            json.dumps(TouristProfileSerializer(profile).data, default=str)
+            + json.dumps(PlaceSerializer(Place.objects.filter(
+                lat__range=(BBOX[0], BBOX[2]), lng__range=(BBOX[1], BBOX[3])), many=True).data)
+        ).encode()
+        self.stdout.write(f"snapshot (profile + places), uncompressed  {len(snapshot):>10,} bytes")
+        self.stdout.write(f"snapshot, gzip                             {len(gzip.compress(snapshot)):>10,} bytes")
+
+        encoding = "br" if brotli is not None else "gzip"
+        cursor, _, _ = self._sync(factory, user, None, encoding, "full sync")
+
+        # A day's worth of changes while the phone was offline
+        contact = profile.contacts.first()
+        contact.phone = "+910000000999"
+        contact.save()
+        for place in places[:3]:
+            place.description = "Closed for renovation"
+            place.save()
+        places[3].delete()
+        actions.resolve_incidents(Incident.objects.filter(profile__in=others[:200]))
+        Incident.objects.create(profile=profile, title="Harassment", lat=12.98, lng=77.6)
+
+        self._sync(factory, user, cursor, encoding, "delta sync")
+        self._sync(factory, user, cursor, "identity", "delta, uncompressed")
+
+    def _sync(self, factory, user, cursor, encoding, label):
+        queries = [0]
+
+        def count_queries(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        requests = wire = raw = changes = 0
+        has_more = True
+        with connection.execute_wrapper(count_queries):
+            start = time.perf_counter()
+            while has_more:
+                params = {"user_id": user.id, "bbox": ",".join(map(str, BBOX))}
+                if cursor:
+                    params["cursor"] = cursor
+                response = tourist_sync(factory.get("/api/tourist/sync/", params, HTTP_ACCEPT_ENCODING=encoding))
+                body = response.content
+                wire += len(body)
+                if response.get("Content-Encoding") == "br":
+                    body = brotli.decompress(body)
+                elif response.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                raw += len(body)
+                data = json.loads(body)
+                cursor, has_more = data["cursor"], data["has_more"]
+                changes += len(data["changes"])
+                requests += 1
+            elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"{label:20} {changes:5} changes in {requests} requests, {wire:>9,} bytes on the wire "
+            f"({raw:,} JSON, {encoding}), {queries[0]} queries, {elapsed * 1000:.1f} ms"
+        )
+        return cursor, wire, raw
@@ -0,0 +1,121 @@
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory, override_settings
+
+from api import credentials, tourist_ids
+from api.models import TouristCredential, TouristProfile
+from api.views import verify_tourist_id
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Time Tourist ID issuing and checkpoint verification (seed data is rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=5000)
+        parser.add_argument("--revoked", type=float, default=0.1, help="Fraction of credentials revoked")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp, \
+                override_settings(TOURIST_ID_REVOCATION_PATH=f"{tmp}/revoked.bloom"):
+            try:
+                with transaction.atomic():
+                    self._run(options["count"], options["revoked"])
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def _run(self, count, revoked_fraction):
+        TouristProfile.objects.bulk_create(
+            [TouristProfile(name=f"Bench Tourist {i}", email=f"id-bench-{i}@bench.example", nationality="India")
+             for i in range(count)],
+            batch_size=2000,
+        )
+        profiles = list(TouristProfile.objects.filter(email__endswith="@bench.example").order_by('id'))
+
+        start = time.perf_counter()
+        issued = [tourist_ids.issue(profile) for profile in profiles]
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"issue             {count / elapsed:9.0f}/s  ({len(issued[0].token)} character QR payload)")
+
+        step = max(1, round(1 / revoked_fraction)) if revoked_fraction else 0
+        revoked = {c.id for c in issued[::step]} if step else set()
+        tourist_ids.revoke(TouristCredential.objects.filter(id__in=revoked))
+        # on_commit never fires inside the rolled-back transaction
+        tourist_ids.rebuild_revocations()
+        revocations = tourist_ids.get_revocations()
+        tokens = [c.token for c in issued]
+
+        keys = tourist_ids.verification_keys()
+        start = time.perf_counter()
+        for token in tokens:
+            credentials.decode(token, keys)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"decode (library)  {count / elapsed:9.0f}/s  {tourist_ids.signing_key().__class__.__name__}")
+
+        if credentials.Ed25519PrivateKey is not None:
+            self._ed25519(issued)
+
+        self._verify("verify (module)", tokens, revoked, tourist_ids.verify)
+
+        factory = RequestFactory()
+
+        def scan(token):
+            response = verify_tourist_id(factory.post("/api/credentials/verify/", {"token": token},
+                                                      content_type="application/json"))
+            if not response.data["valid"]:
+                raise credentials.InvalidCredential(response.data["reason"])
+
+        self._verify("verify (API view)", tokens, revoked, scan)
+
+        false_positives = sum(1 for serial in range(10 ** 9, 10 ** 9 + 100000) if serial in revocations)
+        self.stdout.write(
+            f"revocation filter {revocations.count} serials in {len(revocations.data)} bytes, "
+            f"{revocations.hashes} hashes, measured false positive rate {false_positives / 100000:.4%}"
+        )
+
+    def _verify(self, label, tokens, revoked, check):
+        queries = [0]
+
+        def count_queries(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        rejected = 0
+        with connection.execute_wrapper(count_queries):
+            start = time.perf_counter()
+            for token in tokens:
+                try:
+                    check(token)
+                except credentials.InvalidCredential:
+                    rejected += 1
+            elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"{label:17} {len(tokens) / elapsed:9.0f}/s  rejected {rejected} of {len(revoked)} revoked, "
+            f"{queries[0]} queries (revocation filter hits only)"
+        )
+
+    def _ed25519(self, issued):
+        from cryptography.hazmat.primitives.serialization import Encoding, NoEncryption, PrivateFormat
+
+        private = credentials.Ed25519PrivateKey.generate().private_bytes(
+            Encoding.Raw, PrivateFormat.Raw, NoEncryption()
+        )
+        key = credentials.Ed25519Key(9, private_key=private)
+        tokens = [
+            credentials.encode(key, c.id, c.profile_id, "Bench Tourist", "India", c.issued_at.timestamp(),
+                               c.expires_at.timestamp())
+            for c in issued
+        ]
+        verifier = {9: credentials.Ed25519Key(9, public_key=key.public_bytes())}
+        start = time.perf_counter()
+        for token in tokens:
+            credentials.decode(token, verifier)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"decode (library)  {len(tokens) / elapsed:9.0f}/s  Ed25519Key ({len(tokens[0])} characters)")
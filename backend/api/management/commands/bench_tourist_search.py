@@ -0,0 +1,83 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api import search
+from api.models import TouristProfile
+
+
+SYLLABLES = ["an", "ra", "mi", "ko", "su", "de", "li", "ta", "ve", "no", "sha", "ru", "ja", "el", "po", "ki"]
+NATIONALITIES = ["India", "France", "Japan", "Germany", "Brazil", "Kenya", "Canada", "Spain"]
+HOTELS = ["Grand Palace", "Lake View", "Sea Breeze", "Hill Top", "City Inn", "Royal Orchid"]
+
+
+class Rollback(Exception):
+    pass
+
+
+def _word(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+class Command(BaseCommand):
+    help = "Time tourist full-text search against N synthetic profiles (rolled back afterwards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                sample = self._seed(options["rows"])
+                name = sample.name.split()[0]
+                typo = name[:2] + ("x" if name[2] != "x" else "y") + name[3:]
+                queries = [
+                    ("full name", sample.name),
+                    ("prefix", name[:4]),
+                    ("typo", typo),
+                    ("email", sample.email),
+                    ("phone (local)", sample.phone[-10:]),
+                    ("name + nationality", f"{name} {sample.nationality}"),
+                ]
+                for label, query in queries:
+                    self._run(label, query, options["repeat"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _seed(self, rows):
+        self.stdout.write(f"Seeding {rows} tourist profiles...")
+        rng = random.Random(7)
+        start = time.perf_counter()
+        profiles = []
+        for i in range(rows):
+            first, last = _word(rng), _word(rng)
+            profiles.append(TouristProfile(
+                name=f"{first} {last}",
+                email=f"{first.lower()}.{last.lower()}{i}@bench.example",
+                phone=f"+91 {rng.randint(6000000000, 9999999999)}",
+                nationality=rng.choice(NATIONALITIES),
+                hotel_name=rng.choice(HOTELS),
+                blockchain_id=f"TID-{i:08d}",
+            ))
+        TouristProfile.objects.bulk_create(profiles, batch_size=2000)
+        self.stdout.write(f"  {time.perf_counter() - start:.1f} s (index maintained by triggers)")
+        return profiles[rows // 2]
+
+    def _run(self, label, query, repeat):
+        hits = search.search_tourists(query)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            search.search_tourists(query)
+        fts_ms = (time.perf_counter() - start) / repeat * 1000
+
+        start = time.perf_counter()
+        scan = search._search_fallback(search.tokens(query), 20)
+        scan_ms = (time.perf_counter() - start) * 1000
+        self.stdout.write(
+            f"{label:20} {query!r:32} {len(hits):>3} hits  fts {fts_ms:7.2f} ms  "
+            f"icontains {scan_ms:8.1f} ms ({len(scan)} hits)"
+        )
@@ -0,0 +1,118 @@
+import math
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api import track_codec, tracks
+from api.models import Incident, TouristProfile, TrackPoint
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Measure track storage and incident trail reads before and after compaction (rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tourists", type=int, default=50)
+        parser.add_argument("--hours", type=float, default=12)
+        parser.add_argument("--interval", type=int, default=5, help="Seconds between pings")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options["tourists"], options["hours"], options["interval"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _walk(self, rng, start, count, interval):
+        """A walker at about 1.4 m/s with a drifting heading and 3 m of GPS noise."""
+        lat, lng = 12.97 + rng.uniform(-0.05, 0.05), 77.59 + rng.uniform(-0.05, 0.05)
+        heading = rng.uniform(0, 2 * math.pi)
+        points = []
+        for i in range(count):
+            heading += rng.gauss(0, 0.3)
+            step = 1.4 * interval if rng.random() > 0.2 else 0  # stops now and then
+            lat += step * math.cos(heading) / 111320
+            lng += step * math.sin(heading) / (111320 * math.cos(math.radians(lat)))
+            noisy_lat = lat + rng.gauss(0, 3) / 111320
+            noisy_lng = lng + rng.gauss(0, 3) / 111320
+            points.append((start + timedelta(seconds=i * interval), noisy_lat, noisy_lng))
+        return points
+
+    def _table_bytes(self):
+        if connection.vendor != "sqlite":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+                "(SELECT name FROM sqlite_master WHERE tbl_name IN ('api_trackpoint', 'api_trackchunk'))"
+            )
+            return cursor.fetchone()[0] or 0
+
+    def _run(self, tourist_count, hours, interval):
+        rng = random.Random(11)
+        per_tourist = int(hours * 3600 / interval)
+        end = timezone.now() - timedelta(hours=1)
+        start = end - timedelta(hours=hours)
+        profiles = [
+            TouristProfile.objects.create(name=f"Track Bench {i}", email=f"track-{i}@bench.example")
+            for i in range(tourist_count)
+        ]
+        base_bytes = self._table_bytes()
+        walks = {}
+        started = time.perf_counter()
+        for profile in profiles:
+            walks[profile.id] = self._walk(rng, start, per_tourist, interval)
+            tracks.record((profile.id, at, lat, lng) for at, lat, lng in walks[profile.id])
+        elapsed = time.perf_counter() - started
+        total = tourist_count * per_tourist
+        self.stdout.write(f"{total:,} pings ({tourist_count} tourists x {hours:g} h every {interval} s), "
+                          f"buffered in {elapsed:.1f} s")
+
+        target = profiles[0]
+        middle = walks[target.id][per_tourist // 2]
+        incident = Incident.objects.create(profile=target, title="SOS Alert", lat=middle[1], lng=middle[2])
+        Incident.objects.filter(id=incident.id).update(created_at=middle[0], last_seen_at=middle[0])
+        incident.refresh_from_db()
+        window = tracks.incident_window(incident)
+
+        raw_bytes = self._table_bytes()
+        self._reads("raw rows", target.id, window)
+
+        started = time.perf_counter()
+        packed, written = tracks.compact(now=timezone.now())
+        elapsed = time.perf_counter() - started
+        chunk_bytes = self._table_bytes()
+        self.stdout.write(f"compact: {packed:,} pings into {written:,} chunks in {elapsed:.1f} s")
+        if raw_bytes is not None:
+            self.stdout.write(
+                f"storage: rows {(raw_bytes - base_bytes) / total:.1f} bytes/ping, "
+                f"chunks {(chunk_bytes - base_bytes) / total:.1f} bytes/ping (tables and indexes)"
+            )
+        self._reads("chunks", target.id, window)
+
+        # Quantization error of the codec
+        original = [(int(at.timestamp()), lat, lng) for at, lat, lng in walks[target.id]]
+        decoded = track_codec.decode(track_codec.encode(original))
+        error = max(max(abs(a[1] - b[1]), abs(a[2] - b[2])) for a, b in zip(original, decoded))
+        self.stdout.write(f"codec: {len(track_codec.encode(original)) / len(original):.2f} bytes/ping, "
+                          f"max error {error * 111320:.2f} m")
+        assert TrackPoint.objects.filter(profile__in=profiles).count() == 0
+
+    def _reads(self, label, profile_id, window):
+        for zoom in (None, 18, 16, 14):
+            runs = 20
+            started = time.perf_counter()
+            for _ in range(runs):
+                points = tracks.thin(tracks.track(profile_id, *window), zoom)
+            elapsed = (time.perf_counter() - started) / runs
+            self.stdout.write(
+                f"incident trail ({label:8}) zoom {str(zoom or '-'):>2}: {len(points):5} points, {elapsed * 1000:6.2f} ms"
+            )
@@ -0,0 +1,111 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+PROBE_PATH = "/api/places/nearest/?lat=0&lng=0"
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except FileNotFoundError:
+        return []
+
+
+def _memory_kb(pid):
+    """(rss, pss) in KiB; PSS splits shared pages between the processes mapping them."""
+    rss = pss = 0
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                rss = int(line.split()[1])
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                pss = int(line.split()[1])
+    return rss, pss
+
+
+class Command(BaseCommand):
+    help = "Measure gunicorn startup time and per-worker memory with and without preload (Linux only)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--mode", choices=["preload", "no-preload", "both"], default="both")
+        parser.add_argument("--requests", type=int, default=200, help="requests sent before measuring memory")
+
+    def handle(self, *args, **options):
+        if not os.path.exists("/proc/self/smaps_rollup"):
+            raise CommandError("This benchmark reads /proc and only runs on Linux")
+        modes = ["preload", "no-preload"] if options["mode"] == "both" else [options["mode"]]
+        for mode in modes:
+            self._run(mode, options["workers"], options["requests"])
+
+    def _run(self, mode, workers, requests):
+        port = _free_port()
+        env = dict(os.environ, GUNICORN_PRELOAD="1" if mode == "preload" else "0")
+        env.setdefault("DJANGO_SETTINGS_MODULE", os.environ.get("DJANGO_SETTINGS_MODULE", "backend.settings"))
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [
+                sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+                "--bind", f"127.0.0.1:{port}", "--workers", str(workers),
+                "--access-logfile", "/dev/null", "backend.wsgi",
+            ],
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            url = f"http://127.0.0.1:{port}{PROBE_PATH}"
+            first = self._wait_for(url, server)
+            startup = time.perf_counter() - start
+            while len(_children(server.pid)) < workers:
+                time.sleep(0.05)
+            ready = time.perf_counter() - start
+            for _ in range(requests):
+                urllib.request.urlopen(url).read()
+
+            master = _memory_kb(server.pid)
+            rows = [_memory_kb(pid) for pid in _children(server.pid)]
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+
+        self.stdout.write(f"{mode}: first response {startup:.2f} s ({first * 1000:.0f} ms request), "
+                          f"all {workers} workers up {ready:.2f} s")
+        self.stdout.write(f"  master      RSS {master[0] / 1024:7.1f} MiB  PSS {master[1] / 1024:7.1f} MiB")
+        for i, (rss, pss) in enumerate(rows):
+            self.stdout.write(f"  worker {i:<4} RSS {rss / 1024:7.1f} MiB  PSS {pss / 1024:7.1f} MiB")
+        total_pss = master[1] + sum(pss for _, pss in rows)
+        self.stdout.write(f"  total PSS {total_pss / 1024:.1f} MiB, "
+                          f"{(total_pss - master[1]) / 1024 / max(len(rows), 1):.1f} MiB per worker")
+
+    def _wait_for(self, url, server, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"gunicorn exited with status {server.returncode}")
+            try:
+                start = time.perf_counter()
+                urllib.request.urlopen(url, timeout=5).read()
+                return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.05)
+        raise CommandError("gunicorn did not answer in time")
@@ -0,0 +1,36 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.geocoding import write_gazetteer
+
+
+class Command(BaseCommand):
+    help = "Pack a GeoNames dump (e.g. cities1000.txt) into the memory-mapped gazetteer file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="GeoNames tab-separated dump")
+        parser.add_argument("--min-population", type=int, default=0)
+        parser.add_argument("--output", default=str(settings.GAZETTEER_PATH))
+
+    def handle(self, *args, **options):
+        places = []
+        with open(options["source"], encoding="utf-8") as f:
+            for line in f:
+                # geonameid, name, asciiname, alternatenames, lat, lng, class, code, country, ..., population
+                cols = line.rstrip("\n").split("\t")
+                if len(cols) < 15:
+                    continue
+                population = int(cols[14] or 0)
+                if population < options["min_population"]:
+                    continue
+                places.append((cols[1], float(cols[4]), float(cols[5]), cols[8]))
+
+        output = options["output"]
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        # Write next to the target and swap, so running workers keep their mapping
+        tmp = f"{output}.tmp"
+        count = write_gazetteer(tmp, places)
+        os.replace(tmp, output)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} places to {output}"))
@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import poi_store
+
+
+class Command(BaseCommand):
+    help = "Rebuild the memory-mapped Place store used by geofence and nearest-place lookups"
+
+    def handle(self, *args, **options):
+        count = poi_store.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} places to {settings.POI_STORE_PATH}"))
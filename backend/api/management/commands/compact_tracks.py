@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from api import sharding, tracks
+
+
+class Command(BaseCommand):
+    help = "Pack buffered location pings into compressed track chunks (run every few minutes)"
+
+    def handle(self, *args, **options):
+        results = sharding.scatter(lambda database: tracks.compact())
+        packed, written = (sum(counts) for counts in zip(*results))
+        self.stdout.write(self.style.SUCCESS(f"Packed {packed} pings into {written} track chunks"))
@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import notifications, sos_queue
+
+
+class Command(BaseCommand):
+    help = "Drain the durable SOS queue into Incident rows (run when in-process draining is off)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain what is queued and exit")
+
+    def handle(self, *args, **options):
+        polled = 0
+        while True:
+            drained = sos_queue.drain()
+            if drained:
+                self.stdout.write(f"Drained {drained} SOS alerts")
+            if options["once"] or time.monotonic() - polled >= settings.NOTIFY_POLL_SECONDS:
+                polled = time.monotonic()
+                notifications.deliver_due()
+            if options["once"]:
+                # Let the SOS fan-out finish before the process exits
+                notifications.flush(timeout=60)
+                break
+            time.sleep(settings.SOS_QUEUE_DRAIN_INTERVAL)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from api import photos
+
+
+class Command(BaseCommand):
+    help = "Recount photo references and delete stored photos no profile uses"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grace-seconds", type=int, default=3600,
+                            help="keep unreferenced files younger than this (uploads still in flight)")
+        parser.add_argument("--rehome-legacy", action="store_true",
+                            help="first move photos saved before content addressing into the blob store")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        if options["rehome_legacy"] and not options["dry_run"]:
+            moved = photos.rehome_legacy_photos()
+            self.stdout.write(f"Re-stored {moved} legacy photos")
+        if not options["dry_run"]:
+            blobs = photos.recount()
+            self.stdout.write(f"Recounted references for {blobs} blobs")
+        deleted, freed = photos.collect_garbage(options["grace_seconds"], dry_run=options["dry_run"])
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {deleted} unreferenced files ({freed / 1024:.0f} KiB)"))
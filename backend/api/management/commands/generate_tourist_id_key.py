@@ -0,0 +1,20 @@
+import base64
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import credentials
+
+
+class Command(BaseCommand):
+    help = "Print a new Ed25519 key pair for signing Tourist ID credentials"
+
+    def handle(self, *args, **options):
+        if credentials.Ed25519PrivateKey is None:
+            raise CommandError("Ed25519 keys need the 'cryptography' package")
+        from cryptography.hazmat.primitives.serialization import Encoding, NoEncryption, PrivateFormat
+
+        private_key = credentials.Ed25519PrivateKey.generate()
+        private_bytes = private_key.private_bytes(Encoding.Raw, PrivateFormat.Raw, NoEncryption())
+        key = credentials.Ed25519Key(0, private_key=private_bytes)
+        self.stdout.write(f'TOURIST_ID_ED25519_PRIVATE_KEY = "{base64.b64encode(private_bytes).decode()}"')
+        self.stdout.write(f"# public key: {base64.b64encode(key.public_bytes()).decode()}")
@@ -0,0 +1,45 @@
+from django.apps import apps
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import AutoField
+
+from api import sharding
+
+
+class Command(BaseCommand):
+    help = "Migrate every shard database and start its id sequences at the shard's id range"
+
+    def handle(self, *args, **options):
+        models = [
+            model for model in apps.get_models()
+            if sharding.is_sharded_model(model) and isinstance(model._meta.pk, AutoField)
+        ]
+        for database in sharding.databases():
+            call_command("migrate", database=database, verbosity=0)
+            if database == DEFAULT_DB_ALIAS:
+                continue
+            start, end = sharding.id_range(database)
+            with connections[database].cursor() as cursor:
+                for model in models:
+                    self._seed(cursor, connections[database].vendor, model._meta.db_table, start)
+            self.stdout.write(f"{database}: ids {start}-{end}")
+        self.stdout.write(self.style.SUCCESS(f"Initialised {len(sharding.databases())} shard databases"))
+
+    def _seed(self, cursor, vendor, table, start):
+        """Make the next id of ``table`` at least ``start``."""
+        if vendor == "sqlite":
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", [table])
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)", [table, start - 1])
+            elif row[0] < start - 1:
+                cursor.execute("UPDATE sqlite_sequence SET seq = %s WHERE name = %s", [start - 1, table])
+        elif vendor == "postgresql":
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                f"GREATEST(%s, (SELECT COALESCE(MAX(id), 0) FROM {cursor.db.ops.quote_name(table)})))",
+                [table, start - 1],
+            )
+        else:
+            raise NotImplementedError(f"Cannot seed id sequences on {vendor}")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api import sharding, sync
+
+
+class Command(BaseCommand):
+    help = "Drop sync tombstones older than SYNC_TOMBSTONE_DAYS (clients older than that resync in full)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None)
+
+    def handle(self, *args, **options):
+        count = sum(sharding.scatter(lambda database: sync.prune(options["days"])))
+        self.stdout.write(self.style.SUCCESS(f"Pruned {count} sync tombstones"))
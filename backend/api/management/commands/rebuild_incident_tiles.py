@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from api import heatmap, sharding
+
+
+class Command(BaseCommand):
+    help = "Recompute the incident heatmap rollup from the Incident table"
+
+    def handle(self, *args, **options):
+        # Each shard rolls up its own incidents
+        cells = sum(sharding.scatter(lambda database: heatmap.rebuild()))
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt incident rollup: {cells} tile/day cells"))
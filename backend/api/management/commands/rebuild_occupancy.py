@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from api import occupancy, sharding
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-day occupancy rollup from the TouristProfile table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--geocode",
+            action="store_true",
+            help="Geocode every profile's destination again first (e.g. after build_gazetteer)",
+        )
+
+    def handle(self, *args, **options):
+        if options["geocode"]:
+            changed = sum(sharding.scatter(lambda database: occupancy.geocode_profiles()))
+            self.stdout.write(f"Updated the destination tile of {changed} profiles")
+        # Each shard rolls up its own tourists
+        cells = sum(sharding.scatter(lambda database: occupancy.rebuild()))
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt occupancy rollup: {cells} tile/day cells"))
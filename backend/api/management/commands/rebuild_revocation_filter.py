@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api import tourist_ids
+
+
+class Command(BaseCommand):
+    help = "Rewrite the Tourist ID revocation filter (drops credentials that have expired)"
+
+    def handle(self, *args, **options):
+        count = tourist_ids.rebuild_revocations()
+        self.stdout.write(self.style.SUCCESS(f"Revocation filter lists {count} credentials"))
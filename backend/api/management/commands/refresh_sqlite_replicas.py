@@ -0,0 +1,32 @@
+import os
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = "Copy the SQLite primary over each SQLite replica (stand-in for replication in local setups)"
+
+    def handle(self, *args, **options):
+        primary = connections["default"].settings_dict
+        if primary["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError("Only SQLite primaries can be copied; use the database's own replication")
+        for alias in settings.DATABASE_REPLICAS:
+            replica = connections[alias].settings_dict
+            if replica["ENGINE"] != "django.db.backends.sqlite3":
+                continue
+            connections[alias].close()
+            path = str(replica["NAME"])
+            tmp = f"{path}.{os.getpid()}.tmp"
+            source = sqlite3.connect(str(primary["NAME"]))
+            target = sqlite3.connect(tmp)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+            # Open connections keep reading the old copy until they reconnect
+            os.replace(tmp, path)
+            self.stdout.write(f"{alias}: copied {os.path.getsize(path):,} bytes to {path}")
@@ -0,0 +1,32 @@
+# Generated by Django 4.2 on 2026-10-19 16:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_touristprofile_arrival_date_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IncidentTile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tile_x', models.IntegerField()),
+                ('tile_y', models.IntegerField()),
+                ('day', models.DateField()),
+                ('total', models.IntegerField(default=0)),
+                ('unresolved', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='incidenttile',
+            index=models.Index(fields=['day', 'tile_x', 'tile_y'], name='api_inciden_day_e701ad_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='incidenttile',
+            unique_together={('tile_x', 'tile_y', 'day')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 17:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_incident_lifecycle'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incident',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
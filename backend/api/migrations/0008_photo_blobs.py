@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-19 17:23
+
+import api.photo_storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_sos_coalescing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotoBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.BigIntegerField(default=0)),
+                ('ref_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='touristprofile',
+            name='profile_photo',
+            field=models.ImageField(blank=True, null=True, storage=api.photo_storage.get_photo_storage, upload_to='tourist_photos/'),
+        ),
+        migrations.AddIndex(
+            model_name='photoblob',
+            index=models.Index(fields=['ref_count'], name='api_photobl_ref_cou_b3602a_idx'),
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Full-text index over tourist profiles (SQLite FTS5), kept in sync by triggers
+
+from django.db import migrations
+
+
+DIGITS = "replace(replace(replace(replace(replace(coalesce({row}.phone, ''), ' ', ''), '-', ''), '+', ''), '(', ''), ')', '')"
+# Digits with and without the country code, so local numbers match as a prefix
+PHONE_DIGITS = f"{DIGITS} || ' ' || substr({DIGITS}, -10)"
+
+COLUMNS = "name, email, phone, nationality, country, hotel_name, blockchain_id"
+# Words for typo correction: the free-text columns only, so the vocabulary
+# is not swamped by one-off email, phone and ID tokens
+WORDS = "coalesce({row}.name, '') || ' ' || coalesce({row}.nationality, '') || ' ' || coalesce({row}.country, '') || ' ' || coalesce({row}.hotel_name, '')"
+
+
+def _values(row):
+    return (
+        f"{row}.id, {row}.name, {row}.email, {PHONE_DIGITS.format(row=row)}, {row}.nationality, "
+        f"{row}.country, {row}.hotel_name, {row}.blockchain_id"
+    )
+
+
+TABLES = [
+    f"""
+    CREATE VIRTUAL TABLE api_touristsearch USING fts5(
+        {COLUMNS},
+        tokenize = "unicode61 remove_diacritics 2",
+        prefix = '2 3'
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE api_touristwords USING fts5(
+        words,
+        tokenize = "unicode61 remove_diacritics 2",
+        detail = none
+    )
+    """,
+]
+
+FILL = [
+    f"INSERT INTO api_touristsearch(rowid, {COLUMNS}) SELECT {_values('p')} FROM api_touristprofile p",
+    f"INSERT INTO api_touristwords(rowid, words) SELECT p.id, {WORDS.format(row='p')} FROM api_touristprofile p",
+]
+
+TRIGGERS = [
+    f"""
+    CREATE TRIGGER api_touristsearch_ai AFTER INSERT ON api_touristprofile BEGIN
+        INSERT INTO api_touristsearch(rowid, {COLUMNS}) VALUES ({_values('new')});
+        INSERT INTO api_touristwords(rowid, words) VALUES (new.id, {WORDS.format(row='new')});
+    END
+    """,
+    """
+    CREATE TRIGGER api_touristsearch_ad AFTER DELETE ON api_touristprofile BEGIN
+        DELETE FROM api_touristsearch WHERE rowid = old.id;
+        DELETE FROM api_touristwords WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER api_touristsearch_au AFTER UPDATE OF {COLUMNS} ON api_touristprofile BEGIN
+        DELETE FROM api_touristsearch WHERE rowid = old.id;
+        INSERT INTO api_touristsearch(rowid, {COLUMNS}) VALUES ({_values('new')});
+        DELETE FROM api_touristwords WHERE rowid = old.id;
+        INSERT INTO api_touristwords(rowid, words) VALUES (new.id, {WORDS.format(row='new')});
+    END
+    """,
+]
+
+FORWARD = TABLES + FILL + TRIGGERS
+
+BACKWARD = [
+    "DROP TRIGGER IF EXISTS api_touristsearch_au",
+    "DROP TRIGGER IF EXISTS api_touristsearch_ad",
+    "DROP TRIGGER IF EXISTS api_touristsearch_ai",
+    "DROP TABLE IF EXISTS api_touristwords",
+    "DROP TABLE IF EXISTS api_touristsearch",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # Other databases fall back to icontains lookups in api.search
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_photo_blobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(FORWARD), _run(BACKWARD)),
+    ]
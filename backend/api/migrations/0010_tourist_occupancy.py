@@ -0,0 +1,49 @@
+# Generated by Django 4.2 on 2026-10-19 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_tourist_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegionOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tile_x', models.IntegerField()),
+                ('tile_y', models.IntegerField()),
+                ('day', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='touristprofile',
+            name='region_x',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='touristprofile',
+            name='region_y',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='touristprofile',
+            index=models.Index(fields=['region_x', 'region_y', 'arrival_date', 'departure_date'], name='api_tourist_region__92f04f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='touristprofile',
+            index=models.Index(fields=['departure_date', 'arrival_date'], name='api_tourist_departu_b94b9c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='regionoccupancy',
+            index=models.Index(fields=['day', 'tile_x', 'tile_y'], name='api_regiono_day_811de1_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='regionoccupancy',
+            unique_together={('tile_x', 'tile_y', 'day')},
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2 on 2026-10-19 17:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_tourist_occupancy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TouristCredential',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key_id', models.PositiveSmallIntegerField()),
+                ('token', models.CharField(blank=True, max_length=300)),
+                ('issued_at', models.DateTimeField()),
+                ('expires_at', models.DateTimeField()),
+                ('revoked_at', models.DateTimeField(blank=True, null=True)),
+                ('profile', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='credentials', to='api.touristprofile')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='touristcredential',
+            index=models.Index(fields=['revoked_at', 'expires_at'], name='api_tourist_revoked_0b1bd4_idx'),
+        ),
+    ]
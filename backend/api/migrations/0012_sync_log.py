@@ -0,0 +1,42 @@
+# Generated by Django 4.2 on 2026-10-19 17:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_tourist_credentials'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('profile', 'Tourist profile'), ('contact', 'Emergency contact'), ('place', 'Place'), ('incident', 'Incident')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('profile_id', models.BigIntegerField(blank=True, null=True)),
+                ('lat', models.FloatField(blank=True, null=True)),
+                ('lng', models.FloatField(blank=True, null=True)),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='syncchange',
+            index=models.Index(fields=['profile_id', 'id'], name='api_synccha_profile_6ffcb1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='syncchange',
+            index=models.Index(fields=['kind', 'lat', 'lng'], name='api_synccha_kind_857fdc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='syncchange',
+            index=models.Index(fields=['kind', 'object_id'], name='api_synccha_kind_27aabe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='syncchange',
+            index=models.Index(fields=['deleted', 'changed_at'], name='api_synccha_deleted_27f805_idx'),
+        ),
+    ]
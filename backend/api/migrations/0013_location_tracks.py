@@ -0,0 +1,51 @@
+# Generated by Django 4.2 on 2026-10-19 17:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_sync_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackPoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField()),
+                ('lat', models.FloatField()),
+                ('lng', models.FloatField()),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='track_points', to='api.touristprofile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TrackChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_at', models.DateTimeField()),
+                ('end_at', models.DateTimeField()),
+                ('point_count', models.PositiveIntegerField()),
+                ('min_lat', models.FloatField()),
+                ('min_lng', models.FloatField()),
+                ('max_lat', models.FloatField()),
+                ('max_lng', models.FloatField()),
+                ('data', models.BinaryField()),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='track_chunks', to='api.touristprofile')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='trackpoint',
+            index=models.Index(fields=['profile', 'recorded_at'], name='api_trackpo_profile_2fc8f9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trackpoint',
+            index=models.Index(fields=['recorded_at'], name='api_trackpo_recorde_f3751f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trackchunk',
+            index=models.Index(fields=['profile', 'start_at'], name='api_trackch_profile_b01506_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2 on 2026-10-19 18:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_location_tracks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='touristprofile',
+            name='region',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='incident',
+            name='assigned_to',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='assigned_incidents', to='api.authorityprofile'),
+        ),
+        migrations.AlterField(
+            model_name='incidentevent',
+            name='authority',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.authorityprofile'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-19 18:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_regional_shards'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='authorityprofile',
+            index=models.Index(fields=['created_at'], name='api_authori_created_4594f4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['created_at'], name='api_inciden_created_5e554b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['resolved', 'created_at'], name='api_inciden_resolve_9f0f51_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='touristprofile',
+            index=models.Index(fields=['nationality', 'created_at'], name='api_tourist_nationa_93cfa1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='touristprofile',
+            index=models.Index(fields=['created_at'], name='api_tourist_created_3aa9b2_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# SOS idempotency keys are stored as "<profile id>:<key>" so one tourist's
+# key cannot shadow another's
+
+from django.db import migrations, models
+from django.db.models import CharField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat
+
+
+def _scoped(profile_id):
+    return Concat(Cast(profile_id, CharField()), Value(":"), "idempotency_key", output_field=CharField())
+
+
+def scope_keys(apps, schema_editor):
+    database = schema_editor.connection.alias
+    Incident = apps.get_model("api", "Incident")
+    IncidentTrailPoint = apps.get_model("api", "IncidentTrailPoint")
+    Incident.objects.using(database).filter(idempotency_key__isnull=False).update(
+        idempotency_key=_scoped("profile_id")
+    )
+    profile_id = Incident.objects.using(database).filter(id=OuterRef("incident_id")).values("profile_id")[:1]
+    IncidentTrailPoint.objects.using(database).filter(idempotency_key__isnull=False).update(
+        idempotency_key=_scoped(Subquery(profile_id))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0016_incident_archive"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="incident",
+            name="idempotency_key",
+            field=models.CharField(blank=True, max_length=96, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name="incidenttrailpoint",
+            name="idempotency_key",
+            field=models.CharField(blank=True, max_length=96, null=True, unique=True),
+        ),
+        migrations.RunPython(scope_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2 on 2026-10-19 19:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_sos_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='incidentevent',
+            name='incident',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='events', to='api.incident'),
+        ),
+        migrations.AlterField(
+            model_name='incidentevent',
+            name='kind',
+            field=models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('acknowledged', 'Acknowledged'), ('assigned', 'Assigned'), ('resolved', 'Resolved'), ('deleted', 'Deleted')], max_length=20),
+        ),
+    ]
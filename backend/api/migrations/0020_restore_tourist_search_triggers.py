@@ -0,0 +1,28 @@
+# 0014 added TouristProfile.region, and SQLite adds a NOT NULL column by
+# rebuilding the table, which drops the search triggers from 0009. Put
+# them back and re-index the profiles written since.
+
+from importlib import import_module
+
+from django.db import migrations
+
+tourist_search = import_module("api.migrations.0009_tourist_search")
+
+RESTORE = [
+    "DROP TRIGGER IF EXISTS api_touristsearch_au",
+    "DROP TRIGGER IF EXISTS api_touristsearch_ad",
+    "DROP TRIGGER IF EXISTS api_touristsearch_ai",
+    "DELETE FROM api_touristsearch",
+    "DELETE FROM api_touristwords",
+] + tourist_search.FILL + tourist_search.TRIGGERS
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_keep_deleted_incident_events'),
+    ]
+
+    operations = [
+        migrations.RunPython(tourist_search._run(RESTORE), migrations.RunPython.noop),
+    ]
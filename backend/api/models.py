@@ -1,5 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .photo_storage import get_photo_storage
 
 
 # -----------------------------------------
@@ -23,7 +26,7 @@ class TouristProfile(models.Model):
     country = models.CharField(max_length=100, blank=True)
     nationality = models.CharField(max_length=100, blank=True)
     current_location = models.CharField(max_length=200, blank=True)
-    profile_photo = models.ImageField(upload_to='tourist_photos/', blank=True, null=True)
+    profile_photo = models.ImageField(upload_to='tourist_photos/', storage=get_photo_storage, blank=True, null=True)
     blockchain_id = models.CharField(max_length=200, blank=True)
     # Travel Details
     from_address = models.TextField(blank=True)  # Origin
@@ -32,13 +35,59 @@ class TouristProfile(models.Model):
     departure_date = models.DateField(null=True, blank=True)
     hotel_name = models.CharField(max_length=200, blank=True)
     hotel_address = models.TextField(blank=True)
+    # Destination tile at occupancy.REGION_ZOOM, geocoded from the hotel
+    # or destination address when the profile is saved
+    region_x = models.IntegerField(null=True, blank=True)
+    region_y = models.IntegerField(null=True, blank=True)
+    # SHARD_REGIONS entry whose database holds the profile (see api.sharding)
+    region = models.CharField(max_length=50, blank=True)
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # "Who is in this area on day D": tile range, then the stay window
+            models.Index(fields=['region_x', 'region_y', 'arrival_date', 'departure_date']),
+            # Same question without an area; departure_date >= D skips past trips
+            models.Index(fields=['departure_date', 'arrival_date']),
+            # Admin changelist: nationality filter and date hierarchy
+            models.Index(fields=['nationality', 'created_at']),
+            models.Index(fields=['created_at']),
+        ]
+
     def __str__(self):
         return self.name
 
 
+# -----------------------------------------
+# Tourist ID Credentials
+# -----------------------------------------
+class TouristCredential(models.Model):
+    """A signed Tourist ID (see api.credentials); the id is the credential serial.
+
+    Rows outlive their profile (profile is set to NULL) so that a deleted
+    tourist's credentials stay in the revocation filter until they expire.
+    """
+    profile = models.ForeignKey(
+        TouristProfile,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='credentials'
+    )
+    key_id = models.PositiveSmallIntegerField()
+    token = models.CharField(max_length=300, blank=True)
+    issued_at = models.DateTimeField()
+    expires_at = models.DateTimeField()
+    revoked_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['revoked_at', 'expires_at'])]
+
+    def __str__(self):
+        return f"Tourist ID #{self.id} ({self.profile_id})"
+
+
 # -----------------------------------------
 # Emergency Contacts
 # -----------------------------------------
@@ -87,11 +136,105 @@ class Incident(models.Model):
     lng = models.FloatField()
     evidence = models.TextField(blank=True)  # store links, JSON, etc.
     resolved = models.BooleanField(default=False)
+    # Lifecycle
+    acknowledged_at = models.DateTimeField(null=True, blank=True)
+    # Authorities are national and may live in another database (api.sharding)
+    assigned_to = models.ForeignKey(
+        'AuthorityProfile',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='assigned_incidents',
+        db_constraint=False
+    )
+    resolved_at = models.DateTimeField(null=True, blank=True)
+    version = models.PositiveIntegerField(default=0)  # Bumped on every change (compare-and-set)
+    # Client retry key, "<profile id>:<key>" (actions.stored_key)
+    idempotency_key = models.CharField(max_length=96, unique=True, null=True, blank=True)
+    # Repeated SOS from the same tourist are coalesced into one incident
+    hit_count = models.PositiveIntegerField(default=1)
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Admin date hierarchy, and the open/resolved filter with it
+            models.Index(fields=['created_at']),
+            models.Index(fields=['resolved', 'created_at']),
+        ]
 
     def __str__(self):
         return f"{self.title} @ {self.created_at.strftime('%Y-%m-%d %H:%M')}"
 
 
+class IncidentTrailPoint(models.Model):
+    """One SOS ping merged into an incident, oldest first."""
+    incident = models.ForeignKey(
+        Incident,
+        on_delete=models.CASCADE,
+        related_name='trail'
+    )
+    lat = models.FloatField()
+    lng = models.FloatField()
+    recorded_at = models.DateTimeField()
+    idempotency_key = models.CharField(max_length=96, unique=True, null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.incident_id} @ {self.lat:.5f}, {self.lng:.5f}"
+
+
+INCIDENT_EVENT_KINDS = (
+    ('created', 'Created'),
+    ('updated', 'Updated'),
+    ('acknowledged', 'Acknowledged'),
+    ('assigned', 'Assigned'),
+    ('resolved', 'Resolved'),
+    ('deleted', 'Deleted'),
+)
+
+
+class IncidentEvent(models.Model):
+    """Append-only change log behind the SOS alert delta feed."""
+    # Not cascaded, so the 'deleted' event outlives its incident
+    incident = models.ForeignKey(
+        Incident,
+        on_delete=models.DO_NOTHING,
+        null=True,
+        related_name='events',
+        db_constraint=False
+    )
+    kind = models.CharField(max_length=20, choices=INCIDENT_EVENT_KINDS)
+    authority = models.ForeignKey(
+        'AuthorityProfile',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_constraint=False
+    )
+    version = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.incident_id} {self.kind} v{self.version}"
+
+
+class IncidentArchiveSegment(models.Model):
+    """One gzipped NDJSON file of archived incidents (see api.archive)."""
+    month = models.DateField()  # First day of the month its incidents were created in
+    path = models.CharField(max_length=255, unique=True)  # Relative to INCIDENT_ARCHIVE_DIR
+    first_id = models.BigIntegerField()
+    last_id = models.BigIntegerField()
+    first_created_at = models.DateTimeField()
+    last_created_at = models.DateTimeField()
+    rows = models.PositiveIntegerField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['last_created_at'])]
+
+    def __str__(self):
+        return self.path
+
+
 # -----------------------------------------
 # Authority Profile
 # -----------------------------------------
@@ -118,5 +261,200 @@ class AuthorityProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['created_at'])]  # Admin date hierarchy
+
     def __str__(self):
         return f"{self.full_name} - {self.agency_name}"
+
+
+# -----------------------------------------
+# Incident Heatmap Rollup
+# -----------------------------------------
+class IncidentTile(models.Model):
+    """Incident counts per map tile (at MAX_TILE_ZOOM) and day."""
+    tile_x = models.IntegerField()
+    tile_y = models.IntegerField()
+    day = models.DateField()
+    total = models.IntegerField(default=0)
+    unresolved = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('tile_x', 'tile_y', 'day')
+        indexes = [
+            models.Index(fields=['day', 'tile_x', 'tile_y']),
+        ]
+
+    def __str__(self):
+        return f"{self.tile_x}/{self.tile_y} @ {self.day}: {self.total}"
+
+
+# -----------------------------------------
+# Occupancy Rollup
+# -----------------------------------------
+class RegionOccupancy(models.Model):
+    """Tourists staying in a destination tile (at REGION_ZOOM) on a day."""
+    tile_x = models.IntegerField()
+    tile_y = models.IntegerField()
+    day = models.DateField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('tile_x', 'tile_y', 'day')
+        indexes = [
+            models.Index(fields=['day', 'tile_x', 'tile_y']),
+        ]
+
+    def __str__(self):
+        return f"{self.tile_x}/{self.tile_y} @ {self.day}: {self.count}"
+
+
+# -----------------------------------------
+# Dashboard Summary
+# -----------------------------------------
+class DashboardCounter(models.Model):
+    """Named counter behind the dashboard summary, updated by signals.
+
+    Keys: "tourists", "incidents", "open_alerts", "nationality:<name>",
+    "arrivals:<YYYY-MM-DD>" and "departures:<YYYY-MM-DD>".
+    """
+    key = models.CharField(max_length=150, unique=True)
+    value = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+
+# -----------------------------------------
+# Photo Blobs (content-addressed uploads)
+# -----------------------------------------
+class PhotoBlob(models.Model):
+    """One stored image and how many profiles reference it.
+
+    ``name`` is the storage path (tourist_photos/<aa>/<sha256><ext>);
+    counts are kept by signals and recomputed by `manage.py gc_photos`.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField(default=0)
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['ref_count'])]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+
+# -----------------------------------------
+# Mobile Sync Log
+# -----------------------------------------
+SYNC_KINDS = (
+    ('profile', 'Tourist profile'),
+    ('contact', 'Emergency contact'),
+    ('place', 'Place'),
+    ('incident', 'Incident'),
+)
+
+
+class SyncChange(models.Model):
+    """Latest change to one synced row; the id is its change version.
+
+    Every save adds a row and drops the object's older ones, so the log
+    holds one live row per object plus tombstones (``deleted``), which
+    are pruned by `manage.py prune_sync_log`. ``profile_id`` is the owning
+    tourist (NULL for places, which are matched on lat/lng instead).
+    """
+    kind = models.CharField(max_length=10, choices=SYNC_KINDS)
+    object_id = models.BigIntegerField()
+    profile_id = models.BigIntegerField(null=True, blank=True)
+    lat = models.FloatField(null=True, blank=True)
+    lng = models.FloatField(null=True, blank=True)
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['profile_id', 'id']),
+            models.Index(fields=['kind', 'lat', 'lng']),
+            models.Index(fields=['kind', 'object_id']),
+            models.Index(fields=['deleted', 'changed_at']),
+        ]
+
+    def __str__(self):
+        return f"v{self.id} {self.kind} {self.object_id}{' (deleted)' if self.deleted else ''}"
+
+
+# -----------------------------------------
+# Location Tracks
+# -----------------------------------------
+class TrackPoint(models.Model):
+    """A recent location ping, buffered until `manage.py compact_tracks`
+    packs it into a TrackChunk."""
+    profile = models.ForeignKey(
+        TouristProfile,
+        on_delete=models.CASCADE,
+        related_name='track_points'
+    )
+    recorded_at = models.DateTimeField()
+    lat = models.FloatField()
+    lng = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['profile', 'recorded_at']),
+            models.Index(fields=['recorded_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.profile_id} @ {self.recorded_at}"
+
+
+class TrackChunk(models.Model):
+    """Up to TRACK_CHUNK_POINTS consecutive pings of one tourist, packed by api.track_codec."""
+    profile = models.ForeignKey(
+        TouristProfile,
+        on_delete=models.CASCADE,
+        related_name='track_chunks'
+    )
+    start_at = models.DateTimeField()
+    end_at = models.DateTimeField()
+    point_count = models.PositiveIntegerField()
+    min_lat = models.FloatField()
+    min_lng = models.FloatField()
+    max_lat = models.FloatField()
+    max_lng = models.FloatField()
+    data = models.BinaryField()
+
+    class Meta:
+        indexes = [models.Index(fields=['profile', 'start_at'])]
+
+    def __str__(self):
+        return f"{self.profile_id} {self.start_at} - {self.end_at} ({self.point_count} points)"
+
+
+class OutboxNotification(models.Model):
+    """An SOS notification not yet delivered (see api.notifications).
+
+    Written in the transaction that opens the incident and deleted once
+    sent, so a restart loses none; rows with failed_at set were given up.
+    """
+    incident_id = models.BigIntegerField()
+    channel = models.CharField(max_length=20)
+    recipient = models.CharField(max_length=255)  # email address, phone number or URL
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    data = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    attempts = models.PositiveIntegerField(default=0)
+    # Also the end of a delivery claim, so a claim left by a dead process expires
+    next_attempt_at = models.DateTimeField()
+    claim = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    failed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['next_attempt_at']), models.Index(fields=['claim'])]
+
+    def __str__(self):
+        return f"{self.channel} to {self.recipient} for incident {self.incident_id}"
@@ -0,0 +1,552 @@
+import heapq
+import http.client
+import itertools
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import sharding
+from .geocoding import reverse_geocode
+from .models import AuthorityProfile, OutboxNotification, TouristProfile
+
+
+logger = logging.getLogger(__name__)
+
+
+# SOS fan-out to a tourist's emergency contacts and the authorities on
+# duty. The notifications for a new incident are written to the
+# OutboxNotification table in the transaction that opens it, and deleted
+# once sent, so a restart or crash loses none. Deliverers claim due rows
+# for NOTIFY_CLAIM_SECONDS and hand them to the Dispatcher: each channel
+# (email, sms, webhook) has its own transport with a thread pool of
+# CONCURRENCY senders sharing a pool of open connections, so a slow SMS
+# gateway cannot hold up email. Failed sends are rescheduled in the table
+# with exponential backoff; a claim left by a dead process expires and its
+# rows are sent again. Due rows are polled by each worker's SOS queue
+# writer (started at worker boot) or by `manage.py drain_sos_queue`.
+
+
+class Notification:
+    __slots__ = ('channel', 'recipient', 'subject', 'body', 'data', 'ref')
+
+    def __init__(self, channel, recipient, subject, body, data=None, ref=None):
+        self.channel = channel
+        self.recipient = recipient  # email address, phone number or URL
+        self.subject = subject
+        self.body = body
+        self.data = data  # JSON payload for webhooks
+        self.ref = ref  # (database, outbox row id, attempt) when sent from the outbox
+
+    def __repr__(self):
+        return f"<Notification {self.channel} to {self.recipient}>"
+
+
+class DeliveryError(Exception):
+    """A send that failed; ``retry`` is False when trying again cannot help."""
+
+    def __init__(self, message, retry=True):
+        super().__init__(message)
+        self.retry = retry
+
+
+# ---------------------------
+# Transports
+# ---------------------------
+class ConnectionPool:
+    """Idle connections to one endpoint, reused most-recent first."""
+
+    def __init__(self, factory, size, close=None):
+        self.factory = factory
+        self.close_connection = close or (lambda connection: connection.close())
+        self.idle = queue.LifoQueue(maxsize=size)
+
+    @contextmanager
+    def connection(self):
+        try:
+            connection = self.idle.get_nowait()
+        except queue.Empty:
+            connection = self.factory()
+        try:
+            yield connection
+        except BaseException:
+            # The connection may be half-way through a failed exchange
+            self._discard(connection)
+            raise
+        try:
+            self.idle.put_nowait(connection)
+        except queue.Full:
+            self._discard(connection)
+
+    def _discard(self, connection):
+        try:
+            self.close_connection(connection)
+        except Exception:
+            pass
+
+    def close(self):
+        while True:
+            try:
+                self._discard(self.idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+class Transport:
+    """Delivers one channel's notifications, at most ``concurrency`` batches at once."""
+
+    def __init__(self, concurrency=4):
+        self.concurrency = concurrency
+
+    def send(self, batch):
+        """Deliver ``batch``; returns [(notification, exception)] for those that failed."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class EmailTransport(Transport):
+    """Email through a Django mail backend (SMTP by default), one open connection per sender."""
+
+    def __init__(self, backend=None, from_email=None, concurrency=4, **backend_options):
+        super().__init__(concurrency)
+        self.from_email = from_email or settings.DEFAULT_FROM_EMAIL
+        self.pool = ConnectionPool(
+            lambda: get_connection(backend, fail_silently=False, **backend_options),
+            concurrency,
+        )
+
+    def send(self, batch):
+        failures = []
+        with self.pool.connection() as connection:
+            connection.open()  # no-op once open
+            for i, notification in enumerate(batch):
+                message = EmailMessage(
+                    notification.subject, notification.body, self.from_email, [notification.recipient],
+                    connection=connection,
+                )
+                try:
+                    connection.send_messages([message])
+                except Exception as e:
+                    failures.append((notification, e))
+                    # The server may have dropped us; go on over a fresh connection
+                    try:
+                        connection.close()
+                        connection.open()
+                    except Exception as e:
+                        failures.extend((rest, e) for rest in batch[i + 1:])
+                        break
+        return failures
+
+    def close(self):
+        self.pool.close()
+
+
+class HttpTransport(Transport):
+    """JSON over HTTP(S) with keep-alive connections pooled per host."""
+
+    def __init__(self, concurrency=8, timeout=10, headers=None):
+        super().__init__(concurrency)
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self.pools = {}
+        self.pools_lock = threading.Lock()
+
+    def _pool(self, scheme, netloc):
+        key = (scheme, netloc)
+        with self.pools_lock:
+            if key not in self.pools:
+                connection_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+                self.pools[key] = ConnectionPool(
+                    lambda: connection_class(netloc, timeout=self.timeout), self.concurrency
+                )
+            return self.pools[key]
+
+    def post(self, url, payload):
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        body = json.dumps(payload, separators=(",", ":"), default=str).encode()
+        pool = self._pool(parts.scheme, parts.netloc)
+        for attempt in (1, 2):
+            try:
+                with pool.connection() as connection:
+                    connection.request("POST", path, body, self.headers)
+                    response = connection.getresponse()
+                    response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server closed an idle keep-alive connection; one fresh try
+                if attempt == 2:
+                    raise
+        if response.status == 429 or response.status >= 500:
+            raise DeliveryError(f"HTTP {response.status} from {parts.netloc}")
+        if response.status >= 400:
+            raise DeliveryError(f"HTTP {response.status} from {parts.netloc}", retry=False)
+
+    def send(self, batch):
+        failures = []
+        for notification in batch:
+            try:
+                self.post(*self.request_for(notification))
+            except Exception as e:
+                failures.append((notification, e))
+        return failures
+
+    def request_for(self, notification):
+        """(url, payload) for one notification."""
+        raise NotImplementedError
+
+    def close(self):
+        with self.pools_lock:
+            for pool in self.pools.values():
+                pool.close()
+
+
+class WebhookTransport(HttpTransport):
+    """POSTs each notification's data to its recipient URL."""
+
+    def request_for(self, notification):
+        return notification.recipient, notification.data or {"subject": notification.subject, "body": notification.body}
+
+
+class SmsTransport(HttpTransport):
+    """Text messages through a JSON SMS gateway: POST url {"from", "to", "text"}."""
+
+    def __init__(self, url, sender="", token=None, **options):
+        headers = {"Authorization": f"Bearer {token}"} if token else None
+        super().__init__(headers=headers, **options)
+        self.url = url
+        self.sender = sender
+
+    def request_for(self, notification):
+        return self.url, {"from": self.sender, "to": notification.recipient, "text": notification.body}
+
+
+# Notifications taken by LocalTransport, newest last (like django.core.mail.outbox)
+outbox = deque(maxlen=1000)
+
+
+class LocalTransport(Transport):
+    """Stand-in that keeps notifications in ``outbox`` instead of sending them.
+
+    ``latency`` (seconds per notification) and ``failure_rate`` simulate a
+    remote service for benchmarks and retry tests.
+    """
+
+    def __init__(self, concurrency=8, latency=0, failure_rate=0):
+        super().__init__(concurrency)
+        self.latency = latency
+        self.failure_rate = failure_rate
+
+    def send(self, batch):
+        failures = []
+        for notification in batch:
+            if self.latency:
+                time.sleep(self.latency)
+            if self.failure_rate and random.random() < self.failure_rate:
+                failures.append((notification, DeliveryError("simulated failure")))
+            else:
+                outbox.append(notification)
+        return failures
+
+
+# ---------------------------
+# Dispatcher
+# ---------------------------
+def retry_delay(attempt, base, cap):
+    """Seconds before retrying after failed ``attempt``: exponential backoff
+    with jitter, so a recovering service is not hit by every retry at once."""
+    return min(cap, base * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+
+
+class Dispatcher:
+    """Sends notifications in the background; submit() never waits on delivery.
+
+    Failed sends are retried in memory, unless ``report`` is given: then
+    it is called with (batch, [(notification, exception)]) after each
+    send and decides what happens next.
+    """
+
+    def __init__(self, transports, max_attempts=5, retry_base=2.0, retry_max=300.0, batch_size=50, report=None):
+        self.transports = transports
+        self.report = report
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.batch_size = batch_size
+        self.executors = {
+            channel: ThreadPoolExecutor(transport.concurrency, thread_name_prefix=f"notify-{channel}")
+            for channel, transport in transports.items()
+        }
+        self.stats = Counter()
+        self.pending = 0
+        self.condition = threading.Condition()
+        self.retries = []  # heap of (due, sequence, channel, batch, attempt)
+        self.sequence = itertools.count()
+        self.closed = False
+        self.scheduler = threading.Thread(target=self._schedule_retries, name="notify-retry", daemon=True)
+        self.scheduler.start()
+
+    def submit(self, notifications):
+        by_channel = {}
+        for notification in notifications:
+            by_channel.setdefault(notification.channel, []).append(notification)
+        for channel, items in by_channel.items():
+            if channel not in self.transports:
+                logger.error("No transport configured for %d %s notifications", len(items), channel)
+                self._count(dropped=len(items))
+                continue
+            for start in range(0, len(items), self.batch_size):
+                self._enqueue(channel, items[start:start + self.batch_size], 1)
+
+    def _count(self, **deltas):
+        with self.condition:
+            self.stats.update(deltas)
+
+    def _enqueue(self, channel, batch, attempt, counted=False):
+        if not counted:
+            with self.condition:
+                self.pending += 1
+        self.executors[channel].submit(self._deliver, channel, batch, attempt)
+
+    def _done(self):
+        with self.condition:
+            self.pending -= 1
+            self.condition.notify_all()
+
+    def _deliver(self, channel, batch, attempt):
+        try:
+            try:
+                failures = self.transports[channel].send(batch)
+            except Exception as e:
+                failures = [(notification, e) for notification in batch]
+            retry = [notification for notification, e in failures if getattr(e, "retry", True)]
+            for notification, e in failures:
+                if not getattr(e, "retry", True):
+                    logger.warning("Dropping %r: %s", notification, e)
+            self._count(sent=len(batch) - len(failures), failed=len(failures) - len(retry))
+            if self.report:
+                try:
+                    self.report(batch, failures)
+                except Exception:
+                    # The rows stay claimed and are sent again once the claim expires
+                    logger.exception("Could not record the results of %d %s notifications", len(batch), channel)
+                return
+            if not retry:
+                return
+            if attempt >= self.max_attempts:
+                logger.error("Giving up on %d %s notifications after %d attempts: %s",
+                             len(retry), channel, attempt, failures[0][1])
+                self._count(failed=len(retry))
+                return
+            delay = retry_delay(attempt, self.retry_base, self.retry_max)
+            self._count(retried=len(retry))
+            with self.condition:
+                self.pending += 1
+                heapq.heappush(self.retries, (time.monotonic() + delay, next(self.sequence), channel, retry, attempt + 1))
+                self.condition.notify_all()
+        finally:
+            self._done()
+
+    def _schedule_retries(self):
+        while True:
+            with self.condition:
+                while not self.closed and (not self.retries or self.retries[0][0] > time.monotonic()):
+                    timeout = self.retries[0][0] - time.monotonic() if self.retries else None
+                    self.condition.wait(timeout)
+                if self.closed:
+                    return
+                _, _, channel, batch, attempt = heapq.heappop(self.retries)
+            # Already counted as pending when it was scheduled
+            self._enqueue(channel, batch, attempt, counted=True)
+
+    def flush(self, timeout=None):
+        """Wait until every submitted notification is sent or given up; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while self.pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        for executor in self.executors.values():
+            executor.shutdown(wait=True)
+        for transport in self.transports.values():
+            transport.close()
+
+
+def build_transports(config):
+    """{channel: Transport} from a NOTIFY_TRANSPORTS-style mapping."""
+    return {
+        channel: import_string(options["BACKEND"])(**options.get("OPTIONS", {}))
+        for channel, options in config.items()
+    }
+
+
+_dispatcher = {"pid": None, "dispatcher": None}
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    """This process's dispatcher, created on first use (and again after a fork)."""
+    with _dispatcher_lock:
+        if _dispatcher["pid"] != os.getpid():
+            _dispatcher["dispatcher"] = Dispatcher(
+                build_transports(settings.NOTIFY_TRANSPORTS),
+                batch_size=settings.NOTIFY_BATCH_SIZE,
+                report=_record_results,
+            )
+            _dispatcher["pid"] = os.getpid()
+        return _dispatcher["dispatcher"]
+
+
+def flush(timeout=None):
+    """Wait for this process's in-flight sends, if it has a dispatcher; for
+    shutdown, so a worker exit does not leave rows to wait out their claim."""
+    with _dispatcher_lock:
+        dispatcher = _dispatcher["dispatcher"] if _dispatcher["pid"] == os.getpid() else None
+    return dispatcher.flush(timeout) if dispatcher else True
+
+
+# ---------------------------
+# Outbox
+# ---------------------------
+def deliver_due(databases=None, limit=500):
+    """Claim due outbox rows of each shard (default: all) and hand them to
+    this process's dispatcher; returns how many were handed over."""
+    count = 0
+    for database in databases or sharding.databases():
+        with sharding.use_database(database):
+            count += _deliver_due(database, limit)
+    return count
+
+
+def _deliver_due(database, limit):
+    now = timezone.now()
+    due = OutboxNotification.objects.filter(failed_at__isnull=True, next_attempt_at__lte=now)
+    ids = list(due.order_by('next_attempt_at').values_list('id', flat=True)[:limit])
+    if not ids:
+        return 0
+    # Rows another deliverer claimed in the meantime no longer match
+    claim = uuid.uuid4().hex
+    due.filter(id__in=ids).update(claim=claim, next_attempt_at=now + timedelta(seconds=settings.NOTIFY_CLAIM_SECONDS))
+    notifications = [
+        Notification(row.channel, row.recipient, row.subject, row.body, row.data,
+                     ref=(database, row.id, row.attempts + 1))
+        for row in OutboxNotification.objects.filter(claim=claim)
+    ]
+    if notifications:
+        get_dispatcher().submit(notifications)
+    return len(notifications)
+
+
+def _record_results(batch, failures):
+    """Delete sent rows; reschedule or give up on failed ones."""
+    now = timezone.now()
+    failed = {id(notification) for notification, _ in failures}
+    sent = {}
+    for notification in batch:
+        if id(notification) not in failed:
+            database, pk, _ = notification.ref
+            sent.setdefault(database, []).append(pk)
+    for database, ids in sent.items():
+        OutboxNotification.objects.using(database).filter(id__in=ids).delete()
+
+    for notification, e in failures:
+        database, pk, attempt = notification.ref
+        changes = {"attempts": attempt, "last_error": str(e)[:1000], "claim": ""}
+        if not getattr(e, "retry", True) or attempt >= settings.NOTIFY_MAX_ATTEMPTS:
+            logger.error("Giving up on %r after %d attempts: %s", notification, attempt, e)
+            changes["failed_at"] = now
+        else:
+            delay = retry_delay(attempt, settings.NOTIFY_RETRY_BASE_SECONDS, settings.NOTIFY_RETRY_MAX_SECONDS)
+            changes["next_attempt_at"] = now + timedelta(seconds=delay)
+        OutboxNotification.objects.using(database).filter(id=pk).update(**changes)
+
+
+# ---------------------------
+# SOS fan-out
+# ---------------------------
+def sos_notifications(incidents):
+    """(incident id, notification) pairs for newly opened SOS incidents: SMS
+    to each emergency contact, email to verified authorities of
+    NOTIFY_SOS_AGENCY_TYPES and a JSON post to every NOTIFY_SOS_WEBHOOKS
+    endpoint."""
+    if not incidents:
+        return []
+    profiles = TouristProfile.objects.prefetch_related('contacts').in_bulk({i.profile_id for i in incidents})
+    authority_emails = list(
+        AuthorityProfile.objects.filter(is_verified=True, agency_type__in=settings.NOTIFY_SOS_AGENCY_TYPES)
+        .values_list('official_email', flat=True)
+    )
+
+    notifications = []
+    for incident in incidents:
+        profile = profiles.get(incident.profile_id)
+        if profile is None:
+            continue
+        location = reverse_geocode(incident.lat, incident.lng)['address']
+        where = f"{location} ({incident.lat:.5f}, {incident.lng:.5f})"
+        subject = f"SOS alert #{incident.id}: {profile.name}"
+        text = f"SOS from {profile.name} near {where}. Local authorities have been alerted."
+
+        for contact in profile.contacts.all():
+            if contact.phone:
+                notifications.append((incident.id, Notification("sms", contact.phone, subject, text)))
+        body = (
+            f"{profile.name} ({profile.nationality or 'nationality unknown'}, {profile.phone or 'no phone'}) "
+            f"raised an SOS near {where}.\n\n{incident.description}"
+        )
+        for email in authority_emails:
+            notifications.append((incident.id, Notification("email", email, subject, body)))
+        data = {
+            "incident_id": incident.id,
+            "tourist": {"id": profile.id, "name": profile.name, "phone": profile.phone,
+                        "nationality": profile.nationality},
+            "lat": incident.lat,
+            "lng": incident.lng,
+            "location": location,
+            "description": incident.description,
+            "created_at": incident.created_at,
+        }
+        for url in settings.NOTIFY_SOS_WEBHOOKS:
+            notifications.append((incident.id, Notification("webhook", url, subject, body, data)))
+    return notifications
+
+
+def queue_sos(incidents):
+    """Write the SOS fan-out for ``incidents`` to the current shard's outbox,
+    in the caller's transaction; returns how many were queued."""
+    now = timezone.now()
+    rows = [
+        OutboxNotification(
+            incident_id=incident_id, channel=notification.channel, recipient=notification.recipient,
+            subject=notification.subject, body=notification.body, data=notification.data, next_attempt_at=now,
+        )
+        for incident_id, notification in sos_notifications(incidents)
+    ]
+    OutboxNotification.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
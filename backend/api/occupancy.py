@@ -0,0 +1,186 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.db import IntegrityError
+from django.db.models import F, Sum
+
+from . import sharding
+from .geocoding import forward_geocode
+from .models import RegionOccupancy, TouristProfile
+from .utils import latlng_to_tile
+
+
+# Where tourists are staying, day by day. A profile's hotel (or destination)
+# address is geocoded to a map tile at REGION_ZOOM when it is saved, and the
+# rollup keeps one row per tile and day of every stay, so crowd counts for
+# an area and date range never touch the profile table.
+
+REGION_ZOOM = 12  # tiles of about 10 km, roughly a city district
+# Longest stay counted in the rollup, so a mistyped year cannot add
+# thousands of rows for one profile
+MAX_STAY_DAYS = 366
+
+
+def region_of(hotel_address, to_address):
+    """Destination tile (x, y) of a profile, or (None, None) if not geocodable."""
+    for text in (hotel_address, to_address):
+        point = forward_geocode(text)
+        if point:
+            return latlng_to_tile(point[0], point[1], REGION_ZOOM)
+    return None, None
+
+
+def stay_state(region_x, region_y, arrival_date, departure_date):
+    """Rollup contribution (tile_x, tile_y, first day, last day), or None."""
+    if region_x is None or region_y is None or not arrival_date or not departure_date:
+        return None
+    if departure_date < arrival_date:
+        return None
+    last = min(departure_date, arrival_date + timedelta(days=MAX_STAY_DAYS - 1))
+    return (region_x, region_y, arrival_date, last)
+
+
+def profile_state(profile):
+    return stay_state(profile.region_x, profile.region_y, profile.arrival_date, profile.departure_date)
+
+
+def _days(first, last):
+    return [first + timedelta(days=n) for n in range((last - first).days + 1)]
+
+
+def bump_days(tile_x, tile_y, first, last, delta):
+    """Atomically add ``delta`` to days first..last of one tile, creating rows as needed."""
+    if not delta or last < first:
+        return
+    lookup = dict(tile_x=tile_x, tile_y=tile_y)
+    existing = set(
+        RegionOccupancy.objects.filter(day__range=(first, last), **lookup).values_list('day', flat=True)
+    )
+    if existing:
+        RegionOccupancy.objects.filter(day__in=existing, **lookup).update(count=F('count') + delta)
+    for day in _days(first, last):
+        if day in existing:
+            continue
+        try:
+            with sharding.atomic():
+                RegionOccupancy.objects.create(day=day, count=delta, **lookup)
+        except IntegrityError:
+            # Another writer created the row first
+            RegionOccupancy.objects.filter(day=day, **lookup).update(count=F('count') + delta)
+
+
+def _window_changes(old, new):
+    """(first, last, delta) runs turning stay window ``old`` into ``new``."""
+    (old_first, old_last), (new_first, new_last) = old, new
+    if new_first > old_last or old_first > new_last:
+        return [(old_first, old_last, -1), (new_first, new_last, 1)]
+    one_day = timedelta(days=1)
+    changes = []
+    if new_first < old_first:
+        changes.append((new_first, old_first - one_day, 1))
+    elif old_first < new_first:
+        changes.append((old_first, new_first - one_day, -1))
+    if new_last > old_last:
+        changes.append((old_last + one_day, new_last, 1))
+    elif old_last > new_last:
+        changes.append((new_last + one_day, old_last, -1))
+    return changes
+
+
+def apply_change(old_state, new_state):
+    """Move one profile's stay from old_state to new_state."""
+    if old_state == new_state:
+        return
+    if old_state and new_state and old_state[:2] == new_state[:2]:
+        # Same tile, the dates moved: only the days gained or lost change
+        for first, last, delta in _window_changes(old_state[2:], new_state[2:]):
+            bump_days(*new_state[:2], first, last, delta)
+        return
+    if old_state:
+        bump_days(*old_state, -1)
+    if new_state:
+        bump_days(*new_state, 1)
+
+
+def geocode_profiles(chunk_size=2000):
+    """Recompute region_x/region_y of every profile; returns how many changed.
+
+    Uses bulk_update, which bypasses signals: run rebuild() afterwards.
+    """
+    changed = []
+    rows = TouristProfile.objects.values_list('id', 'hotel_address', 'to_address', 'region_x', 'region_y')
+    for pk, hotel_address, to_address, region_x, region_y in rows.iterator(chunk_size=chunk_size):
+        region = region_of(hotel_address, to_address)
+        if region != (region_x, region_y):
+            changed.append(TouristProfile(id=pk, region_x=region[0], region_y=region[1]))
+    TouristProfile.objects.bulk_update(changed, ['region_x', 'region_y'], batch_size=chunk_size)
+    return len(changed)
+
+
+def rebuild(chunk_size=5000):
+    """Recompute the current shard's rollup from its TouristProfile table."""
+    counts = Counter()
+    rows = (
+        TouristProfile.objects.filter(region_x__isnull=False, arrival_date__isnull=False, departure_date__isnull=False)
+        .values_list('region_x', 'region_y', 'arrival_date', 'departure_date')
+    )
+    for row in rows.iterator(chunk_size=chunk_size):
+        state = stay_state(*row)
+        if state:
+            for day in _days(*state[2:]):
+                counts[(state[0], state[1], day)] += 1
+
+    with sharding.atomic():
+        RegionOccupancy.objects.all().delete()
+        RegionOccupancy.objects.bulk_create(
+            [RegionOccupancy(tile_x=x, tile_y=y, day=day, count=count) for (x, y, day), count in counts.items()],
+            batch_size=chunk_size,
+        )
+    return len(counts)
+
+
+# ---------------------------
+# Queries
+# ---------------------------
+def tile_range(bbox):
+    """((min_x, max_x), (min_y, max_y)) of the REGION_ZOOM tiles overlapping
+    ``bbox`` (south, west, north, east)."""
+    south, west, north, east = bbox
+    min_x, min_y = latlng_to_tile(north, west, REGION_ZOOM)
+    max_x, max_y = latlng_to_tile(south, east, REGION_ZOOM)
+    return (min_x, max_x), (min_y, max_y)
+
+
+def active_tourists(day, bbox=None):
+    """Profiles whose stay covers ``day``, staying in tiles overlapping ``bbox``."""
+    queryset = TouristProfile.objects.filter(arrival_date__lte=day, departure_date__gte=day)
+    if bbox:
+        x_range, y_range = tile_range(bbox)
+        queryset = queryset.filter(region_x__range=x_range, region_y__range=y_range)
+    return queryset
+
+
+def occupancy(date_from, date_to, zoom=REGION_ZOOM, bbox=None):
+    """Tourists staying per tile at ``zoom`` and day, as (day, tile_x, tile_y, count),
+    summed over the shards holding regions that overlap ``bbox``."""
+    if not 0 <= zoom <= REGION_ZOOM:
+        raise ValueError(f"Zoom must be between 0 and {REGION_ZOOM}")
+    if date_to < date_from:
+        raise ValueError("'to' must not be before 'from'")
+
+    divisor = 1 << (REGION_ZOOM - zoom)
+    rows = RegionOccupancy.objects.filter(day__range=(date_from, date_to))
+    if bbox:
+        x_range, y_range = tile_range(bbox)
+        rows = rows.filter(tile_x__range=x_range, tile_y__range=y_range)
+    grouped = (
+        rows.annotate(x=F('tile_x') / divisor, y=F('tile_y') / divisor)
+        .values('day', 'x', 'y')
+        .annotate(count=Sum('count'))
+        .filter(count__gt=0)
+        .order_by()
+    )
+    counts = Counter()
+    for row in sharding.gather(lambda database: list(grouped.all()), sharding.databases_for_bbox(bbox)):
+        counts[(row['day'], row['x'], row['y'])] += row['count']
+    return [(day, x, y, count) for (day, x, y), count in sorted(counts.items())]
@@ -0,0 +1,84 @@
+import hashlib
+import mimetypes
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+
+# Content-addressed storage for uploaded photos: each distinct image is
+# stored once as <upload_to>/<digest[:2]>/<digest><ext>, so re-uploading
+# the same photo reuses the existing blob. Reference counting and garbage
+# collection live in api.photos.
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def is_content_addressed(name):
+    """Whether ``name`` is a digest path written by ContentAddressedStorage."""
+    parts = (name or "").replace("\\", "/").split("/")
+    if len(parts) < 3:
+        return False
+    shard, filename = parts[-2], parts[-1]
+    digest = os.path.splitext(filename)[0]
+    return len(digest) == 64 and digest.startswith(shard) and len(shard) == 2
+
+
+def _canonical_extension(filename):
+    # One spelling per type (.jpeg/.JPG -> .jpg) so identical bytes uploaded
+    # under different names still map to a single blob
+    ext = os.path.splitext(filename)[1].lower()
+    content_type, _ = mimetypes.guess_type(filename)
+    return (mimetypes.guess_extension(content_type) if content_type else None) or ext
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by the SHA-256 of their content."""
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is only known once the content is hashed in _save;
+        # identical content is meant to land on the same name.
+        return name
+
+    def _save(self, name, content):
+        directory, filename = os.path.split(name)
+        ext = _canonical_extension(filename)
+        root = self.path(directory)
+        os.makedirs(root, exist_ok=True)
+
+        # Hash while streaming into a temp file in the same directory, so
+        # the final move is an atomic rename on the same filesystem
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=root, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks(HASH_CHUNK_SIZE):
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            hexdigest = digest.hexdigest()
+            final_name = os.path.join(directory, hexdigest[:2], hexdigest + ext).replace("\\", "/")
+            final_path = self.path(final_name)
+            if os.path.exists(final_path):
+                os.unlink(tmp_path)
+                # Fresh mtime keeps a just-reused blob inside the GC grace period
+                os.utime(final_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(tmp_path, self.file_permissions_mode)
+                os.replace(tmp_path, final_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return final_name
+
+
+photo_storage = ContentAddressedStorage()
+
+
+def get_photo_storage():
+    return photo_storage
+
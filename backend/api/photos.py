@@ -0,0 +1,141 @@
+import os
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from . import sharding, sync
+from .actions import ID_BATCH_SIZE
+from .models import PhotoBlob, TouristProfile
+from .photo_storage import is_content_addressed, photo_storage
+
+
+# Reference counts for content-addressed profile photos, and garbage
+# collection of blobs no profile points at.
+
+PHOTO_DIR = TouristProfile._meta.get_field('profile_photo').upload_to.rstrip("/")
+
+
+def bump(name, delta):
+    """Atomically add ``delta`` to the reference count of blob ``name``."""
+    if not name or not delta or not is_content_addressed(name):
+        return
+    if PhotoBlob.objects.filter(name=name).update(ref_count=F('ref_count') + delta):
+        return
+    try:
+        size = photo_storage.size(name)
+    except OSError:
+        size = 0
+    try:
+        with transaction.atomic():
+            PhotoBlob.objects.create(name=name, size=size, ref_count=delta)
+    except IntegrityError:
+        # Another writer created the row first
+        PhotoBlob.objects.filter(name=name).update(ref_count=F('ref_count') + delta)
+
+
+def apply_change(old_name, new_name):
+    """Move one profile's reference from ``old_name`` to ``new_name``."""
+    if old_name != new_name:
+        bump(old_name, -1)
+        bump(new_name, 1)
+
+
+def rehome_legacy_photos():
+    """Re-store photos saved before content addressing; returns how many moved.
+
+    Identical legacy copies collapse into one blob. The old files are left
+    for collect_garbage(), which removes them once nothing references them.
+    """
+    moved = 0
+    for database in sharding.databases():
+        with sharding.use_database(database):
+            moved += _rehome_shard()
+    return moved
+
+
+def _rehome_shard():
+    moved = 0
+    legacy = TouristProfile.objects.exclude(profile_photo="").exclude(profile_photo__isnull=True)
+    for pk, name in legacy.values_list('id', 'profile_photo').iterator():
+        if is_content_addressed(name) or not photo_storage.exists(name):
+            continue
+        with photo_storage.open(name) as f:
+            new_name = photo_storage.save(f"{PHOTO_DIR}/{os.path.basename(name)}", f)
+        # Queryset update: signals would count the reference twice after recount()
+        if TouristProfile.objects.filter(id=pk, profile_photo=name).update(profile_photo=new_name):
+            sync.changed('profile', [(pk, pk)])
+        moved += 1
+    return moved
+
+
+def _photo_counts(database):
+    """(photo name, profiles using it) in the current shard."""
+    return list(
+        TouristProfile.objects.exclude(profile_photo="").exclude(profile_photo__isnull=True)
+        .values_list('profile_photo').annotate(n=Count('id')).values_list('profile_photo', 'n')
+    )
+
+
+def recount():
+    """Recompute every blob's reference count from TouristProfile on every shard."""
+    counts = Counter()
+    for name, n in sharding.gather(_photo_counts):
+        if is_content_addressed(name):
+            counts[name] += n
+    with transaction.atomic():
+        PhotoBlob.objects.exclude(name__in=list(counts)).update(ref_count=0)
+        existing = dict(PhotoBlob.objects.values_list('name', 'ref_count'))
+        for name, n in counts.items():
+            if name not in existing:
+                bump(name, n)
+            elif existing[name] != n:
+                PhotoBlob.objects.filter(name=name).update(ref_count=n)
+    return len(counts)
+
+
+def _stored_files():
+    """Every file under PHOTO_DIR as (name, mtime), skipping in-flight uploads."""
+    root = photo_storage.path(PHOTO_DIR)
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.startswith(".upload-"):
+                continue
+            path = os.path.join(dirpath, filename)
+            name = os.path.relpath(path, photo_storage.location).replace(os.sep, "/")
+            yield name, os.path.getmtime(path)
+
+
+def collect_garbage(grace_seconds=3600, dry_run=False):
+    """Delete unreferenced photo files older than ``grace_seconds``.
+
+    That covers blobs whose count dropped to zero, blobs written by an
+    upload whose transaction never committed, and legacy copies that no
+    profile uses. Returns (files deleted, bytes freed).
+    """
+    cutoff = time.time() - grace_seconds
+    referenced = {name for name, _ in sharding.gather(_photo_counts)}
+    live_blobs = set(PhotoBlob.objects.filter(ref_count__gt=0).values_list('name', flat=True))
+
+    deleted = []
+    freed = 0
+    for name, mtime in list(_stored_files()):
+        if name in referenced or name in live_blobs or mtime > cutoff:
+            continue
+        freed += photo_storage.size(name)
+        if not dry_run:
+            photo_storage.delete(name)
+        deleted.append(name)
+
+    if not dry_run:
+        for start in range(0, len(deleted), ID_BATCH_SIZE):
+            PhotoBlob.objects.filter(name__in=deleted[start:start + ID_BATCH_SIZE], ref_count__lte=0).delete()
+        # Rows for blobs whose files are already gone
+        stale = timezone.now() - timedelta(seconds=grace_seconds)
+        for name in PhotoBlob.objects.filter(ref_count__lte=0, created_at__lt=stale).values_list('name', flat=True):
+            if name not in referenced and not photo_storage.exists(name):
+                PhotoBlob.objects.filter(name=name, ref_count__lte=0).delete()
+    return len(deleted), freed
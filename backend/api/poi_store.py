@@ -0,0 +1,257 @@
+import atexit
+import heapq
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from math import cos, radians, sqrt
+
+from django.conf import settings
+from django.db import connections
+
+from .models import Place
+
+logger = logging.getLogger(__name__)
+
+# Columnar, memory-mapped copy of the Place table.
+#
+# Rows are sorted by latitude so range and nearest queries can bisect
+# instead of scanning. Every worker maps the same file read-only and
+# shares its pages; saves and deletes schedule a rewrite of the file and
+# workers pick up the new one on their next recheck. Layout (little endian):
+#
+#   header      MAGIC, count, type count, blob bytes
+#   lat, lng    float64[count]
+#   id          uint32[count]
+#   type        uint8[count]       index into the type labels (padded to 4 bytes)
+#   string_end  uint32[types + 3 * count]
+#                                  end offsets in the blob: type labels, then
+#                                  every name, address and description
+#   blob        utf-8
+
+MAGIC = b"POI1"
+HEADER = struct.Struct("<4sIII")
+STRING_FIELDS = ("name", "address", "description")
+KM_PER_DEGREE = 111.195
+
+
+def _pad4(n):
+    return (n + 3) & ~3
+
+
+def write_poi_store(path, rows):
+    """Write ``rows`` [(id, name, place_type, description, lat, lng, address)] to ``path``."""
+    rows = sorted(rows, key=lambda row: row[4])
+    count = len(rows)
+    types = sorted({row[2] for row in rows})
+    type_index = {place_type: i for i, place_type in enumerate(types)}
+
+    blob = bytearray()
+    string_end = []
+    for label in types:
+        blob += label.encode("utf-8")
+        string_end.append(len(blob))
+    for column in (1, 6, 3):  # name, address, description
+        for row in rows:
+            blob += (row[column] or "").encode("utf-8")
+            string_end.append(len(blob))
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, count, len(types), len(blob)))
+        f.write(struct.pack(f"<{count}d", *(row[4] for row in rows)))
+        f.write(struct.pack(f"<{count}d", *(row[5] for row in rows)))
+        f.write(struct.pack(f"<{count}I", *(row[0] for row in rows)))
+        f.write(bytes(type_index[row[2]] for row in rows).ljust(_pad4(count), b"\0"))
+        f.write(struct.pack(f"<{len(string_end)}I", *string_end))
+        f.write(bytes(blob))
+    return count
+
+
+class PoiStore:
+    """Read-only, memory-mapped view of a POI store file."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, type_count, _ = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a POI store file")
+
+        view = memoryview(self._mm)
+        offset = HEADER.size
+        self.lat = view[offset:offset + 8 * count].cast("d")
+        offset += 8 * count
+        self.lng = view[offset:offset + 8 * count].cast("d")
+        offset += 8 * count
+        self.id = view[offset:offset + 4 * count].cast("I")
+        offset += 4 * count
+        self.type = view[offset:offset + count]
+        offset += _pad4(count)
+        strings = type_count + len(STRING_FIELDS) * count
+        self.string_end = view[offset:offset + 4 * strings].cast("I")
+        offset += 4 * strings
+        self.blob = view[offset:]
+        self.count = count
+        self.types = [self._string(i) for i in range(type_count)]
+
+    def _string(self, n):
+        start = self.string_end[n - 1] if n else 0
+        return bytes(self.blob[start:self.string_end[n]]).decode("utf-8")
+
+    def place(self, i):
+        """Row ``i`` shaped like PlaceSerializer output."""
+        base = len(self.types)
+        return {
+            "id": self.id[i],
+            "name": self._string(base + i),
+            "place_type": self.types[self.type[i]],
+            "description": self._string(base + 2 * self.count + i),
+            "lat": self.lat[i],
+            "lng": self.lng[i],
+            "address": self._string(base + self.count + i),
+        }
+
+    def within(self, lat, lng, radius):
+        """Rows inside the box lat +/- radius, lng +/- radius, in id order."""
+        lo = bisect_left(self.lat, lat - radius)
+        hi = bisect_right(self.lat, lat + radius)
+        lng_min, lng_max = lng - radius, lng + radius
+        lngs = self.lng
+        rows = [i for i in range(lo, hi) if lng_min <= lngs[i] <= lng_max]
+        rows.sort(key=self.id.__getitem__)
+        return rows
+
+    def nearest(self, lat, lng, limit=1, place_type=None, max_km=None):
+        """[(row, distance_km)] of the ``limit`` closest places, closest first."""
+        type_code = None
+        if place_type is not None:
+            if place_type not in self.types:
+                return []
+            type_code = self.types.index(place_type)
+
+        kx = cos(radians(lat))
+        bound = max_km / KM_PER_DEGREE if max_km is not None else float("inf")
+        best = []  # max-heap of (-distance, row) in degrees
+        lats, lngs, types = self.lat, self.lng, self.type
+
+        def worst():
+            return -best[0][0] if len(best) == limit else bound
+
+        # Walk outwards from the query latitude in both directions; a row
+        # whose latitude alone is further than the current k-th best
+        # cannot improve on it, nor can anything beyond it.
+        up = bisect_left(lats, lat)
+        down = up - 1
+        while up < self.count or down >= 0:
+            if up < self.count and (down < 0 or lats[up] - lat <= lat - lats[down]):
+                i = up
+                up += 1
+            else:
+                i = down
+                down -= 1
+            dy = lats[i] - lat
+            if abs(dy) > worst():
+                break
+            if type_code is not None and types[i] != type_code:
+                continue
+            dx = ((lngs[i] - lng + 180.0) % 360.0 - 180.0) * kx
+            d = sqrt(dx * dx + dy * dy)
+            if d <= worst():
+                if len(best) == limit:
+                    heapq.heapreplace(best, (-d, i))
+                else:
+                    heapq.heappush(best, (-d, i))
+        return [(i, -d * KM_PER_DEGREE) for d, i in sorted(best, reverse=True)]
+
+
+# ---------------------------
+# Shared store per process
+# ---------------------------
+def rebuild(path=None):
+    """Rewrite the store from the Place table; returns the number of rows."""
+    path = str(path or settings.POI_STORE_PATH)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rows = Place.objects.values_list('id', 'name', 'place_type', 'description', 'lat', 'lng', 'address')
+    # Write next to the target and swap, so readers keep their old mapping
+    tmp = f"{path}.{os.getpid()}.tmp"
+    count = write_poi_store(tmp, list(rows.iterator(chunk_size=5000)))
+    os.replace(tmp, path)
+    _current["checked"] = 0
+    return count
+
+
+# Place saves and deletes only mark the store dirty; one background
+# rebuild runs POI_STORE_REBUILD_DELAY seconds later and picks up every
+# change committed by then, so a bulk import rewrites the file once.
+_pending = {"timer": None, "pid": None}
+_pending_lock = threading.Lock()
+
+
+def schedule_rebuild():
+    """Rebuild the store shortly, off the calling thread."""
+    with _pending_lock:
+        if _pending["timer"] is not None and _pending["pid"] == os.getpid():
+            return
+        timer = threading.Timer(settings.POI_STORE_REBUILD_DELAY, _scheduled_rebuild)
+        timer.daemon = True
+        _pending["timer"], _pending["pid"] = timer, os.getpid()
+        timer.start()
+
+
+def _scheduled_rebuild():
+    with _pending_lock:
+        if _pending["timer"] is None:
+            return
+        # Cleared before reading, so a save committed mid-rebuild schedules another
+        _pending["timer"] = None
+    try:
+        rebuild()
+    except Exception:
+        logger.exception("POI store rebuild failed")
+    finally:
+        connections.close_all()
+
+
+@atexit.register
+def _rebuild_pending():
+    """Short-lived processes (imports, shells) exit before the timer fires."""
+    with _pending_lock:
+        timer = _pending["timer"]
+        if timer is None or _pending["pid"] != os.getpid():
+            return
+        timer.cancel()
+    _scheduled_rebuild()
+
+
+_current = {"store": None, "stat": None, "checked": 0}
+_lock = threading.Lock()
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns
+
+
+def get_store():
+    """The current store, built from the database the first time it is needed."""
+    now = time.monotonic()
+    if _current["store"] is not None and now - _current["checked"] < settings.POI_STORE_RECHECK_SECONDS:
+        return _current["store"]
+
+    with _lock:
+        path = str(settings.POI_STORE_PATH)
+        stat = _stat(path)
+        if stat is None:
+            rebuild(path)
+            stat = _stat(path)
+        if stat != _current["stat"]:
+            _current["store"] = PoiStore(path)
+            _current["stat"] = stat
+        _current["checked"] = time.monotonic()
+        return _current["store"]
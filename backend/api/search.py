@@ -0,0 +1,169 @@
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import connections
+from django.db.models import Q
+
+from . import sharding
+from .models import TouristProfile
+
+
+# Tourist search for authorities. On SQLite it runs against the FTS5
+# table api_touristsearch (migration 0009), which triggers keep in step
+# with api_touristprofile. The last query term matches as a prefix; a term of
+# FUZZY_MIN_LENGTH characters or more that matches nothing is widened to
+# indexed words within a small edit distance, found in the vocabulary of
+# api_touristwords (names, nationalities, countries and hotels only).
+
+SEARCH_TABLE = "api_touristsearch"
+VOCAB_TABLE = "api_touristsearch_vocab"
+WORDS_TABLE = "api_touristwords"
+WORDS_VOCAB_TABLE = "api_touristwords_vocab"
+SEARCH_FIELDS = ("name", "email", "phone", "nationality", "country", "hotel_name", "blockchain_id")
+# bm25 weights per column, in SEARCH_FIELDS order
+COLUMN_WEIGHTS = (10.0, 6.0, 6.0, 2.0, 1.0, 2.0, 8.0)
+FUZZY_MIN_LENGTH = 4
+FUZZY_CANDIDATES = 10
+MAX_TERMS = 8
+# A last term in this many profiles is taken as a whole word, not a prefix
+COMMON_TERM_DOCS = 1000
+EXACT_EMAIL_SCORE = 1000.0
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+PHONE_RE = re.compile(r"^[\d\s()+-]*\d[\d\s()+-]*$")
+
+
+def tokens(query):
+    query = (query or "").strip()
+    if PHONE_RE.match(query):
+        # A phone number: match the digits-only form the index stores
+        return [re.sub(r"\D", "", query)]
+    return [token.lower() for token in TOKEN_RE.findall(query)][:MAX_TERMS]
+
+
+def _max_edits(term):
+    return 1 if len(term) < 8 else 2
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance, or limit + 1 once it is known to exceed ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _ensure_vocab(cursor):
+    for vocab, table in ((VOCAB_TABLE, SEARCH_TABLE), (WORDS_VOCAB_TABLE, WORDS_TABLE)):
+        cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS temp.{vocab} USING fts5vocab(main, {table}, 'row')")
+
+
+def _fuzzy_terms(cursor, term):
+    """Indexed terms within a small edit distance of ``term``, most common first.
+
+    Typos in the first two characters are rare, so candidates are read
+    from that slice of the (sorted) vocabulary only.
+    """
+    limit = _max_edits(term)
+    head, rest = term[:2], term[2:]
+    # With at most ``limit`` edits, one of limit + 1 pieces of the rest of
+    # the term survives verbatim; SQLite discards most of the slice on that
+    # before any distance is computed in Python
+    size = -(-len(rest) // (limit + 1))
+    pieces = [rest[i:i + size] for i in range(0, len(rest), size)] or [""]
+    survives = " OR ".join(["instr(term, %s) > 0"] * len(pieces))
+    cursor.execute(
+        f"SELECT term, doc FROM temp.{WORDS_VOCAB_TABLE} WHERE term >= %s AND term < %s "
+        f"AND length(term) BETWEEN %s AND %s AND ({survives})",
+        [head, head + "\uffff", len(term) - limit, len(term) + limit, *pieces],
+    )
+    matches = [
+        (doc, candidate) for candidate, doc in cursor.fetchall()
+        if candidate != term and edit_distance(term, candidate, limit) <= limit
+    ]
+    matches.sort(reverse=True)
+    return [candidate for _, candidate in matches[:FUZZY_CANDIDATES]]
+
+
+def _term_docs(cursor, term):
+    """How many profiles contain ``term`` as a whole word."""
+    cursor.execute(f"SELECT doc FROM temp.{VOCAB_TABLE} WHERE term = %s", [term])
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def _has_prefix(cursor, term):
+    cursor.execute(
+        f"SELECT 1 FROM temp.{VOCAB_TABLE} WHERE term >= %s AND term < %s LIMIT 1",
+        [term, term + "\uffff"],
+    )
+    return cursor.fetchone() is not None
+
+
+def _match_expression(cursor, terms):
+    """MATCH string: every term must match, the last one as a prefix.
+
+    Earlier terms are matched whole, which lets FTS5 seek through a single
+    doclist. A prefix query merges the doclists of every matching term,
+    so a last term that is already a very common word is matched whole too.
+    """
+    clauses = []
+    for i, term in enumerate(terms):
+        docs = _term_docs(cursor, term)
+        prefix = i == len(terms) - 1 and docs < COMMON_TERM_DOCS
+        options = [f'"{term}"*' if prefix else f'"{term}"']
+        # Only look for near misses when the term matches nothing as typed;
+        # numbers (phones, IDs) are never corrected
+        found = docs or (prefix and _has_prefix(cursor, term))
+        if len(term) >= FUZZY_MIN_LENGTH and not term.isdigit() and not found:
+            options += [f'"{candidate}"' for candidate in _fuzzy_terms(cursor, term)]
+        clauses.append("(" + " OR ".join(options) + ")")
+    return " AND ".join(clauses)
+
+
+def search_tourists(query, limit=20):
+    """[(profile id, score)] best first in the current shard; higher scores are better matches."""
+    query = (query or "").strip()
+    if EMAIL_RE.match(query):
+        # A whole address: the unique index on email answers it directly
+        exact = list(
+            TouristProfile.objects.filter(email__in={query, query.lower()}).values_list('id', flat=True)[:limit]
+        )
+        if exact:
+            return [(pk, EXACT_EMAIL_SCORE) for pk in exact]
+
+    terms = tokens(query)
+    if not terms:
+        return []
+    connection = connections[sharding.current_database()]
+    if connection.vendor != "sqlite":
+        return _search_fallback(terms, limit)
+
+    with connection.cursor() as cursor:
+        _ensure_vocab(cursor)
+        match = _match_expression(cursor, terms)
+        weights = ", ".join(str(w) for w in COLUMN_WEIGHTS)
+        cursor.execute(
+            f"SELECT rowid, bm25({SEARCH_TABLE}, {weights}) AS rank FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE} MATCH %s ORDER BY rank LIMIT %s",
+            [match, limit],
+        )
+        # bm25() is negative, lower is better
+        return [(pk, round(-rank, 3)) for pk, rank in cursor.fetchall()]
+
+
+def _search_fallback(terms, limit):
+    """Unindexed substring search for databases without FTS5."""
+    queryset = TouristProfile.objects.all()
+    for term in terms:
+        queryset = queryset.filter(reduce(or_, (Q(**{f"{field}__icontains": term}) for field in SEARCH_FIELDS)))
+    return [(pk, 0.0) for pk in queryset.order_by('-created_at').values_list('id', flat=True)[:limit]]
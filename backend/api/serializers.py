@@ -30,10 +30,13 @@ class TouristProfileSerializer(serializers.ModelSerializer):
             'departure_date',
             'hotel_name',
             'hotel_address',
+            'region',
             'contacts',
             'created_at',
             'updated_at'
         ]
+        # Fixed at registration: it names the shard holding the profile
+        read_only_fields = ['region']
 
     def get_profile_photo(self, obj):
         if obj.profile_photo:
@@ -44,6 +47,14 @@ class TouristProfileSerializer(serializers.ModelSerializer):
         return None
 
 
+class TouristProfileSyncSerializer(TouristProfileSerializer):
+    """Profile without nested contacts, which the sync API sends as their own rows."""
+    contacts = None
+
+    class Meta(TouristProfileSerializer.Meta):
+        fields = [f for f in TouristProfileSerializer.Meta.fields if f != 'contacts']
+
+
 class PlaceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Place
@@ -70,8 +81,15 @@ class IncidentSerializer(serializers.ModelSerializer):
             'lat',
             'lng',
             'evidence',
-            'resolved'
+            'resolved',
+            'acknowledged_at',
+            'assigned_to',
+            'resolved_at',
+            'version',
+            'hit_count',
+            'last_seen_at'
         ]
+        read_only_fields = ['version', 'hit_count', 'last_seen_at']
 
 
 class AuthorityProfileSerializer(serializers.ModelSerializer):
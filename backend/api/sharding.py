@@ -0,0 +1,331 @@
+import functools
+import heapq
+import itertools
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, transaction
+
+from .geocoding import forward_geocode
+
+
+# Regional sharding of tourist and incident data. SHARD_REGIONS maps each
+# region to a database and the bounding box it covers; several regions
+# may share a database.
+#
+# - A tourist belongs to the region of the location given at
+#   registration, for good. Their user account, contacts, incidents,
+#   tracks, credentials and sync log live in that region's database, as
+#   do the rollups counting them, so foreign keys never cross databases.
+# - Authorities, places and photo blobs are national and stay in
+#   "default" (places are reference data every region reads).
+# - Each database hands out ids from its own range of SHARD_ID_SPAN
+#   (`manage.py init_shards` sets the sequences), so any id tells which
+#   database holds its row.
+#
+# ShardMiddleware scopes a request to one database from the ids it
+# names (tourist_id, alert_id, pk, user_id, profile) or ?region=, and
+# ShardRouter sends sharded models inside the scope to that database
+# only. Views that span the country run one query per database in
+# parallel with scatter() and merge the results.
+
+_scope = ContextVar("shard_scope", default=None)
+
+NATIONAL_MODELS = {"authorityprofile", "photoblob", "place"}
+
+
+# ---------------------------
+# Regions and databases
+# ---------------------------
+def databases():
+    """Shard databases in id-range order ("default" first)."""
+    aliases = [DEFAULT_DB_ALIAS]
+    for region in settings.SHARD_REGIONS.values():
+        if region["database"] not in aliases:
+            aliases.append(region["database"])
+    return aliases
+
+
+def is_sharded():
+    return len(databases()) > 1
+
+
+def id_range(database):
+    """First and last id handed out by ``database``."""
+    start = databases().index(database) * settings.SHARD_ID_SPAN
+    return start + 1, start + settings.SHARD_ID_SPAN - 1
+
+
+def database_for_id(pk):
+    index = int(pk) // settings.SHARD_ID_SPAN
+    aliases = databases()
+    return aliases[index] if 0 <= index < len(aliases) else DEFAULT_DB_ALIAS
+
+
+def database_for_region(region):
+    config = settings.SHARD_REGIONS.get(region)
+    if config is None:
+        raise ValueError(f"Unknown region {region!r}")
+    return config["database"]
+
+
+def region_for_point(lat, lng):
+    """First region whose bbox contains the point, else SHARD_DEFAULT_REGION."""
+    if lat is not None and lng is not None:
+        for name, config in settings.SHARD_REGIONS.items():
+            bbox = config.get("bbox")
+            if bbox and bbox[0] <= lat <= bbox[2] and bbox[1] <= lng <= bbox[3]:
+                return name
+    return settings.SHARD_DEFAULT_REGION
+
+
+def region_for_addresses(*texts):
+    """Region of the first address that geocodes."""
+    for text in texts:
+        point = forward_geocode(text)
+        if point:
+            return region_for_point(*point)
+    return settings.SHARD_DEFAULT_REGION
+
+
+def databases_for_bbox(bbox):
+    """Databases holding regions that overlap ``bbox`` (south, west, north, east)."""
+    if not bbox:
+        return databases()
+    south, west, north, east = bbox
+    aliases = []
+    for name, config in settings.SHARD_REGIONS.items():
+        box = config.get("bbox")
+        overlaps = not box or (box[0] <= north and south <= box[2] and box[1] <= east and west <= box[3])
+        if overlaps and config["database"] not in aliases:
+            aliases.append(config["database"])
+    return [alias for alias in databases() if alias in aliases]
+
+
+# ---------------------------
+# Scope
+# ---------------------------
+def current_database():
+    return _scope.get() or DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def use_database(database):
+    """Send queries on sharded models to ``database`` inside the block."""
+    token = _scope.set(database)
+    try:
+        yield database
+    finally:
+        _scope.reset(token)
+
+
+def use_region(region):
+    return use_database(database_for_region(region))
+
+
+def use_id(pk):
+    return use_database(database_for_id(pk))
+
+
+def atomic():
+    """transaction.atomic() on the database of the current scope."""
+    return transaction.atomic(using=current_database())
+
+
+def on_commit(func):
+    transaction.on_commit(func, using=current_database())
+
+
+# ---------------------------
+# Scatter-gather
+# ---------------------------
+_executor = {"pid": None, "pool": None}
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    with _executor_lock:
+        if _executor["pid"] != os.getpid():
+            # Threads do not survive a fork
+            _executor["pool"] = ThreadPoolExecutor(
+                max_workers=settings.SHARD_SCATTER_THREADS, thread_name_prefix="shard"
+            )
+            _executor["pid"] = os.getpid()
+        return _executor["pool"]
+
+
+def _run(context, func, database):
+    def run():
+        # Worker threads outlive the request: drop connections the way
+        # the request cycle does (CONN_MAX_AGE, broken connections)
+        close_old_connections()
+        try:
+            with use_database(database):
+                return func(database)
+        finally:
+            close_old_connections()
+
+    return context.run(run)
+
+
+def scatter(func, aliases=None):
+    """``func(database)`` run on every shard database (or ``aliases``) in
+    parallel, each inside its scope; returns the results in database order.
+
+    Workers see committed data only, not the caller's open transaction.
+    """
+    aliases = databases() if aliases is None else list(aliases)
+    if len(aliases) == 1:
+        with use_database(aliases[0]):
+            return [func(aliases[0])]
+    # Each worker runs in a copy of the caller's context (replica routing scope)
+    contexts = [copy_context() for _ in aliases]
+    return list(_pool().map(_run, contexts, itertools.repeat(func), aliases))
+
+
+def gather(func, aliases=None):
+    """scatter() for functions returning lists; the lists concatenated."""
+    return list(itertools.chain.from_iterable(scatter(func, aliases)))
+
+
+def find(queryset):
+    """First database (in databases() order) where ``queryset`` matches a row, or None."""
+    found = scatter(lambda database: queryset.all().exists())
+    return next((database for database, hit in zip(databases(), found) if hit), None)
+
+
+def merge_sorted(results, key, reverse=False, limit=None):
+    """Merge per-shard lists that are each sorted by ``key``."""
+    merged = heapq.merge(*results, key=key, reverse=reverse)
+    return list(itertools.islice(merged, limit) if limit is not None else merged)
+
+
+def encode_cursor(ids):
+    """Change-feed cursor from one id per database; a plain id when unsharded."""
+    return ids[0] if len(ids) == 1 else ",".join(str(pk) for pk in ids)
+
+
+def decode_cursor(cursor):
+    """Ids per database (in databases() order) from encode_cursor()."""
+    ids = [int(pk) for pk in str(cursor or 0).split(",")]
+    return (ids + [0] * len(databases()))[:len(databases())]
+
+
+# ---------------------------
+# Router and middleware
+# ---------------------------
+def is_sharded_model(model):
+    meta = model._meta
+    if meta.app_label == "api":
+        return meta.model_name not in NATIONAL_MODELS
+    return model is get_user_model()
+
+
+def on_instance_database(handler):
+    """Run a model signal handler scoped to the database of the saved or
+    deleted row, so the rows it writes land next to it."""
+    @functools.wraps(handler)
+    def wrapper(sender, **kwargs):
+        with use_database(kwargs.get("using") or DEFAULT_DB_ALIAS):
+            return handler(sender, **kwargs)
+    return wrapper
+
+
+class ShardRouter:
+    """Routes sharded models to the scope's database.
+
+    Returns None for national models and the default database, so
+    ReplicaRouter (listed after this one) can still send reads to a
+    replica.
+    """
+
+    def _database(self, model, hints):
+        if not is_sharded_model(model):
+            return None
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            database = instance._state.db
+        else:
+            database = _scope.get()
+        return None if database in (None, DEFAULT_DB_ALIAS) else database
+
+    def db_for_read(self, model, **hints):
+        return self._database(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._database(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Incidents point at national authority profiles
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Every shard has the full schema
+        return None
+
+
+# URL kwargs holding a sharded id, then query or body parameters holding
+# a user or profile id; the first one present decides
+URL_ID_PARAMS = ("tourist_id", "alert_id", "pk")
+ID_PARAMS = ("user_id", "profile")
+
+
+class ShardMiddleware:
+    """Scope each request to the database its ids or ?region= point at.
+
+    Requests naming none stay on "default"; views that cover every
+    region scatter explicitly.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _scope.set(None)
+        try:
+            return self.get_response(request)
+        finally:
+            _scope.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not is_sharded():
+            return None
+        database = self._database(request, view_kwargs)
+        if database is not None:
+            _scope.set(database)
+        return None
+
+    def _database(self, request, view_kwargs):
+        for name in URL_ID_PARAMS:
+            if str(view_kwargs.get(name, "")).isdigit():
+                return database_for_id(view_kwargs[name])
+        body = self._body(request)
+        for name in ID_PARAMS:
+            value = request.GET.get(name) or body.get(name)
+            if value is not None and str(value).isdigit():
+                return database_for_id(value)
+        region = request.GET.get("region") or body.get("region")
+        if region in settings.SHARD_REGIONS:
+            return database_for_region(region)
+        return None
+
+    def _body(self, request):
+        if request.method not in ("POST", "PUT", "PATCH"):
+            return {}
+        if request.content_type == "application/json":
+            try:
+                body = json.loads(request.body or b"{}")
+            except ValueError:
+                return {}
+            return body if isinstance(body, dict) else {}
+        if request.method == "POST" and request.content_type in ("multipart/form-data",
+                                                                  "application/x-www-form-urlencoded"):
+            # DRF reuses request.POST once it has been parsed
+            return request.POST
+        return {}
@@ -0,0 +1,173 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from . import clustering, dashboard, heatmap, occupancy, photos, poi_store, sharding, sync, tourist_ids
+from .models import EmergencyContact, Incident, IncidentEvent, Place, TouristCredential, TouristProfile
+
+
+# Handlers of sharded models run scoped to the row's database
+# (sharding.on_instance_database), so logs and rollups land next to it.
+
+
+# ---------------------------
+# Incident change log and rollups (heatmap, dashboard)
+# ---------------------------
+@receiver(pre_save, sender=Incident)
+@sharding.on_instance_database
+def remember_incident_state(sender, instance, **kwargs):
+    """Capture the stored state of an incident before it is overwritten."""
+    instance._stored = None
+    if instance._state.adding or instance.pk is None:
+        return
+    instance._stored = (
+        Incident.objects.filter(pk=instance.pk)
+        .values_list('lat', 'lng', 'created_at', 'resolved', 'version')
+        .first()
+    )
+    if instance._stored:
+        instance.version = instance._stored[4] + 1
+
+
+@receiver(post_save, sender=Incident)
+@sharding.on_instance_database
+def update_incident_rollup(sender, instance, created, **kwargs):
+    stored = None if created else getattr(instance, '_stored', None)
+    IncidentEvent.objects.create(
+        incident=instance,
+        kind='created' if created else 'updated',
+        version=instance.version,
+    )
+    heatmap.apply_change(
+        heatmap.rollup_state(*stored[:4]) if stored else None,
+        heatmap.incident_state(instance),
+    )
+    dashboard.apply_change(
+        dashboard.incident_keys(stored[3]) if stored else None,
+        dashboard.incident_keys(instance.resolved),
+    )
+
+
+@receiver(post_delete, sender=Incident)
+@sharding.on_instance_database
+def remove_incident_from_rollup(sender, instance, **kwargs):
+    IncidentEvent.objects.create(incident_id=instance.pk, kind='deleted', version=instance.version)
+    heatmap.apply_change(heatmap.incident_state(instance), None)
+    dashboard.apply_change(dashboard.incident_keys(instance.resolved), None)
+
+
+# ---------------------------
+# Dashboard summary, occupancy, photo references and IDs (tourists)
+# ---------------------------
+@receiver(pre_save, sender=TouristProfile)
+@sharding.on_instance_database
+def remember_tourist_state(sender, instance, **kwargs):
+    instance.region_x, instance.region_y = occupancy.region_of(instance.hotel_address, instance.to_address)
+    instance._stored = None
+    if instance._state.adding or instance.pk is None:
+        return
+    instance._stored = (
+        TouristProfile.objects.filter(pk=instance.pk)
+        .values_list(
+            'nationality', 'arrival_date', 'departure_date', 'profile_photo', 'region_x', 'region_y', 'name'
+        )
+        .first()
+    )
+
+
+@receiver(post_save, sender=TouristProfile)
+@sharding.on_instance_database
+def update_tourist_summary(sender, instance, created, **kwargs):
+    stored = None if created else getattr(instance, '_stored', None)
+    dashboard.apply_change(
+        dashboard.tourist_keys(*stored[:3]) if stored else None,
+        dashboard.tourist_keys(instance.nationality, instance.arrival_date, instance.departure_date),
+    )
+    occupancy.apply_change(
+        occupancy.stay_state(stored[4], stored[5], stored[1], stored[2]) if stored else None,
+        occupancy.profile_state(instance),
+    )
+    photos.apply_change(stored[3] if stored else None, instance.profile_photo.name)
+    if stored and (stored[6], stored[0]) != (instance.name, instance.nationality):
+        # Issued IDs carry the old name or nationality
+        tourist_ids.revoke(instance.credentials.all())
+
+
+@receiver(pre_delete, sender=TouristProfile)
+@sharding.on_instance_database
+def revoke_tourist_ids(sender, instance, **kwargs):
+    # Before the delete sets their profile to NULL
+    tourist_ids.revoke(TouristCredential.objects.filter(profile=instance))
+
+
+@receiver(post_delete, sender=TouristProfile)
+@sharding.on_instance_database
+def remove_tourist_from_summary(sender, instance, **kwargs):
+    dashboard.apply_change(
+        dashboard.tourist_keys(instance.nationality, instance.arrival_date, instance.departure_date),
+        None,
+    )
+    occupancy.apply_change(occupancy.profile_state(instance), None)
+    photos.bump(instance.profile_photo.name, -1)
+
+
+# ---------------------------
+# Map cluster indexes
+# ---------------------------
+@receiver(post_save, sender=Place)
+@receiver(post_delete, sender=Place)
+def invalidate_place_clusters(sender, **kwargs):
+    clustering.invalidate("places")
+
+
+@receiver(post_save, sender=Place)
+@receiver(post_delete, sender=Place)
+def rebuild_poi_store(sender, **kwargs):
+    transaction.on_commit(poi_store.schedule_rebuild)
+
+
+@receiver(post_save, sender=Incident)
+@receiver(post_delete, sender=Incident)
+def invalidate_incident_clusters(sender, **kwargs):
+    clustering.invalidate("incidents")
+
+
+# ---------------------------
+# Mobile sync log
+# ---------------------------
+SYNC_KINDS = {TouristProfile: 'profile', EmergencyContact: 'contact', Incident: 'incident'}
+
+
+@receiver(post_save, sender=TouristProfile)
+@receiver(post_save, sender=EmergencyContact)
+@receiver(post_save, sender=Incident)
+@sharding.on_instance_database
+def log_sync_change(sender, instance, **kwargs):
+    owner = instance.pk if sender is TouristProfile else instance.profile_id
+    sync.changed(SYNC_KINDS[sender], [(instance.pk, owner)])
+
+
+@receiver(post_delete, sender=TouristProfile)
+@receiver(post_delete, sender=EmergencyContact)
+@receiver(post_delete, sender=Incident)
+@sharding.on_instance_database
+def log_sync_deletion(sender, instance, **kwargs):
+    owner = instance.pk if sender is TouristProfile else instance.profile_id
+    sync.deleted(SYNC_KINDS[sender], [(instance.pk, owner)])
+
+
+@receiver(pre_save, sender=Place)
+def remember_place_position(sender, instance, **kwargs):
+    instance._stored_position = None
+    if not instance._state.adding and instance.pk is not None:
+        instance._stored_position = Place.objects.filter(pk=instance.pk).values_list('lat', 'lng').first()
+
+
+@receiver(post_save, sender=Place)
+def log_place_sync_change(sender, instance, **kwargs):
+    sync.place_changed(instance.pk, instance.lat, instance.lng, getattr(instance, '_stored_position', None))
+
+
+@receiver(post_delete, sender=Place)
+def log_place_sync_deletion(sender, instance, **kwargs):
+    sync.place_deleted(instance.pk, instance.lat, instance.lng)
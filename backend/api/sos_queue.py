@@ -0,0 +1,314 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, close_old_connections
+from django.utils import timezone
+
+from . import notifications, sharding
+from .actions import create_sos_incidents
+from .models import TouristProfile
+
+
+logger = logging.getLogger(__name__)
+
+LOG_NAME = "sos.log"
+OFFSET_NAME = "sos.offset"
+DRAIN_LOCK_NAME = "sos.drain.lock"
+DEAD_LETTER_NAME = "sos.dead"
+
+# Failures caused by one record rather than by the database being
+# unavailable; such a record is set aside instead of blocking the queue
+RECORD_ERRORS = (IntegrityError, DataError, KeyError, TypeError, ValueError)
+
+
+# SOS alerts are appended to a local, fsync'd log and acknowledged right
+# away; a background writer, started with each gunicorn worker, drains
+# the log into Incident rows in batches.
+# Replays after a crash are harmless because every record carries an
+# idempotency key that is unique on Incident. The SOS fan-out of newly
+# opened incidents is queued in api.notifications' outbox in the same
+# transaction and delivered right after the batch. A record that cannot be
+# stored goes to a dead-letter file (DEAD_LETTER_NAME) so the records
+# behind it still are.
+
+def _queue_dir():
+    path = Path(settings.SOS_QUEUE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+# ---------------------------
+# Append side (request path)
+# ---------------------------
+class _Log:
+    """Per-process append handle with group commit of fsyncs."""
+
+    def __init__(self):
+        self.pid = None
+        self.path = None
+        self.fd = None
+        self.write_lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        self.written = 0
+        self.synced = 0
+
+    def _open(self):
+        path = _queue_dir() / LOG_NAME
+        if self.fd is None or self.pid != os.getpid() or self.path != path:
+            # Reopen after fork so workers do not share a descriptor
+            self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            self.pid = os.getpid()
+            self.path = path
+        return self.fd
+
+    def append(self, line):
+        with self.write_lock:
+            fd = self._open()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                os.write(fd, line)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self.written += 1
+            sequence = self.written
+
+        # One fsync covers every append written before it
+        with self.sync_lock:
+            if self.synced < sequence:
+                target = self.written
+                os.fsync(fd)
+                self.synced = target
+
+
+_log = _Log()
+
+
+@lru_cache(maxsize=65536)
+def profile_id_for_user(user_id):
+    """Tourist profile id for a user, cached because the mapping never changes.
+
+    Raises TouristProfile.DoesNotExist (not cached) when there is none;
+    a profile deleted later is caught when the record is drained.
+    """
+    profile_id = TouristProfile.objects.filter(user_id=user_id).values_list('id', flat=True).first()
+    if profile_id is None:
+        raise TouristProfile.DoesNotExist
+    return profile_id
+
+
+def check_coordinates(lat, lng):
+    """Raise ValueError unless lat/lng are finite and in range."""
+    # Comparisons with NaN are false, so it fails the range check too
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError("lat/lng out of range")
+
+
+def enqueue(profile_id, lat, lng, description, key=None):
+    """Durably record an SOS alert; returns the record once it is on disk.
+
+    Raises ValueError for coordinates the drainer could not store.
+    """
+    lat, lng = float(lat), float(lng)
+    check_coordinates(lat, lng)
+    record = {
+        "key": key or uuid.uuid4().hex,
+        "profile_id": profile_id,
+        "lat": lat,
+        "lng": lng,
+        "description": description,
+        "received_at": timezone.now().isoformat(),
+    }
+    _log.append((json.dumps(record, separators=(",", ":")) + "\n").encode())
+    _wake_writer()
+    return record
+
+
+# ---------------------------
+# Drain side (background writer)
+# ---------------------------
+def _read_offset(path):
+    try:
+        return int(path.read_text() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _write_offset(path, offset):
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        f.write(str(offset))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _read_batch(f, limit):
+    """Up to ``limit`` complete lines; a trailing partial line is left for later."""
+    records = []
+    consumed = 0
+    while len(records) < limit:
+        line = f.readline()
+        if not line.endswith(b"\n"):
+            break
+        consumed += len(line)
+        try:
+            records.append(json.loads(line))
+        except ValueError as e:
+            _dead_letter(line.decode(errors="replace"), e)
+    return records, consumed
+
+
+def _dead_letter(record, error):
+    """Set aside a record that cannot be stored, durably, for inspection."""
+    logger.error("SOS queue record moved to %s (%s): %r", DEAD_LETTER_NAME, error, record)
+    line = json.dumps(
+        {"record": record, "error": repr(error), "failed_at": timezone.now().isoformat()},
+        separators=(",", ":"),
+    )
+    with open(_queue_dir() / DEAD_LETTER_NAME, "a") as f:
+        f.write(line + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _check_record(record):
+    int(record["profile_id"])
+    str(record["key"])
+    check_coordinates(float(record["lat"]), float(record["lng"]))
+    datetime.fromisoformat(record["received_at"])
+
+
+def _create_incidents(records):
+    """create_sos_incidents() in the shard of each record's tourist;
+    returns [(database, new incidents)]."""
+    groups = {}
+    for record in records:
+        try:
+            _check_record(record)
+        except RECORD_ERRORS as e:
+            _dead_letter(record, e)
+            continue
+        groups.setdefault(sharding.database_for_id(record["profile_id"]), []).append(record)
+    created = []
+    for database, batch in groups.items():
+        with sharding.use_database(database):
+            try:
+                incidents = create_sos_incidents(batch)
+            except RECORD_ERRORS:
+                # One bad record fails the whole batch; find it by storing
+                # the records one at a time
+                incidents = []
+                for record in batch:
+                    try:
+                        incidents += create_sos_incidents([record])
+                    except RECORD_ERRORS as e:
+                        _dead_letter(record, e)
+            created.append((database, incidents))
+    return created
+
+
+def drain():
+    """Move queued alerts into Incident rows; returns how many records were read.
+
+    Only one process drains at a time (flock on DRAIN_LOCK_NAME); others
+    return 0 immediately.
+    """
+    queue_dir = _queue_dir()
+    log_path = queue_dir / LOG_NAME
+    offset_path = queue_dir / OFFSET_NAME
+    if not log_path.exists():
+        return 0
+
+    with open(queue_dir / DRAIN_LOCK_NAME, "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return 0
+
+        drained = 0
+        offset = _read_offset(offset_path)
+        with open(log_path, "rb") as f:
+            f.seek(offset)
+            while True:
+                records, consumed = _read_batch(f, settings.SOS_QUEUE_BATCH_SIZE)
+                if not consumed:
+                    break
+                created = _create_incidents(records)
+                offset += consumed
+                _write_offset(offset_path, offset)
+                drained += len(records)
+                databases = [database for database, incidents in created if incidents]
+                if databases:
+                    try:
+                        notifications.deliver_due(databases)
+                    except Exception:
+                        # Still in the outbox; the next deliver_due() sends them
+                        logger.exception("Could not start SOS notification delivery")
+
+        if offset >= settings.SOS_QUEUE_ROTATE_BYTES:
+            _rotate(log_path, offset_path, offset)
+        return drained
+
+
+def _rotate(log_path, offset_path, offset):
+    """Truncate the log once everything in it has been drained."""
+    with open(log_path, "ab") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            if os.fstat(f.fileno()).st_size == offset:
+                _write_offset(offset_path, 0)
+                os.truncate(log_path, 0)
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+_wakeup = threading.Event()
+_writer = {"pid": None, "thread": None}
+_writer_lock = threading.Lock()
+
+
+def _writer_loop():
+    polled = 0
+    while True:
+        _wakeup.wait(settings.SOS_QUEUE_DRAIN_INTERVAL)
+        _wakeup.clear()
+        try:
+            drain()
+        except Exception:
+            logger.exception("SOS queue drain failed; will retry")
+        # Retries, and rows left behind by a process that died; polled from
+        # worker boot on, and even while draining fails
+        if time.monotonic() - polled >= settings.NOTIFY_POLL_SECONDS:
+            polled = time.monotonic()
+            try:
+                notifications.deliver_due()
+            except Exception:
+                logger.exception("Outbox delivery failed; will retry")
+        close_old_connections()
+
+
+def start_writer():
+    """Start this process's background writer thread if it is not running."""
+    if not settings.SOS_QUEUE_DRAIN_IN_PROCESS:
+        return
+    with _writer_lock:
+        thread = _writer["thread"]
+        if thread and thread.is_alive() and _writer["pid"] == os.getpid():
+            return
+        thread = threading.Thread(target=_writer_loop, name="sos-queue-writer", daemon=True)
+        thread.start()
+        _writer.update(pid=os.getpid(), thread=thread)
+
+
+def _wake_writer():
+    start_writer()
+    _wakeup.set()
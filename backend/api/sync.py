@@ -0,0 +1,275 @@
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Exists, OuterRef, Q
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from . import sharding
+from .assets import compress_body
+from .models import EmergencyContact, Incident, Place, SyncChange, TouristProfile
+from .serializers import (
+    EmergencyContactSerializer,
+    IncidentSerializer,
+    PlaceSerializer,
+    TouristProfileSyncSerializer,
+)
+
+
+# Delta sync for offline-first mobile clients. Signals (and the set-based
+# operations in api.actions) log every change to a synced row in
+# SyncChange, whose id is the row's change version. A client sends back
+# the cursor from its last response and receives only rows changed since:
+# its own profile, contacts and incidents, plus places inside its bbox.
+#
+# The log keeps one row per object: each change drops the older ones.
+# Deletions leave a tombstone, kept for SYNC_TOMBSTONE_DAYS. A place that
+# moves also leaves a tombstone at its old position, so clients whose
+# bbox it left remove it. Cursors carry the time of the sync they close,
+# and one older than the tombstone retention starts a full resync.
+#
+# A tourist's log lives in their shard (api.sharding). Places are national,
+# so their changes are logged in every shard and a sync never leaves the
+# tourist's database.
+#
+# A row numbered below a cursor may commit after that cursor was handed
+# out, so each sync also resends rows logged in the SYNC_REREAD_SECONDS
+# before the previous one. Resending is harmless: the log holds only each
+# object's latest change, and rows still come out in version order.
+
+KINDS = ('profile', 'contact', 'place', 'incident')
+# Keeps each object_id__in list well under SQLite's bound-parameter limit
+ID_BATCH_SIZE = 500
+
+
+# ---------------------------
+# Recording changes
+# ---------------------------
+def _log(kind, entries):
+    """Store ``entries`` (unsaved SyncChange rows of one kind) and drop the rows they supersede."""
+    if not entries:
+        return
+    now = timezone.now()
+    for entry in entries:
+        entry.kind = kind
+        entry.changed_at = now
+    created = SyncChange.objects.bulk_create(entries, batch_size=ID_BATCH_SIZE)
+    first_id = min(entry.id for entry in created)
+    object_ids = list({entry.object_id for entry in created})
+    for start in range(0, len(object_ids), ID_BATCH_SIZE):
+        older = SyncChange.objects.filter(
+            kind=kind, object_id__in=object_ids[start:start + ID_BATCH_SIZE], id__lt=first_id
+        )
+        if kind == 'place':
+            # Tombstones at old positions still matter to other bboxes
+            older = older.filter(deleted=False)
+        older.delete()
+
+
+def changed(kind, rows):
+    """Log changes to ``rows``: (object id, owning profile id) pairs."""
+    _log(kind, [SyncChange(object_id=pk, profile_id=profile_id) for pk, profile_id in rows])
+
+
+def deleted(kind, rows):
+    """Log deletion of ``rows``: (object id, owning profile id) pairs."""
+    _log(kind, [SyncChange(object_id=pk, profile_id=profile_id, deleted=True) for pk, profile_id in rows])
+
+
+def _log_everywhere(kind, entries):
+    for database in sharding.databases():
+        with sharding.use_database(database):
+            # bulk_create sets ids on the instances, so each shard gets copies
+            _log(kind, [
+                SyncChange(object_id=e.object_id, lat=e.lat, lng=e.lng, deleted=e.deleted) for e in entries
+            ])
+
+
+def place_changed(pk, lat, lng, old_position=None):
+    """Log a saved place in every shard; ``old_position`` (lat, lng) if it moved."""
+    entries = []
+    if old_position and old_position != (lat, lng):
+        entries.append(SyncChange(object_id=pk, lat=old_position[0], lng=old_position[1], deleted=True))
+    entries.append(SyncChange(object_id=pk, lat=lat, lng=lng))
+    _log_everywhere('place', entries)
+
+
+def place_deleted(pk, lat, lng):
+    _log_everywhere('place', [SyncChange(object_id=pk, lat=lat, lng=lng, deleted=True)])
+
+
+def incidents_changed(ids):
+    """Log changes to incidents updated in bulk (no signals fire for those)."""
+    ids = list(ids)
+    rows = []
+    for start in range(0, len(ids), ID_BATCH_SIZE):
+        rows += Incident.objects.filter(id__in=ids[start:start + ID_BATCH_SIZE]).values_list('id', 'profile_id')
+    changed('incident', rows)
+
+
+def backfill():
+    """Log every synced row that has no entry yet in the current shard's log
+    (rows from before the log existed, or written with queryset.update());
+    returns how many were added."""
+    sources = (
+        ('profile', TouristProfile, ('id',), lambda row: SyncChange(object_id=row[0], profile_id=row[0])),
+        ('contact', EmergencyContact, ('id', 'profile_id'),
+         lambda row: SyncChange(object_id=row[0], profile_id=row[1])),
+        ('incident', Incident, ('id', 'profile_id'), lambda row: SyncChange(object_id=row[0], profile_id=row[1])),
+        ('place', Place, ('id', 'lat', 'lng'), lambda row: SyncChange(object_id=row[0], lat=row[1], lng=row[2])),
+    )
+    added = 0
+    for kind, model, fields, entry in sources:
+        if sharding.is_sharded_model(model) or sharding.current_database() == DEFAULT_DB_ALIAS:
+            logged = SyncChange.objects.filter(kind=kind, object_id=OuterRef('id'), deleted=False)
+            rows = model.objects.filter(~Exists(logged)).order_by('id').values_list(*fields).iterator(chunk_size=2000)
+        else:
+            # Places are in another database than this shard's log
+            logged_ids = set(SyncChange.objects.filter(kind=kind, deleted=False).values_list('object_id', flat=True))
+            rows = model.objects.order_by('id').values_list(*fields).iterator(chunk_size=2000)
+            rows = (row for row in rows if row[0] not in logged_ids)
+        batch = []
+        for row in rows:
+            batch.append(entry(row))
+            if len(batch) == 2000:
+                _log(kind, batch)
+                added += len(batch)
+                batch = []
+        _log(kind, batch)
+        added += len(batch)
+    return added
+
+
+def prune(days=None):
+    """Delete tombstones older than ``days`` (default SYNC_TOMBSTONE_DAYS); returns the count."""
+    days = settings.SYNC_TOMBSTONE_DAYS if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    count, _ = SyncChange.objects.filter(deleted=True, changed_at__lt=cutoff).delete()
+    return count
+
+
+# ---------------------------
+# Reading changes
+# ---------------------------
+def encode_cursor(version, synced_at):
+    return f"{version}.{int(synced_at)}"
+
+
+def decode_cursor(cursor):
+    """(version, synced at) from a cursor; (0, None) when there is none."""
+    if not cursor:
+        return 0, None
+    version, _, synced_at = cursor.partition(".")
+    try:
+        return int(version), int(synced_at)
+    except ValueError:
+        raise ValueError("Invalid sync cursor")
+
+
+def changes_since(profile_id, since, bbox=None, limit=None, reread_from=None):
+    """Log rows after ``since`` visible to a tourist, oldest first; returns (rows, has_more).
+
+    Rows at or below ``since`` logged at ``reread_from`` or later are
+    included too, beyond ``limit``.
+    """
+    limit = limit or settings.SYNC_BATCH_SIZE
+    visible = Q(profile_id=profile_id)
+    if bbox:
+        south, west, north, east = bbox
+        visible |= Q(kind='place', lat__range=(south, north), lng__range=(west, east))
+    rows = list(SyncChange.objects.filter(profile_id=profile_id, id__gt=since).order_by('id')[:limit + 1])
+    if bbox:
+        rows += SyncChange.objects.filter(
+            kind='place', id__gt=since, lat__range=(south, north), lng__range=(west, east)
+        ).order_by('id')[:limit + 1]
+        rows.sort(key=lambda row: row.id)
+    rows, has_more = rows[:limit], len(rows) > limit
+    if reread_from is not None and since:
+        late = SyncChange.objects.filter(visible, id__lte=since, changed_at__gte=reread_from).order_by('id')
+        rows = list(late) + rows
+    return rows, has_more
+
+
+def _records(rows, request):
+    """Serialized objects for the live rows in ``rows``, by kind and id."""
+    ids = {kind: [] for kind in KINDS}
+    for row in rows:
+        if not row.deleted:
+            ids[row.kind].append(row.object_id)
+    context = {'request': request}
+    sources = (
+        ('profile', TouristProfile.objects.all(), TouristProfileSyncSerializer),
+        ('contact', EmergencyContact.objects.all(), EmergencyContactSerializer),
+        ('place', Place.objects.all(), PlaceSerializer),
+        ('incident', Incident.objects.all(), IncidentSerializer),
+    )
+    records = {}
+    for kind, queryset, serializer in sources:
+        if ids[kind]:
+            objects = queryset.filter(id__in=ids[kind])
+            records[kind] = {
+                data['id']: data for data in serializer(objects, many=True, context=context).data
+            }
+    return records
+
+
+def sync(profile_id, cursor=None, bbox=None, limit=None, request=None):
+    """The sync response for one tourist after ``cursor``.
+
+    Changes come oldest first as {"type", "id", "version", "data"} or,
+    for deletions, {"type", "id", "version", "deleted": true}. "reset"
+    means the client must discard what it holds (its cursor is too old
+    to replay deletions), and "has_more" that it should ask again at once
+    with the new cursor.
+    """
+    since, synced_at = decode_cursor(cursor)
+    now = time.time()
+    reset = synced_at is not None and synced_at < now - settings.SYNC_TOMBSTONE_DAYS * 86400
+    if reset:
+        since = 0
+
+    # Rows numbered below the cursor can commit after it was handed out
+    # (ids are assigned before commit); send the ones logged shortly
+    # before that sync again
+    reread_from = None
+    if synced_at is not None and not reset:
+        reread_from = datetime.fromtimestamp(synced_at - settings.SYNC_REREAD_SECONDS, dt_timezone.utc)
+    rows, has_more = changes_since(profile_id, since, bbox, limit, reread_from)
+    records = _records(rows, request)
+    changes = []
+    for row in rows:
+        data = None if row.deleted else records.get(row.kind, {}).get(row.object_id)
+        if data is None:
+            # Deleted since the row was read
+            changes.append({"type": row.kind, "id": row.object_id, "version": row.id, "deleted": True})
+        else:
+            changes.append({"type": row.kind, "id": row.object_id, "version": row.id, "data": data})
+
+    # Re-read rows sit below the cursor, which must not move back
+    version = max(since, rows[-1].id) if rows else since
+    # Until the last batch arrives, the client's state is only as recent
+    # as the sync it started from
+    if has_more and synced_at is not None and not reset:
+        now = synced_at
+    return {
+        "cursor": encode_cursor(version, now),
+        "has_more": has_more,
+        "reset": reset,
+        "changes": changes,
+    }
+
+
+def compressed_response(request, data):
+    """JSON response compressed with brotli or gzip when the client accepts it."""
+    body, encoding = compress_body(
+        request, JSONRenderer().render(data), brotli_quality=settings.SYNC_BROTLI_QUALITY
+    )
+    response = HttpResponse(body, content_type="application/json")
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["Vary"] = "Accept-Encoding"
+    response["Cache-Control"] = "private, no-store"
+    return response
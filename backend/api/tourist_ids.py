@@ -0,0 +1,209 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+from . import sharding
+from .credentials import Ed25519Key, HmacKey, InvalidCredential, RevocationFilter, decode, encode
+from .models import TouristCredential
+
+
+# Issuing and revoking Tourist ID credentials, and checking scans.
+#
+# The revocation filter is written to TOURIST_ID_REVOCATION_PATH whenever
+# credentials are revoked; every worker maps the current file (and
+# checkpoints download it), so verifying a scan needs no database query
+# unless the filter reports a hit.
+
+
+# ---------------------------
+# Keys
+# ---------------------------
+def _key(key_id, algorithm, secret=None, private_key=None, public_key=None):
+    if algorithm == "HS256":
+        return HmacKey(key_id, secret)
+    if algorithm == "Ed25519":
+        return Ed25519Key(key_id, private_key=private_key, public_key=public_key)
+    raise ImproperlyConfigured(f"Unknown Tourist ID algorithm {algorithm!r}")
+
+
+@lru_cache(maxsize=1)
+def signing_key():
+    algorithm = settings.TOURIST_ID_ALGORITHM
+    if algorithm == "Ed25519":
+        if not settings.TOURIST_ID_ED25519_PRIVATE_KEY:
+            raise ImproperlyConfigured("TOURIST_ID_ED25519_PRIVATE_KEY is not set")
+        return _key(
+            settings.TOURIST_ID_KEY_ID, algorithm,
+            private_key=base64.b64decode(settings.TOURIST_ID_ED25519_PRIVATE_KEY),
+        )
+    secret = settings.TOURIST_ID_HMAC_SECRET.encode()
+    if not secret:
+        # Separate from SECRET_KEY itself, which also signs sessions
+        secret = hmac.new(settings.SECRET_KEY.encode(), b"tourist-id", hashlib.sha256).digest()
+    return _key(settings.TOURIST_ID_KEY_ID, algorithm, secret=secret)
+
+
+@lru_cache(maxsize=1)
+def verification_keys():
+    """{key id: key} for the current key and every retired one still accepted."""
+    keys = {}
+    for key_id, (algorithm, material) in settings.TOURIST_ID_RETIRED_KEYS.items():
+        if algorithm == "Ed25519":
+            keys[key_id] = _key(key_id, algorithm, public_key=base64.b64decode(material))
+        else:
+            keys[key_id] = _key(key_id, algorithm, secret=material.encode())
+    key = signing_key()
+    keys[key.key_id] = key
+    return keys
+
+
+def public_keys():
+    """Ed25519 verification keys for checkpoints; shared HMAC secrets are never listed."""
+    return [
+        {
+            "key_id": key.key_id,
+            "algorithm": "Ed25519",
+            "public_key": base64.b64encode(key.public_bytes()).decode("ascii"),
+        }
+        for key in verification_keys().values()
+        if isinstance(key, Ed25519Key)
+    ]
+
+
+# ---------------------------
+# Issuing and revoking
+# ---------------------------
+def _expiry(profile, now):
+    expires_at = now + timedelta(days=settings.TOURIST_ID_VALID_DAYS)
+    if profile.departure_date:
+        # Valid to the end of the stay, when that comes first
+        end_of_stay = timezone.make_aware(datetime.combine(profile.departure_date + timedelta(days=1), datetime.min.time()))
+        if end_of_stay > now:
+            expires_at = min(expires_at, end_of_stay)
+    return expires_at
+
+
+def issue(profile):
+    """Sign and store a new credential for ``profile``."""
+    key = signing_key()
+    now = timezone.now().replace(microsecond=0)
+    expires_at = _expiry(profile, now)
+    with sharding.atomic():
+        credential = TouristCredential.objects.create(
+            profile=profile, key_id=key.key_id, issued_at=now, expires_at=expires_at
+        )
+        credential.token = encode(
+            key, credential.id, profile.id, profile.name, profile.nationality,
+            now.timestamp(), expires_at.timestamp(),
+        )
+        credential.save(update_fields=['token'])
+    return credential
+
+
+def current_credential(profile):
+    """The profile's newest usable credential, issuing a fresh one when it
+    has none signed with the current key or it is about to expire."""
+    renew_after = timezone.now() + timedelta(days=settings.TOURIST_ID_RENEW_DAYS)
+    credential = (
+        profile.credentials.filter(revoked_at__isnull=True, key_id=signing_key().key_id, expires_at__gt=renew_after)
+        .order_by('-id')
+        .first()
+    )
+    return credential or issue(profile)
+
+
+def revoke(queryset):
+    """Revoke every credential in ``queryset``; returns how many were still active."""
+    count = queryset.filter(revoked_at__isnull=True).update(revoked_at=timezone.now())
+    if count:
+        sharding.on_commit(rebuild_revocations)
+    return count
+
+
+# ---------------------------
+# Revocation filter shared per process
+# ---------------------------
+def rebuild_revocations(path=None):
+    """Rewrite the revocation filter; returns the number of serials in it.
+
+    Only unexpired credentials are listed: an expired one fails anyway.
+    Serials are unique across shards, so one filter covers them all.
+    """
+    path = str(path or settings.TOURIST_ID_REVOCATION_PATH)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    now = timezone.now()
+    serials = sharding.gather(
+        lambda database: list(
+            TouristCredential.objects.filter(revoked_at__isnull=False, expires_at__gt=now)
+            .values_list('id', flat=True)
+        )
+    )
+    revocations = RevocationFilter.for_capacity(len(serials), settings.TOURIST_ID_REVOCATION_FALSE_POSITIVE_RATE)
+    for serial in serials:
+        revocations.add(serial)
+    revocations.generated_at = int(time.time())
+    # Write next to the target and swap, so readers never see half a file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(revocations.to_bytes())
+    os.replace(tmp, path)
+    _current["checked"] = 0
+    return len(serials)
+
+
+_current = {"filter": None, "stat": None, "checked": 0}
+_lock = threading.Lock()
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns
+
+
+def get_revocations():
+    """The current revocation filter, built from the database the first time it is needed."""
+    now = time.monotonic()
+    if _current["filter"] is not None and now - _current["checked"] < settings.TOURIST_ID_REVOCATION_RECHECK_SECONDS:
+        return _current["filter"]
+
+    with _lock:
+        path = str(settings.TOURIST_ID_REVOCATION_PATH)
+        stat = _stat(path)
+        if stat is None:
+            rebuild_revocations(path)
+            stat = _stat(path)
+        if stat != _current["stat"]:
+            with open(path, "rb") as f:
+                _current["filter"] = RevocationFilter.from_bytes(f.read())
+            _current["stat"] = stat
+        _current["checked"] = time.monotonic()
+        return _current["filter"]
+
+
+def verify(token):
+    """Check a scanned token; returns its Credential or raises InvalidCredential.
+
+    Signature and expiry are checked locally and the serial against the
+    revocation filter. Only a filter hit, which may be a false positive,
+    is confirmed against the database.
+    """
+    credential = decode(token, verification_keys())
+    if credential.serial in get_revocations():
+        # The serial tells which shard holds the credential
+        with sharding.use_id(credential.serial):
+            revoked = TouristCredential.objects.filter(id=credential.serial, revoked_at__isnull=False).exists()
+        if revoked:
+            raise InvalidCredential("revoked", "Credential has been revoked")
+    return credential
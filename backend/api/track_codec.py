@@ -0,0 +1,119 @@
+from .utils import latlng_to_mercator
+
+
+# Compact encoding and simplification of location tracks. A track is a
+# list of (unix seconds, lat, lng) tuples in time order. Chunks store
+# coordinates as integer units of 1e-5 degrees (about 1 m) and every
+# value as the zigzag varint of its difference from the previous point,
+# so a walking ping every few seconds packs into 3-4 bytes. The first
+# point's differences are from zero, which makes each chunk standalone.
+
+SCALE = 100000  # units per degree
+
+
+def _zigzag(value):
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def _unzigzag(value):
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+def encode(points):
+    """Varint-packed deltas for ``points``, which must be in time order."""
+    out = bytearray()
+    append = out.append
+    prev_t = prev_lat = prev_lng = 0
+    for t, lat, lng in points:
+        t = int(t)
+        lat = round(lat * SCALE)
+        lng = round(lng * SCALE)
+        for value in (_zigzag(t - prev_t), _zigzag(lat - prev_lat), _zigzag(lng - prev_lng)):
+            while value > 0x7F:
+                append((value & 0x7F) | 0x80)
+                value >>= 7
+            append(value)
+        prev_t, prev_lat, prev_lng = t, lat, lng
+    return bytes(out)
+
+
+def decode(data):
+    """Points from encode(), as (unix seconds, lat, lng)."""
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(_unzigzag(value))
+            value = shift = 0
+    if shift or len(values) % 3:
+        raise ValueError("Truncated track chunk")
+
+    points = []
+    t = lat = lng = 0
+    for i in range(0, len(values), 3):
+        t += values[i]
+        lat += values[i + 1]
+        lng += values[i + 2]
+        points.append((t, lat / SCALE, lng / SCALE))
+    return points
+
+
+# ---------------------------
+# Simplification
+# ---------------------------
+def tolerance_for_zoom(zoom, pixels=0.5):
+    """Douglas-Peucker tolerance, in normalized Mercator units, of ``pixels`` at ``zoom``."""
+    return pixels / (256 * (1 << zoom))
+
+
+def simplify(points, tolerance):
+    """Douglas-Peucker: drop points closer than ``tolerance`` (normalized
+    Mercator units) to the line through their kept neighbours."""
+    if len(points) < 3 or tolerance <= 0:
+        return list(points)
+    projected = [latlng_to_mercator(lat, lng) for _, lat, lng in points]
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    tolerance_sq = tolerance * tolerance
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = projected[first]
+        bx, by = projected[last]
+        dx, dy = bx - ax, by - ay
+        length_sq = dx * dx + dy * dy
+        worst, worst_distance = None, tolerance_sq
+        for i in range(first + 1, last):
+            px, py = projected[i]
+            if length_sq:
+                # Distance to the segment, clamped to its ends
+                u = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+                ex, ey = px - ax - u * dx, py - ay - u * dy
+            else:
+                ex, ey = px - ax, py - ay
+            distance = ex * ex + ey * ey
+            if distance > worst_distance:
+                worst, worst_distance = i, distance
+        if worst is not None:
+            keep[worst] = True
+            stack.append((first, worst))
+            stack.append((worst, last))
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def decimate(points, interval):
+    """At most one point per ``interval`` seconds (the first of each), plus the last point."""
+    if interval <= 0 or len(points) < 3:
+        return list(points)
+    kept = []
+    next_t = None
+    for point in points:
+        if next_t is None or point[0] >= next_t:
+            kept.append(point)
+            next_t = point[0] + interval
+    if kept[-1] is not points[-1]:
+        kept.append(points[-1])
+    return kept
@@ -0,0 +1,155 @@
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from . import sharding, track_codec
+from .models import TrackChunk, TrackPoint
+
+
+# Location history per tourist. Pings land in TrackPoint and
+# `manage.py compact_tracks` packs those older than TRACK_BUFFER_SECONDS
+# into TrackChunk rows (see api.track_codec), a few bytes per point
+# instead of a table row each. Reads merge chunks and the buffer, then
+# thin the points to what the requested map zoom can show.
+
+# Keeps bulk inserts well under SQLite's bound-parameter limit
+BATCH_SIZE = 500
+
+
+def _timestamp(value):
+    return datetime.fromtimestamp(value, dt_timezone.utc)
+
+
+def record(pings):
+    """Buffer pings given as (profile id, recorded_at, lat, lng) tuples."""
+    TrackPoint.objects.bulk_create(
+        [TrackPoint(profile_id=pk, recorded_at=at, lat=lat, lng=lng) for pk, at, lat, lng in pings],
+        batch_size=BATCH_SIZE,
+    )
+
+
+def parse_points(items, now=None):
+    """Validate uploaded pings, [{"lat", "lng", "t" (unix seconds, default now)}],
+    into (recorded_at, lat, lng) tuples."""
+    now = now or timezone.now()
+    latest = now + timedelta(seconds=settings.TRACK_MAX_CLOCK_SKEW_SECONDS)
+    if len(items) > settings.TRACK_MAX_UPLOAD_POINTS:
+        raise ValueError(f"At most {settings.TRACK_MAX_UPLOAD_POINTS} points per upload")
+    points = []
+    for item in items:
+        lat, lng = float(item["lat"]), float(item["lng"])
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise ValueError("lat/lng out of range")
+        at = _timestamp(float(item["t"])) if item.get("t") is not None else now
+        if at > latest:
+            raise ValueError("Point recorded in the future")
+        points.append((at, lat, lng))
+    return points
+
+
+# ---------------------------
+# Compaction
+# ---------------------------
+def _chunk(profile_id, points):
+    return TrackChunk(
+        profile_id=profile_id,
+        start_at=_timestamp(points[0][0]),
+        end_at=_timestamp(points[-1][0]),
+        point_count=len(points),
+        min_lat=min(p[1] for p in points),
+        min_lng=min(p[2] for p in points),
+        max_lat=max(p[1] for p in points),
+        max_lng=max(p[2] for p in points),
+        data=track_codec.encode(points),
+    )
+
+
+def compact(now=None):
+    """Pack the current shard's buffered pings older than TRACK_BUFFER_SECONDS
+    into chunks; returns (points packed, chunks written).
+
+    Each chunk holds one tourist's pings in time order, at most
+    TRACK_CHUNK_POINTS of them over at most TRACK_CHUNK_SECONDS. Pings
+    uploaded late become chunks of their own; reads merge them in.
+    """
+    cutoff = (now or timezone.now()) - timedelta(seconds=settings.TRACK_BUFFER_SECONDS)
+    max_points = settings.TRACK_CHUNK_POINTS
+    max_span = settings.TRACK_CHUNK_SECONDS
+    packed = written = 0
+    with sharding.atomic():
+        last_id = TrackPoint.objects.filter(recorded_at__lt=cutoff).aggregate(last=Max('id'))['last']
+        if last_id is None:
+            return 0, 0
+        # Pings inserted while this runs have higher ids and wait for the next run
+        buffered = TrackPoint.objects.filter(recorded_at__lt=cutoff, id__lte=last_id)
+        rows = (
+            buffered.order_by('profile_id', 'recorded_at', 'id')
+            .values_list('profile_id', 'recorded_at', 'lat', 'lng')
+            .iterator(chunk_size=5000)
+        )
+        chunks = []
+        profile_id, points = None, []
+        for pk, at, lat, lng in rows:
+            t = int(at.timestamp())
+            if points and (pk != profile_id or len(points) >= max_points or t - points[0][0] > max_span):
+                chunks.append(_chunk(profile_id, points))
+                points = []
+            profile_id = pk
+            points.append((t, lat, lng))
+            packed += 1
+            if len(chunks) >= BATCH_SIZE:
+                TrackChunk.objects.bulk_create(chunks)
+                written += len(chunks)
+                chunks = []
+        if points:
+            chunks.append(_chunk(profile_id, points))
+        TrackChunk.objects.bulk_create(chunks, batch_size=BATCH_SIZE)
+        written += len(chunks)
+        buffered.delete()
+    return packed, written
+
+
+# ---------------------------
+# Reading
+# ---------------------------
+def track(profile_id, start, end):
+    """A tourist's pings between ``start`` and ``end``, as (unix seconds, lat, lng) in time order."""
+    # Chunks keep whole seconds
+    first, last = math.floor(start.timestamp()), end.timestamp()
+    points = []
+    chunks = TrackChunk.objects.filter(
+        profile_id=profile_id,
+        # Chunks span at most TRACK_CHUNK_SECONDS, which bounds the index range
+        start_at__gte=start - timedelta(seconds=settings.TRACK_CHUNK_SECONDS),
+        start_at__lte=end,
+        end_at__gte=start,
+    ).values_list('data', flat=True)
+    for data in chunks:
+        points += [point for point in track_codec.decode(data) if first <= point[0] <= last]
+    buffered = TrackPoint.objects.filter(profile_id=profile_id, recorded_at__range=(start, end))
+    points += [(int(at.timestamp()), lat, lng) for at, lat, lng in buffered.values_list('recorded_at', 'lat', 'lng')]
+    points.sort(key=lambda point: point[0])
+    return points
+
+
+def thin(points, zoom=None, interval=None):
+    """Drop points the map cannot show: one per ``interval`` seconds, then
+    Douglas-Peucker at TRACK_SIMPLIFY_PIXELS for ``zoom``."""
+    if interval:
+        points = track_codec.decimate(points, interval)
+    if zoom is not None:
+        points = track_codec.simplify(points, track_codec.tolerance_for_zoom(zoom, settings.TRACK_SIMPLIFY_PIXELS))
+    return points
+
+
+def incident_window(incident, before=None, after=None):
+    """(start, end) of the trail around an incident: from ``before`` ahead of
+    the first alert to ``after`` past the last (default TRACK_INCIDENT_WINDOW_MINUTES),
+    capped at TRACK_MAX_WINDOW_HOURS."""
+    default = timedelta(minutes=settings.TRACK_INCIDENT_WINDOW_MINUTES)
+    start = incident.created_at - (default if before is None else before)
+    end = (incident.last_seen_at or incident.created_at) + (default if after is None else after)
+    return start, min(end, start + timedelta(hours=settings.TRACK_MAX_WINDOW_HOURS))
@@ -6,6 +6,7 @@ from .views import (
     IncidentViewSet,
     EmergencyContactViewSet,
     geofence_check,
+    nearest_places,
     tourist_register,
     tourist_login,
     authority_register,
@@ -15,8 +16,30 @@ from .views import (
     get_tourist_profile,
     get_all_tourists,
     get_tourist_by_id,
+    search_tourists,
+    active_tourists,
+    region_occupancy,
     create_sos_alert,
-    get_sos_alerts
+    get_sos_alerts,
+    export_tourists,
+    export_incidents,
+    incident_heatmap,
+    map_clusters,
+    map_tile,
+    authority_dashboard,
+    tourist_dashboard,
+    transition_sos_alert,
+    bulk_transition_sos_alerts,
+    get_sos_alert_changes,
+    get_sos_alert_trail,
+    tourist_id_card,
+    tourist_sync,
+    upload_location,
+    tourist_track,
+    get_sos_alert_track,
+    verify_tourist_id,
+    tourist_id_keys,
+    tourist_id_revocations
 )
 
 router = DefaultRouter()
@@ -26,8 +49,12 @@ router.register("incidents", IncidentViewSet)
 router.register("contacts", EmergencyContactViewSet)
 
 urlpatterns = [
+    # Before the router so "nearest" is not taken for a place id
+    path("places/nearest/", nearest_places, name="nearest_places"),
     path("", include(router.urls)),
     path("geofence/", geofence_check),
+    path("map/clusters/", map_clusters, name="map_clusters"),
+    path("map/tiles/<int:zoom>/<int:x>/<int:y>/", map_tile, name="map_tile"),
     # Authentication endpoints
     path("auth/tourist/register/", tourist_register, name="tourist_register"),
     path("auth/tourist/login/", tourist_login, name="tourist_login"),
@@ -38,10 +65,31 @@ urlpatterns = [
     path("profile/authority/", authority_profile_detail, name="authority_profile_detail"),
     # Tourist profile endpoints
     path("tourist/profile/", get_tourist_profile, name="get_tourist_profile"),
+    path("tourist/dashboard/", tourist_dashboard, name="tourist_dashboard"),
+    path("tourist/id-card/", tourist_id_card, name="tourist_id_card"),
+    path("tourist/sync/", tourist_sync, name="tourist_sync"),
+    path("tourist/location/", upload_location, name="upload_location"),
+    # Tourist ID checkpoints
+    path("credentials/verify/", verify_tourist_id, name="verify_tourist_id"),
+    path("credentials/keys/", tourist_id_keys, name="tourist_id_keys"),
+    path("credentials/revocations/", tourist_id_revocations, name="tourist_id_revocations"),
     # Authority dashboard endpoints
+    path("authority/dashboard/", authority_dashboard, name="authority_dashboard"),
     path("authority/tourists/", get_all_tourists, name="get_all_tourists"),
+    path("authority/tourists/search/", search_tourists, name="search_tourists"),
+    path("authority/tourists/active/", active_tourists, name="active_tourists"),
     path("authority/tourists/<int:tourist_id>/", get_tourist_by_id, name="get_tourist_by_id"),
+    path("authority/tourists/<int:tourist_id>/track/", tourist_track, name="tourist_track"),
     path("authority/sos-alerts/", get_sos_alerts, name="get_sos_alerts"),
+    path("authority/sos-alerts/changes/", get_sos_alert_changes, name="get_sos_alert_changes"),
+    path("authority/sos-alerts/bulk/<str:action>/", bulk_transition_sos_alerts, name="bulk_transition_sos_alerts"),
+    path("authority/sos-alerts/<int:alert_id>/trail/", get_sos_alert_trail, name="get_sos_alert_trail"),
+    path("authority/sos-alerts/<int:alert_id>/track/", get_sos_alert_track, name="get_sos_alert_track"),
+    path("authority/sos-alerts/<int:alert_id>/<str:action>/", transition_sos_alert, name="transition_sos_alert"),
+    path("authority/export/tourists/", export_tourists, name="export_tourists"),
+    path("authority/export/incidents/", export_incidents, name="export_incidents"),
+    path("authority/incidents/heatmap/", incident_heatmap, name="incident_heatmap"),
+    path("authority/occupancy/", region_occupancy, name="region_occupancy"),
     # Tourist SOS endpoint
     path("tourist/sos/", create_sos_alert, name="create_sos_alert"),
 ]
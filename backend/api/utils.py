@@ -1,4 +1,4 @@
-from math import radians, cos, sin, asin, sqrt
+from math import radians, degrees, cos, sin, asin, sqrt, tan, atan, sinh, log, pi
 
 
 def is_inside_geofence(point_lat, point_lng, center_lat, center_lng, radius_meters):
@@ -24,3 +24,37 @@ def mock_reverse_geocode(lat, lng):
         'city': 'Demo City',
         'country': 'Demo Country'
     }
+
+
+# Deepest zoom level kept in the incident rollup; coarser zooms are derived
+MAX_TILE_ZOOM = 16
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def latlng_to_mercator(lat, lng):
+    """Project a point to normalized Web Mercator coordinates in [0, 1]."""
+    lat = max(min(lat, MAX_MERCATOR_LAT), -MAX_MERCATOR_LAT)
+    lat_rad = radians(lat)
+    x = (lng + 180.0) / 360.0
+    y = (1.0 - log(tan(lat_rad) + 1.0 / cos(lat_rad)) / pi) / 2.0
+    return x, y
+
+
+def mercator_to_latlng(x, y):
+    """Inverse of latlng_to_mercator."""
+    lng = x * 360.0 - 180.0
+    lat = degrees(atan(sinh(pi * (1 - 2 * y))))
+    return lat, lng
+
+
+def latlng_to_tile(lat, lng, zoom):
+    """Web Mercator (slippy map) tile coordinates containing a point."""
+    n = 1 << zoom
+    x, y = latlng_to_mercator(lat, lng)
+    return min(max(int(x * n), 0), n - 1), min(max(int(y * n), 0), n - 1)
+
+
+def tile_to_latlng(x, y, zoom):
+    """North-west corner of a tile as (lat, lng)."""
+    n = 1 << zoom
+    return mercator_to_latlng(x / n, y / n)
@@ -1,13 +1,34 @@
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, authentication_classes
 from rest_framework.response import Response
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
+from django.db.models import Q
+from django.http import FileResponse, Http404, StreamingHttpResponse
 from django.shortcuts import render
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_GET
+import heapq
+import itertools
+import logging
+import os
 import secrets
-
-from .models import TouristProfile, Place, Incident, EmergencyContact, AuthorityProfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from .models import (
+    TouristProfile,
+    Place,
+    Incident,
+    IncidentEvent,
+    IncidentTrailPoint,
+    EmergencyContact,
+    AuthorityProfile
+)
 from .serializers import (
     TouristProfileSerializer,
     PlaceSerializer,
@@ -15,6 +36,27 @@ from .serializers import (
     EmergencyContactSerializer,
     AuthorityProfileSerializer
 )
+from .exports import (
+    TOURIST_EXPORT_FIELDS,
+    INCIDENT_EXPORT_FIELDS,
+    filter_tourists,
+    filter_incidents,
+    filter_archived_incidents,
+    archived_row,
+    parse_date_param,
+    iter_rows,
+    stream_ndjson,
+    stream_csv,
+)
+from . import (
+    actions, archive, assets, clustering, dashboard, db_routing, heatmap, occupancy, poi_store, search, sharding, sos_queue,
+    sync, tourist_ids, tracks
+)
+from .credentials import InvalidCredential
+from .geocoding import reverse_geocode
+from .utils import tile_to_latlng
+
+logger = logging.getLogger(__name__)
 
 
 # ---------------------------
@@ -22,7 +64,9 @@ from .serializers import (
 # ---------------------------
 def index(request):
     """Serve the React frontend"""
-    return render(request, "index.html")
+    if settings.DEBUG:
+        return render(request, "index.html")
+    return assets.index_response(request)
 
 
 # ---------------------------
@@ -56,6 +100,45 @@ class IncidentViewSet(viewsets.ModelViewSet):
     queryset = Incident.objects.all()
     serializer_class = IncidentSerializer
 
+    def list(self, request, *args, **kwargs):
+        """One page of incidents in id order, filtered like the export
+        (?from=, ?to=, ?nationality=, ?resolved=); ?limit= sets the page
+        size and ?after=<next> fetches the page after.
+
+        Only a ?from= date reaches into the archive, and then only the
+        segments overlapping the range are read.
+        """
+        try:
+            params = request.query_params
+            limit = min(max(int(params.get("limit", settings.INCIDENT_LIST_PAGE_SIZE)), 1), 1000)
+            after = int(params.get("after") or 0)
+            streams = [filter_incidents(params, self.get_queryset()).filter(id__gt=after)[:limit]]
+            if parse_date_param(params, "from"):
+                streams.append(
+                    archive.to_incident(record) for record in filter_archived_incidents(params, after=after)
+                )
+            page = list(itertools.islice(heapq.merge(*streams, key=lambda incident: incident.id), limit))
+            serializer = self.get_serializer(page, many=True)
+            return Response({
+                "count": len(page),
+                "next": page[-1].id if len(page) == limit else None,
+                "results": serializer.data
+            })
+
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            # Archived incidents stay readable (but not writable) by id
+            pk = str(kwargs[self.lookup_field])
+            record = archive.find(int(pk)) if pk.isdigit() else None
+            if record is None:
+                raise
+            return Response(self.get_serializer(archive.to_incident(record)).data)
+
 
 # ---------------------------
 # Simple geofence check API
@@ -67,13 +150,32 @@ def geofence_check(request):
         lng = float(request.data.get("lng"))
         radius = float(request.data.get("radius", 0.01))
 
-        places = Place.objects.filter(
-            lat__range=(lat - radius, lat + radius),
-            lng__range=(lng - radius, lng + radius),
-        )
+        store = poi_store.get_store()
+        nearby = [store.place(i) for i in store.within(lat, lng, radius)]
+        return Response({"nearby_places": nearby}, status=200)
+
+    except Exception as e:
+        return Response({"error": str(e)}, status=400)
 
-        serializer = PlaceSerializer(places, many=True)
-        return Response({"nearby_places": serializer.data}, status=200)
+
+@api_view(["GET"])
+def nearest_places(request):
+    """Closest places to a point, optionally of one type and within max_km"""
+    try:
+        lat = float(request.query_params.get("lat"))
+        lng = float(request.query_params.get("lng"))
+        limit = min(max(int(request.query_params.get("limit", 5)), 1), 100)
+        place_type = request.query_params.get("type") or None
+        max_km = request.query_params.get("max_km")
+        max_km = float(max_km) if max_km else None
+
+        store = poi_store.get_store()
+        places = []
+        for i, distance_km in store.nearest(lat, lng, limit, place_type, max_km):
+            place = store.place(i)
+            place["distance_km"] = round(distance_km, 3)
+            places.append(place)
+        return Response({"places": places}, status=200)
 
     except Exception as e:
         return Response({"error": str(e)}, status=400)
@@ -107,13 +209,14 @@ def tourist_register(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if User.objects.filter(username=email).exists():
+        # Accounts are spread over the regional shards
+        if sharding.find(User.objects.filter(username=email)):
             return Response(
                 {"error": "Email already registered"},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if TouristProfile.objects.filter(email=email).exists():
+        if sharding.find(TouristProfile.objects.filter(email=email)):
             return Response(
                 {"error": "Email already registered"},
                 status=status.HTTP_400_BAD_REQUEST
@@ -125,7 +228,16 @@ def tourist_register(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        with transaction.atomic():
+        # The tourist's data lives in the shard of the region they register
+        # in: the "region" field when the app knows it, else where the location geocodes
+        region = request.data.get("region") or sharding.region_for_addresses(current_location)
+        if region not in settings.SHARD_REGIONS:
+            return Response(
+                {"error": "Unknown region"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with sharding.use_region(region), sharding.atomic():
             # Create User
             user = User.objects.create_user(
                 username=email,
@@ -142,7 +254,8 @@ def tourist_register(request):
                 email=email,
                 nationality=nationality,
                 current_location=current_location,
-                profile_photo=profile_photo
+                profile_photo=profile_photo,
+                region=region
             )
 
         return Response(
@@ -179,8 +292,11 @@ def tourist_login(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Authenticate user
-        user = authenticate(username=email, password=password)
+        # Authenticate user against the shard holding the account
+        database = sharding.find(User.objects.filter(username=email)) or sharding.current_database()
+        with sharding.use_database(database):
+            user = authenticate(username=email, password=password)
+            profile = TouristProfile.objects.filter(user=user).first() if user else None
         if not user:
             return Response(
                 {"error": "Invalid email or password"},
@@ -188,9 +304,7 @@ def tourist_login(request):
             )
 
         # Check if user has a tourist profile
-        try:
-            profile = TouristProfile.objects.get(user=user)
-        except TouristProfile.DoesNotExist:
+        if profile is None:
             return Response(
                 {"error": "User is not registered as a tourist"},
                 status=status.HTTP_401_UNAUTHORIZED
@@ -246,7 +360,7 @@ def authority_register(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if User.objects.filter(username=official_email).exists():
+        if sharding.find(User.objects.filter(username=official_email)):
             return Response(
                 {"error": "Email already registered"},
                 status=status.HTTP_400_BAD_REQUEST
@@ -402,14 +516,27 @@ def tourist_profile_detail(request):
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         elif request.method == "PUT":
+            # Parse dates before any write; the post_save receivers do date
+            # arithmetic on them
+            try:
+                dates = {
+                    field: parse_date_param(request.data, field)
+                    for field in ("arrival_date", "departure_date") if field in request.data
+                }
+            except ValueError as e:
+                return Response(
+                    {"error": str(e)},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
             # Update profile
             profile.name = request.data.get("full_name", profile.name)
             profile.email = request.data.get("email", profile.email)
             profile.phone = request.data.get("phone_number", profile.phone)
             profile.from_address = request.data.get("from_address", profile.from_address)
             profile.to_address = request.data.get("to_address", profile.to_address)
-            profile.arrival_date = request.data.get("arrival_date", profile.arrival_date)
-            profile.departure_date = request.data.get("departure_date", profile.departure_date)
+            for field, value in dates.items():
+                setattr(profile, field, value)
             profile.hotel_name = request.data.get("hotel_name", profile.hotel_name)
             profile.hotel_address = request.data.get("hotel_address", profile.hotel_address)
 
@@ -526,16 +653,38 @@ def get_tourist_profile(request):
         )
 
 
+def _region_databases(region):
+    """Shard databases to scatter over: the region's, or every one."""
+    if not region:
+        return sharding.databases()
+    return [sharding.database_for_region(region)]
+
+
+def _newest_first(row):
+    # Sort key for merging shards; rows without created_at come last
+    return (row.created_at is not None, row.created_at)
+
+
 @api_view(["GET"])
 def get_all_tourists(request):
-    """Get all tourist profiles (for authority dashboard)"""
+    """Get all tourist profiles, or those of one ?region= (for authority dashboard)"""
     try:
-        # Get all tourist profiles with all details
-        tourists = TouristProfile.objects.all().order_by('-created_at')
+        region = request.query_params.get("region")
+
+        def tourists(database):
+            # Get all tourist profiles with all details
+            queryset = TouristProfile.objects.prefetch_related('contacts').order_by('-created_at')
+            if region:
+                queryset = queryset.filter(region=region)
+            return list(queryset)
+
+        tourists = sharding.merge_sorted(
+            sharding.scatter(tourists, _region_databases(region)), key=_newest_first, reverse=True
+        )
         serializer = TouristProfileSerializer(tourists, many=True, context={'request': request})
         return Response(
             {
-                "count": tourists.count(),
+                "count": len(tourists),
                 "tourists": serializer.data
             },
             status=status.HTTP_200_OK
@@ -548,6 +697,126 @@ def get_all_tourists(request):
         )
 
 
+@api_view(["GET"])
+def search_tourists(request):
+    """Full-text tourist search for authorities (prefix and typo tolerant)"""
+    try:
+        query = request.query_params.get("q", "")
+        limit = min(max(int(request.query_params.get("limit", 20)), 1), 100)
+
+        def matches(database):
+            hits = search.search_tourists(query, limit)
+            profiles = TouristProfile.objects.in_bulk([pk for pk, _ in hits])
+            return [(score, profiles[pk]) for pk, score in hits if pk in profiles]
+
+        # Best first across shards
+        best = sharding.merge_sorted(
+            sharding.scatter(matches), key=lambda match: match[0], reverse=True, limit=limit
+        )
+        results = []
+        for score, profile in best:
+            results.append({
+                "id": profile.id,
+                "name": profile.name,
+                "email": profile.email,
+                "phone": profile.phone,
+                "nationality": profile.nationality,
+                "hotel_name": profile.hotel_name,
+                "blockchain_id": profile.blockchain_id,
+                "score": score
+            })
+
+        return Response(
+            {"count": len(results), "results": results},
+            status=status.HTTP_200_OK
+        )
+
+    except Exception as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+def _bbox_param(request):
+    bbox = request.query_params.get("bbox")
+    if not bbox:
+        return None
+    # south,west,north,east
+    bbox = [float(v) for v in bbox.split(",")]
+    if len(bbox) != 4:
+        raise ValueError("bbox must be south,west,north,east")
+    return bbox
+
+
+@api_view(["GET"])
+def active_tourists(request):
+    """Tourists whose stay covers ?date= (default today), optionally inside ?bbox="""
+    try:
+        day = parse_date_param(request.query_params, "date") or timezone.localdate()
+        bbox = _bbox_param(request)
+        limit = min(max(int(request.query_params.get("limit", 100)), 1), 1000)
+
+        def tourists(database):
+            rows = occupancy.active_tourists(day, bbox).order_by('id').values(
+                'id', 'name', 'phone', 'nationality', 'hotel_name', 'hotel_address',
+                'to_address', 'arrival_date', 'departure_date', 'region_x', 'region_y'
+            )
+            return list(rows[:limit + 1])
+
+        # Only shards whose regions overlap the bbox are asked
+        rows = sharding.merge_sorted(
+            sharding.scatter(tourists, sharding.databases_for_bbox(bbox)),
+            key=lambda row: row['id'],
+            limit=limit + 1,
+        )
+        return Response(
+            {
+                "date": day,
+                "count": len(rows[:limit]),
+                "truncated": len(rows) > limit,
+                "tourists": rows[:limit]
+            },
+            status=status.HTTP_200_OK
+        )
+
+    except Exception as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+@api_view(["GET"])
+def region_occupancy(request):
+    """Tourists staying per area and day, from the occupancy rollup"""
+    try:
+        today = timezone.localdate()
+        date_from = parse_date_param(request.query_params, "from") or today
+        date_to = parse_date_param(request.query_params, "to") or date_from
+        zoom = int(request.query_params.get("zoom", occupancy.REGION_ZOOM))
+        bbox = _bbox_param(request)
+
+        cells = occupancy.occupancy(date_from, date_to, zoom=zoom, bbox=bbox)
+        totals = {}
+        for day, _, _, count in cells:
+            totals[day] = totals.get(day, 0) + count
+        return Response(
+            {
+                "zoom": zoom,
+                "days": [{"date": day, "count": count} for day, count in totals.items()],
+                "tiles": cells
+            },
+            status=status.HTTP_200_OK
+        )
+
+    except Exception as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
 @api_view(["GET"])
 def get_tourist_by_id(request, tourist_id):
     """Get a specific tourist profile by ID (for authority dashboard)"""
@@ -585,32 +854,51 @@ def create_sos_alert(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        key = request.headers.get("Idempotency-Key") or request.data.get("idempotency_key")
+        if key and len(key) > 64:
+            return Response(
+                {"error": "Idempotency key must be at most 64 characters"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         try:
-            user = User.objects.get(id=user_id)
-            profile = TouristProfile.objects.get(user=user)
-        except (User.DoesNotExist, TouristProfile.DoesNotExist):
+            profile_id = sos_queue.profile_id_for_user(str(user_id))
+        except TouristProfile.DoesNotExist:
             return Response(
                 {"error": "Tourist profile not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Create incident/alert
-        incident = Incident.objects.create(
-            profile=profile,
-            title="SOS Alert",
-            description=description,
-            lat=float(lat),
-            lng=float(lng),
-            resolved=False
-        )
+        try:
+            lat, lng = float(lat), float(lng)
+            sos_queue.check_coordinates(lat, lng)
+        except ValueError:
+            return Response(
+                {"error": "Latitude and longitude must be finite numbers in range"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Geocode first: once queued, any error would make the client resend
+        # an alert that is already on its way
+        try:
+            location = reverse_geocode(lat, lng)
+        except Exception:
+            logger.exception("Reverse geocoding failed for an SOS alert")
+            location = {"address": f"{lat:.5f}, {lng:.5f}", "city": "", "country": ""}
+
+        # Durably queue the alert; the background writer creates the Incident
+        record = sos_queue.enqueue(profile_id, lat, lng, str(description), key=key)
+        # The incident reaches the primary shortly; keep this client reading from it
+        db_routing.pin()
 
         return Response(
             {
                 "message": "SOS alert sent successfully",
-                "alert_id": incident.id,
-                "created_at": incident.created_at
+                "idempotency_key": record["key"],
+                "created_at": record["received_at"],
+                "location": location
             },
-            status=status.HTTP_201_CREATED
+            status=status.HTTP_202_ACCEPTED
         )
 
     except Exception as e:
@@ -620,37 +908,857 @@ def create_sos_alert(request):
         )
 
 
+def _alert_data(alert):
+    return {
+        "id": alert.id,
+        "tourist_name": alert.profile.name,
+        "tourist_email": alert.profile.email,
+        "tourist_phone": alert.profile.phone,
+        "description": alert.description,
+        "lat": alert.lat,
+        "lng": alert.lng,
+        "location": reverse_geocode(alert.lat, alert.lng)["address"],
+        "created_at": alert.created_at,
+        "resolved": alert.resolved,
+        "acknowledged_at": alert.acknowledged_at,
+        "assigned_to": alert.assigned_to_id,
+        "resolved_at": alert.resolved_at,
+        "version": alert.version,
+        "hit_count": alert.hit_count,
+        "last_seen_at": alert.last_seen_at
+    }
+
+
+def _alerts_data(alerts):
+    return [_alert_data(alert) for alert in alerts]
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _alerts_cursor(alerts, limit):
+    """Cursor for the page after ``alerts``, or None when it was the last.
+
+    "<created_at in epoch microseconds>_<id>" of the last alert shown.
+    """
+    if limit is None or len(alerts) < limit:
+        return None
+    last = alerts[-1]
+    return f"{(last.created_at - EPOCH) // timedelta(microseconds=1)}_{last.id}"
+
+
+def _parse_alerts_cursor(cursor):
+    if not cursor:
+        return None
+    micros, pk = cursor.split("_")
+    return EPOCH + timedelta(microseconds=int(micros)), int(pk)
+
+
+def _changes_cursor(ids, read_at):
+    """Alert feed cursor: event ids per shard and the time they were read."""
+    return f"{sharding.encode_cursor(ids)}.{int(read_at.timestamp())}"
+
+
+def _parse_changes_cursor(cursor):
+    """(ids per shard, read time or None) from _changes_cursor()."""
+    ids, _, read_at = str(cursor or 0).partition(".")
+    return sharding.decode_cursor(ids), datetime.fromtimestamp(int(read_at), dt_timezone.utc) if read_at else None
+
+
+def _open_alerts_queryset(before=None):
+    """Unresolved incidents of the current shard, newest first, after the
+    (created_at, id) keyset ``before``."""
+    queryset = Incident.objects.filter(resolved=False).select_related('profile').order_by('-created_at', '-id')
+    if before:
+        created_at, pk = before
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    return queryset
+
+
+def _alert_order(alert):
+    return alert.created_at, alert.id
+
+
+def _open_alerts(limit=None, region=None, before=None):
+    """Unresolved incidents, newest first, from every shard (or ``region``'s)."""
+    def alerts(database):
+        queryset = _open_alerts_queryset(before)
+        if region:
+            queryset = queryset.filter(profile__region=region)
+        return list(queryset[:limit])
+
+    return sharding.merge_sorted(
+        sharding.scatter(alerts, _region_databases(region)), key=_alert_order, reverse=True, limit=limit
+    )
+
+
 @api_view(["GET"])
 def get_sos_alerts(request):
-    """Get all active SOS alerts for authority dashboard"""
-    try:
-        # Get all unresolved incidents (SOS alerts)
-        alerts = Incident.objects.filter(resolved=False).order_by('-created_at')
-        
-        alerts_data = []
-        for alert in alerts:
-            alerts_data.append({
-                "id": alert.id,
-                "tourist_name": alert.profile.name,
-                "tourist_email": alert.profile.email,
-                "tourist_phone": alert.profile.phone,
-                "description": alert.description,
-                "lat": alert.lat,
-                "lng": alert.lng,
-                "created_at": alert.created_at,
-                "resolved": alert.resolved
-            })
+    """Get active SOS alerts for authority dashboard, optionally of one ?region=
+
+    All of them by default; with ?limit= one page, and ?before=<next> the
+    page after it.
+    """
+    try:
+        limit = request.query_params.get("limit")
+        limit = min(max(int(limit), 1), 1000) if limit else None
+        # Get unresolved incidents (SOS alerts)
+        alerts = _open_alerts(
+            limit=limit,
+            region=request.query_params.get("region"),
+            before=_parse_alerts_cursor(request.query_params.get("before")),
+        )
+        alerts_data = _alerts_data(alerts)
 
         return Response(
             {
                 "count": len(alerts_data),
-                "alerts": alerts_data
+                "alerts": alerts_data,
+                "next": _alerts_cursor(alerts, limit)
+            },
+            status=status.HTTP_200_OK
+        )
+
+    except Exception as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+# ---------------------------
+# Streaming Exports (for authority reporting)
+# ---------------------------
+EXPORT_CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _export_response(queryset, fields, output, filename, archived=None):
+    def shard_rows(database):
+        rows = iter_rows(queryset.using(database), fields)
+        if archived:
+            # Archived rows come from the same shard's id range
+            rows = heapq.merge(rows, archived(database), key=lambda row: row['id'])
+        return rows
+
+    # One shard after another; their id ranges keep the rows in id order
+    rows = itertools.chain.from_iterable(shard_rows(database) for database in sharding.databases())
+    if output == "csv":
+        body = stream_csv(rows, fields)
+    else:
+        body = stream_ndjson(rows)
+
+    response = StreamingHttpResponse(body, content_type=EXPORT_CONTENT_TYPES[output])
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{output}"'
+    return response
+
+
+@api_view(["GET"])
+def export_tourists(request):
+    """Stream all tourist profiles as NDJSON or CSV (?output=csv)"""
+    try:
+        output = request.query_params.get("output", "ndjson")
+        if output not in EXPORT_CONTENT_TYPES:
+            return Response(
+                {"error": "Output must be 'ndjson' or 'csv'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        tourists = filter_tourists(request.query_params)
+        return _export_response(tourists, TOURIST_EXPORT_FIELDS, output, "tourists")
+
+    except Exception as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+@api_view(["GET"])
+def export_incidents(request):
+    """Stream incident history as NDJSON or CSV (?output=csv)"""
+    try:
+        output = request.query_params.get("output", "ndjson")
+        if output not in EXPORT_CONTENT_TYPES:
+            return Response(
+                {"error": "Output must be 'ndjson' or 'csv'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        incidents = filter_incidents(request.query_params)
+        params = request.query_params.copy()
+        return _export_response(
+            incidents, INCIDENT_EXPORT_FIELDS, output, "incidents",
+            archived=lambda database: (
+                archived_row(record, INCIDENT_EXPORT_FIELDS)
+                for record in filter_archived_incidents(params, database)
+            ),
+        )
+
+    except Exception as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+# ---------------------------
+# Incident Heatmap (authority dashboard)
+# ---------------------------
+@api_view(["GET"])
+def incident_heatmap(request):
+    """Incident counts per map tile at the requested zoom level"""
+    try:
+        zoom = int(request.query_params.get("zoom", 10))
+        date_from = parse_date_param(request.query_params, "from")
+        date_to = parse_date_param(request.query_params, "to")
+        unresolved_only = request.query_params.get("unresolved") in ("1", "true")
+        bbox = request.query_params.get("bbox")
+
+        if bbox:
+            # south,west,north,east
+            bbox = [float(v) for v in bbox.split(",")]
+            if len(bbox) != 4:
+                return Response(
+                    {"error": "bbox must be south,west,north,east"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        tiles = heatmap.heatmap(
+            zoom,
+            date_from=date_from,
+            date_to=date_to,
+            unresolved_only=unresolved_only,
+            bbox=bbox,
+        )
+        return Response(
+            {
+                "zoom": zoom,
+                "count": sum(tile[2] for tile in tiles),
+                "tiles": tiles
+            },
+            status=status.HTTP_200_OK
+        )
+
+    except Exception as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+# ---------------------------
+# Clustered Map Markers (Places and open alerts)
+# ---------------------------
+def _cluster_response(request, bbox, zoom):
+    layers = request.query_params.get("layers", "places,incidents").split(",")
+    unknown = [layer for layer in layers if layer not in clustering.LAYERS]
+    if unknown:
+        return Response(
+            {"error": f"Unknown layers: {', '.join(unknown)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    features = []
+    for layer in layers:
+        features.extend(clustering.get_index(layer).query(bbox, zoom))
+    return Response(
+        {
+            "zoom": zoom,
+            "count": len(features),
+            "features": features
+        },
+        status=status.HTTP_200_OK
+    )
+
+
+@api_view(["GET"])
+def map_clusters(request):
+    """Clustered markers inside ?bbox=south,west,north,east at ?zoom="""
+    try:
+        zoom = int(request.query_params.get("zoom", 12))
+        bbox = [float(v) for v in request.query_params.get("bbox", "").split(",")]
+        if len(bbox) != 4:
+            return Response(
+                {"error": "bbox must be south,west,north,east"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return _cluster_response(request, bbox, zoom)
+
+    except Exception as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+@api_view(["GET"])
+def map_tile(request, zoom, x, y):
+    """Clustered markers for one slippy-map tile"""
+    try:
+        north, west = tile_to_latlng(x, y, zoom)
+        south, east = tile_to_latlng(x + 1, y + 1, zoom)
+        return _cluster_response(request, (south, west, north, east), zoom)
+
+    except Exception as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+# ---------------------------
+# Composite Dashboards (one request per first paint)
+# ---------------------------
+@api_view(["GET"])
+def authority_dashboard(request):
+    """Summary counts, open SOS alerts and recent tourists in one response"""
+    try:
+        data = cache.get(dashboard.AUTHORITY_CACHE_KEY)
+        if data is None:
+            read_at = timezone.now()
+
+            def shard_data(database):
+                # Read the cursor first so no change is missed between the reads
+                cursor = IncidentEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+                alerts = list(_open_alerts_queryset()[:settings.DASHBOARD_ALERT_LIMIT])
+                tourists = list(
+                    TouristProfile.objects.prefetch_related('contacts')
+                    .order_by('-created_at')[:settings.DASHBOARD_TOURIST_LIMIT]
+                )
+                return cursor, alerts, tourists
+
+            cursors, alerts, tourists = zip(*sharding.scatter(shard_data))
+            alerts = sharding.merge_sorted(
+                alerts, key=_alert_order, reverse=True, limit=settings.DASHBOARD_ALERT_LIMIT
+            )
+            tourists = sharding.merge_sorted(
+                tourists, key=_newest_first, reverse=True, limit=settings.DASHBOARD_TOURIST_LIMIT
+            )
+            data = {
+                "summary": dashboard.summary(),
+                "cursor": _changes_cursor(cursors, read_at),
+                "alerts": _alerts_data(alerts),
+                # Older open alerts are paged in from get_sos_alerts
+                "alerts_next": _alerts_cursor(alerts, settings.DASHBOARD_ALERT_LIMIT),
+                "tourists": TouristProfileSerializer(tourists, many=True, context={'request': request}).data
+            }
+            cache.set(dashboard.AUTHORITY_CACHE_KEY, data, settings.DASHBOARD_CACHE_SECONDS)
+
+        response = Response(data, status=status.HTTP_200_OK)
+        patch_cache_control(response, private=True, max_age=settings.DASHBOARD_CACHE_SECONDS)
+        return response
+
+    except Exception as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+@api_view(["GET"])
+def tourist_dashboard(request):
+    """Tourist's own profile and open alerts in one response"""
+    try:
+        user_id = request.query_params.get("user_id")
+        if not user_id:
+            return Response(
+                {"error": "User ID is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            profile = TouristProfile.objects.prefetch_related('contacts').get(user_id=user_id)
+        except TouristProfile.DoesNotExist:
+            return Response(
+                {"error": "Profile not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        alerts = profile.incidents.filter(resolved=False).order_by('-created_at')
+        response = Response(
+            {
+                "profile": TouristProfileSerializer(profile, context={'request': request}).data,
+                "open_alerts": IncidentSerializer(alerts, many=True).data
             },
             status=status.HTTP_200_OK
         )
+        patch_cache_control(response, private=True, max_age=settings.DASHBOARD_CACHE_SECONDS)
+        return response
 
     except Exception as e:
         return Response(
             {"error": str(e)},
             status=status.HTTP_400_BAD_REQUEST
         )
+
+
+# ---------------------------
+# SOS Alert Lifecycle (compare-and-set transitions)
+# ---------------------------
+def _acting_authority(request):
+    user_id = request.data.get("user_id")
+    if not user_id:
+        return None
+    return AuthorityProfile.objects.filter(user_id=user_id).first()
+
+
+def _run_transition(request, queryset, action):
+    """Apply a transition; returns the changed rows or an error Response."""
+    authority = _acting_authority(request)
+    if action == "acknowledge":
+        return actions.acknowledge_incidents(queryset, authority)
+    if action == "resolve":
+        return actions.resolve_incidents(queryset, authority)
+    if action == "assign":
+        assignee_id = request.data.get("assignee_id")
+        try:
+            assignee = AuthorityProfile.objects.get(id=assignee_id)
+        except AuthorityProfile.DoesNotExist:
+            return Response(
+                {"error": "Assignee authority not found"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return actions.assign_incidents(queryset, assignee, authority)
+    return Response(
+        {"error": "Unknown action"},
+        status=status.HTTP_404_NOT_FOUND
+    )
+
+
+@api_view(["POST"])
+def transition_sos_alert(request, alert_id, action):
+    """Acknowledge, assign or resolve one alert if its version still matches"""
+    try:
+        version = request.data.get("version")
+        if version is None:
+            return Response(
+                {"error": "Version is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        changed = _run_transition(
+            request,
+            Incident.objects.filter(id=alert_id, version=int(version)),
+            action
+        )
+        if isinstance(changed, Response):
+            return changed
+
+        alert = Incident.objects.select_related('profile').filter(id=alert_id).first()
+        if alert is None:
+            return Response(
+                {"error": "Alert not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        if not changed:
+            # Stale version or transition no longer applies
+            return Response(
+                {"error": "Alert was changed by someone else", "alert": _alert_data(alert)},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(_alert_data(alert), status=status.HTTP_200_OK)
+
+    except actions.Conflict as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_409_CONFLICT
+        )
+    except Exception as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+@api_view(["POST"])
+def bulk_transition_sos_alerts(request, action):
+    """Acknowledge, assign or resolve many alerts; skips ones that no longer apply"""
+    try:
+        ids = request.data.get("ids") or []
+        if not ids:
+            return Response(
+                {"error": "A list of alert ids is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Each shard's alerts change in their own transaction
+        by_database = {}
+        for pk in ids:
+            by_database.setdefault(sharding.database_for_id(pk), []).append(pk)
+        changed = []
+        for database, shard_ids in by_database.items():
+            with sharding.use_database(database):
+                result = _run_transition(request, Incident.objects.filter(id__in=shard_ids), action)
+            if isinstance(result, Response):
+                return result
+            changed += result
+
+        return Response(
+            {
+                "count": len(changed),
+                "changed": [{"id": row[0], "version": row[4]} for row in changed]
+            },
+            status=status.HTTP_200_OK
+        )
+
+    except actions.Conflict as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_409_CONFLICT
+        )
+    except Exception as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+@api_view(["GET"])
+def get_sos_alert_trail(request, alert_id):
+    """Every SOS ping merged into an alert, oldest first"""
+    try:
+        trail = (
+            IncidentTrailPoint.objects.filter(incident_id=alert_id)
+            .order_by('recorded_at')
+            .values('lat', 'lng', 'recorded_at')
+        )
+        return Response(
+            {
+                "alert_id": alert_id,
+                "trail": list(trail)
+            },
+            status=status.HTTP_200_OK
+        )
+
+    except Exception as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+@api_view(["GET"])
+def get_sos_alert_changes(request):
+    """Alert changes after ?since=<cursor>, for consoles to apply incrementally
+
+    With several shards the cursor holds the last event id seen in each.
+    An event numbered below the cursor can commit after it was read (ids
+    are handed out before commit), so each poll also re-reads the events
+    of the last ALERT_FEED_REREAD_SECONDS before the previous read. Those
+    may have been sent already; consoles skip event ids they have applied.
+    """
+    try:
+        since, read_at = _parse_changes_cursor(request.query_params.get("since"))
+        limit = min(int(request.query_params.get("limit", 500)), 1000)
+        aliases = sharding.databases()
+        now = timezone.now()
+        reread_from = (read_at or now) - timedelta(seconds=settings.ALERT_FEED_REREAD_SECONDS)
+
+        def changes(database):
+            last = since[aliases.index(database)]
+            events = IncidentEvent.objects.select_related('incident__profile').order_by('id')
+            late = list(events.filter(id__lte=last, created_at__gte=reread_from)) if last else []
+            return late, list(events.filter(id__gt=last)[:limit])
+
+        late, new = zip(*sharding.scatter(changes))
+        # Merged in time order; each shard's events stay in id order
+        streams = [[(event.created_at, i, event) for event in events] for i, events in enumerate(new)]
+        merged = sharding.merge_sorted(streams, key=lambda item: item[:2], limit=limit)
+        cursor = list(since)
+        for _, i, event in merged:
+            cursor[i] = event.id
+        events = sorted(itertools.chain.from_iterable(late), key=lambda event: event.created_at)
+        events += [event for _, _, event in merged]
+        return Response(
+            {
+                "cursor": _changes_cursor(cursor, now),
+                "changes": [
+                    {
+                        "event_id": event.id,
+                        "kind": event.kind,
+                        "version": event.version,
+                        "authority_id": event.authority_id,
+                        "at": event.created_at,
+                        "alert_id": event.incident_id,
+                        "alert": _alert_data(event.incident) if event.incident else None
+                    }
+                    for event in events
+                    # Earlier events of a deleted incident are superseded by its 'deleted' one
+                    if event.incident or event.kind == 'deleted'
+                ]
+            },
+            status=status.HTTP_200_OK
+        )
+
+    except Exception as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+# ---------------------------
+# Mobile Delta Sync
+# ---------------------------
+@api_view(["GET"])
+def tourist_sync(request):
+    """Own profile, contacts and incidents, and places in ?bbox=, changed after ?cursor=
+
+    Without a cursor (first sync, or after changing the bbox) everything
+    is sent. Responses are brotli or gzip compressed when accepted.
+    """
+    try:
+        user_id = request.query_params.get("user_id")
+        if not user_id:
+            return Response(
+                {"error": "User ID is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        profile_id = TouristProfile.objects.filter(user_id=user_id).values_list('id', flat=True).first()
+        if profile_id is None:
+            return Response(
+                {"error": "Profile not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        limit = int(request.query_params.get("limit", settings.SYNC_BATCH_SIZE))
+        limit = min(max(limit, 1), settings.SYNC_MAX_BATCH_SIZE)
+        data = sync.sync(
+            profile_id,
+            request.query_params.get("cursor"),
+            _bbox_param(request),
+            limit,
+            request,
+        )
+        return sync.compressed_response(request, data)
+
+    except Exception as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+# ---------------------------
+# Location Tracks
+# ---------------------------
+@api_view(["POST"])
+def upload_location(request):
+    """Store location pings: {"user_id", "points": [{"lat", "lng", "t"}]} or one {"lat", "lng"}"""
+    try:
+        user_id = request.data.get("user_id")
+        if not user_id:
+            return Response(
+                {"error": "User ID is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        profile_id = TouristProfile.objects.filter(user_id=user_id).values_list('id', flat=True).first()
+        if profile_id is None:
+            return Response(
+                {"error": "Profile not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        items = request.data.get("points")
+        if items is None:
+            items = [request.data]
+        points = tracks.parse_points(items)
+        tracks.record((profile_id, at, lat, lng) for at, lat, lng in points)
+        return Response({"stored": len(points)}, status=status.HTTP_201_CREATED)
+
+    except Exception as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+def _datetime_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"Invalid datetime for '{name}', expected ISO 8601")
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+def _track_response(request, points, **extra):
+    """Points as [t, lat, lng], thinned for ?zoom= and ?interval= (seconds)"""
+    zoom = request.query_params.get("zoom")
+    zoom = min(max(int(zoom), 0), 22) if zoom else None
+    interval = int(request.query_params.get("interval", 0))
+    thinned = tracks.thin(points, zoom, interval)
+    return sync.compressed_response(request, {
+        **extra,
+        "raw_count": len(points),
+        "count": len(thinned),
+        "points": [list(point) for point in thinned],
+    })
+
+
+@api_view(["GET"])
+def tourist_track(request, tourist_id):
+    """A tourist's location history between ?from= and ?to= (default the last day)"""
+    try:
+        end = _datetime_param(request.query_params, "to") or timezone.now()
+        start = _datetime_param(request.query_params, "from") or end - timedelta(days=1)
+        if end < start:
+            raise ValueError("'to' must not be before 'from'")
+        if end - start > timedelta(hours=settings.TRACK_MAX_WINDOW_HOURS):
+            raise ValueError(f"At most {settings.TRACK_MAX_WINDOW_HOURS} hours per request")
+        return _track_response(
+            request,
+            tracks.track(tourist_id, start, end),
+            tourist_id=tourist_id,
+            start=start,
+            end=end,
+        )
+
+    except Exception as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+@api_view(["GET"])
+def get_sos_alert_track(request, alert_id):
+    """The tourist's movements around an alert, ?before= and ?after= minutes"""
+    try:
+        try:
+            alert = Incident.objects.only('profile_id', 'lat', 'lng', 'created_at', 'last_seen_at').get(id=alert_id)
+        except Incident.DoesNotExist:
+            return Response(
+                {"error": "Alert not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        before = request.query_params.get("before")
+        after = request.query_params.get("after")
+        start, end = tracks.incident_window(
+            alert,
+            timedelta(minutes=int(before)) if before else None,
+            timedelta(minutes=int(after)) if after else None,
+        )
+        return _track_response(
+            request,
+            tracks.track(alert.profile_id, start, end),
+            alert_id=alert_id,
+            lat=alert.lat,
+            lng=alert.lng,
+            start=start,
+            end=end,
+        )
+
+    except Exception as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+# ---------------------------
+# Tourist ID Credentials (signed, verified offline)
+# ---------------------------
+@api_view(["GET"])
+def tourist_id_card(request):
+    """The tourist's signed ID credential and QR payload, issued on first use"""
+    try:
+        user_id = request.query_params.get("user_id")
+        if not user_id:
+            return Response(
+                {"error": "User ID is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            profile = TouristProfile.objects.get(user_id=user_id)
+        except TouristProfile.DoesNotExist:
+            return Response(
+                {"error": "Profile not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        credential = tourist_ids.current_credential(profile)
+        photo = profile.profile_photo.url if profile.profile_photo else None
+        return Response(
+            {
+                "profile": {
+                    "id": profile.id,
+                    "name": profile.name,
+                    "email": profile.email,
+                    "phone": profile.phone,
+                    "nationality": profile.nationality,
+                    "profile_photo": request.build_absolute_uri(photo) if photo else None,
+                },
+                "credential": {
+                    "serial": credential.id,
+                    "issued_at": credential.issued_at,
+                    "expires_at": credential.expires_at,
+                    # Encode as-is into a QR code (alphanumeric mode)
+                    "qr_payload": credential.token
+                }
+            },
+            status=status.HTTP_200_OK
+        )
+
+    except Exception as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+@api_view(["POST"])
+@authentication_classes([])  # no session lookup: a clean scan makes no DB query
+def verify_tourist_id(request):
+    """Verify a scanned Tourist ID: signature, expiry and revocation"""
+    try:
+        token = request.data.get("token", "")
+        try:
+            credential = tourist_ids.verify(token)
+        except InvalidCredential as e:
+            return Response(
+                {"valid": False, "reason": e.reason, "error": str(e)},
+                status=status.HTTP_200_OK
+            )
+        return Response(
+            {"valid": True, "credential": credential.as_dict()},
+            status=status.HTTP_200_OK
+        )
+
+    except Exception as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+@api_view(["GET"])
+def tourist_id_keys(request):
+    """Public keys checkpoints use to verify Tourist IDs offline"""
+    return Response(
+        {"algorithm": settings.TOURIST_ID_ALGORITHM, "keys": tourist_ids.public_keys()},
+        status=status.HTTP_200_OK
+    )
+
+
+@require_GET
+def tourist_id_revocations(request):
+    """The current revocation filter (binary), for checkpoints to cache"""
+    tourist_ids.get_revocations()  # builds the file if there is none yet
+    path = settings.TOURIST_ID_REVOCATION_PATH
+    st = os.stat(path)
+    etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = FileResponse(open(path, "rb"), content_type="application/octet-stream")
+    response["ETag"] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
@@ -0,0 +1,46 @@
+import gc
+import time
+
+from django.db import connections
+from django.urls import get_resolver
+
+from . import clustering, geocoding, poi_store
+
+
+# Read-mostly state that is worth building once in a preforking master so
+# workers inherit it copy-on-write instead of each paying for it on their
+# first requests.
+def _urls():
+    get_resolver().url_patterns
+
+
+def _cluster_indexes():
+    for layer in clustering.LAYERS:
+        clustering.get_index(layer)
+
+
+WARMERS = (
+    ("urls", _urls),
+    ("poi_store", poi_store.get_store),
+    ("gazetteer", geocoding.get_gazetteer),
+    ("cluster_indexes", _cluster_indexes),
+)
+
+
+def warm():
+    """Build the shared caches; returns {name: seconds} for each step.
+
+    Database connections opened along the way are closed so no socket or
+    SQLite handle is shared across fork. Surviving objects are moved to
+    the permanent GC generation so collections in the workers do not
+    touch (and thereby copy) the inherited pages.
+    """
+    timings = {}
+    for name, warmer in WARMERS:
+        start = time.perf_counter()
+        warmer()
+        timings[name] = time.perf_counter() - start
+    connections.close_all()
+    gc.collect()
+    gc.freeze()
+    return timings
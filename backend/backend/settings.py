@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -5,7 +6,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = "django-insecure-CHANGE_THIS"
 
-DEBUG = True
+DEBUG = os.environ.get("DJANGO_DEBUG", "1") == "1"
 
 ALLOWED_HOSTS = ["*"]
 
@@ -35,6 +36,9 @@ INSTALLED_APPS = [
 # -----------------------------
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # Before anything that queries the database
+    "api.db_routing.ReadReplicaMiddleware",
+    "api.sharding.ShardMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
 
     # CORS
@@ -97,6 +101,40 @@ DATABASES = {
     }
 }
 
+# Read replicas (see api.db_routing). List their aliases in
+# DATABASE_REPLICAS; DJANGO_DB_REPLICAS takes comma-separated SQLite
+# paths for local setups, e.g. copies refreshed by
+# `manage.py refresh_sqlite_replicas`. Postgres standbys are added to
+# DATABASES the same way with their own ENGINE/HOST settings.
+DATABASE_REPLICAS = []
+for _i, _path in enumerate(p for p in os.environ.get("DJANGO_DB_REPLICAS", "").split(",") if p):
+    DATABASES[f"replica{_i + 1}"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": _path,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica{_i + 1}")
+# Shards first: it defers to the replica router for "default"
+DATABASE_ROUTERS = ["api.sharding.ShardRouter", "api.db_routing.ReplicaRouter"]
+# How long a client that just wrote keeps reading from the primary;
+# keep it above the replicas' usual lag
+DATABASE_REPLICA_PIN_SECONDS = 5
+
+# Regional shards (see api.sharding): region -> database alias and the
+# (south, west, north, east) box it covers. Locations outside every box
+# go to SHARD_DEFAULT_REGION. With a single region nothing is sharded;
+# backend.settings_sharded is a two-region local setup.
+SHARD_REGIONS = {
+    "national": {"database": "default", "bbox": None},
+}
+SHARD_DEFAULT_REGION = "national"
+# Ids per database; run `manage.py init_shards` after adding one. Tourist
+# ID credentials carry serials and profile ids as 32-bit integers, so
+# SHARD_ID_SPAN times the number of databases must stay below 2**32.
+SHARD_ID_SPAN = 2 ** 28
+# Parallel per-shard queries behind authority-wide views
+SHARD_SCATTER_THREADS = 8
+
 
 # -----------------------------
 # PASSWORD VALIDATION
@@ -147,6 +185,12 @@ STATICFILES_DIRS = [
     BASE_DIR / "static",  # Built frontend files
 ]
 
+# collectstatic writes hashed, pre-compressed copies served by api.assets
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "api.assets.CompressedManifestStaticFilesStorage"},
+}
+
 
 # -----------------------------
 # MEDIA (Optional if you store images)
@@ -154,6 +198,180 @@ STATICFILES_DIRS = [
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# How api.media hands over file bytes: "django" (FileResponse / sendfile,
+# with Range support), "x-accel-redirect" (nginx internal location at
+# MEDIA_ACCEL_REDIRECT_PREFIX) or "x-sendfile" (Apache mod_xsendfile)
+MEDIA_SERVE_BACKEND = os.environ.get("DJANGO_MEDIA_SERVE_BACKEND", "django")
+MEDIA_ACCEL_REDIRECT_PREFIX = "/protected-media/"
+# Browsers revalidate with ETag / Last-Modified after this
+MEDIA_CACHE_SECONDS = 3600
+
+
+# -----------------------------
+# MAP CLUSTERING
+# -----------------------------
+# Seconds a worker keeps its in-memory cluster index before rebuilding;
+# local writes invalidate it immediately, this bounds staleness from
+# writes made by other worker processes.
+MAP_CLUSTER_MAX_AGE = 60
+
+
+# -----------------------------
+# DASHBOARD
+# -----------------------------
+# Seconds the composite authority dashboard response is cached
+DASHBOARD_CACHE_SECONDS = 5
+DASHBOARD_ALERT_LIMIT = 100
+DASHBOARD_TOURIST_LIMIT = 50
+# The alert change feed re-reads events this far behind each poll, for
+# transactions that commit after a higher event id was already served
+ALERT_FEED_REREAD_SECONDS = 30
+
+
+# -----------------------------
+# SOS INGEST QUEUE
+# -----------------------------
+# SOS alerts are appended to a durable local log and drained into the
+# database by a background writer (or `manage.py drain_sos_queue`).
+SOS_QUEUE_DIR = BASE_DIR / "var" / "sos_queue"
+SOS_QUEUE_DRAIN_IN_PROCESS = True
+SOS_QUEUE_DRAIN_INTERVAL = 0.1  # seconds
+SOS_QUEUE_BATCH_SIZE = 500
+SOS_QUEUE_ROTATE_BYTES = 16 * 1024 * 1024
+# Repeat SOS from the same tourist within this window merge into one incident
+SOS_COALESCE_SECONDS = 300
+SOS_COALESCE_METERS = 200
+
+
+# -----------------------------
+# REVERSE GEOCODING
+# -----------------------------
+# Built from a GeoNames dump with `manage.py build_gazetteer`
+GAZETTEER_PATH = BASE_DIR / "var" / "gazetteer.bin"
+GAZETTEER_RECHECK_SECONDS = 1  # how often workers look for a rebuilt file
+GEOCODE_CACHE_SIZE = 100000
+GEOCODE_CACHE_PRECISION = 3  # decimal places of the cache key, about 100 m
+
+
+# -----------------------------
+# PLACE (POI) STORE
+# -----------------------------
+# Memory-mapped copy of the Place table shared by all workers
+POI_STORE_PATH = BASE_DIR / "var" / "places.bin"
+POI_STORE_RECHECK_SECONDS = 1  # how often workers look for a rebuilt file
+POI_STORE_REBUILD_DELAY = 2  # seconds a Place change waits, so bursts rebuild once
+
+
+# -----------------------------
+# STARTUP BUDGET
+# -----------------------------
+# Ceiling for a fresh API-only process to serve its first request,
+# checked by `manage.py bench_startup`
+STARTUP_BUDGET_SECONDS = 1.0
+
+
+# -----------------------------
+# SOS NOTIFICATIONS
+# -----------------------------
+# Each channel has its own transport, sender threads (concurrency) and
+# connection pool. The defaults keep messages in api.notifications.outbox;
+# in production point them at real services, e.g.
+#   "email": {"BACKEND": "api.notifications.EmailTransport", "OPTIONS": {"concurrency": 4}}
+#   "sms": {"BACKEND": "api.notifications.SmsTransport",
+#           "OPTIONS": {"url": "https://sms.example/send", "token": "...", "sender": "SAFETY"}}
+#   "webhook": {"BACKEND": "api.notifications.WebhookTransport", "OPTIONS": {"concurrency": 8}}
+NOTIFY_TRANSPORTS = {
+    "email": {"BACKEND": "api.notifications.LocalTransport", "OPTIONS": {"concurrency": 4}},
+    "sms": {"BACKEND": "api.notifications.LocalTransport", "OPTIONS": {"concurrency": 8}},
+    "webhook": {"BACKEND": "api.notifications.LocalTransport", "OPTIONS": {"concurrency": 8}},
+}
+# Verified authorities of these agency types are emailed on every SOS
+NOTIFY_SOS_AGENCY_TYPES = ["police", "emergency"]
+# Control-room endpoints that receive every SOS as JSON
+NOTIFY_SOS_WEBHOOKS = []
+NOTIFY_BATCH_SIZE = 50  # notifications per transport call
+NOTIFY_MAX_ATTEMPTS = 5
+NOTIFY_RETRY_BASE_SECONDS = 2  # doubled after every failed attempt
+NOTIFY_RETRY_MAX_SECONDS = 300
+# Outbox rows a deliverer has claimed are sent again after this long
+# without a result (the process died, or its senders are that far behind)
+NOTIFY_CLAIM_SECONDS = 120
+NOTIFY_POLL_SECONDS = 1.0  # how often the SOS queue writer looks for due outbox rows
+
+
+# -----------------------------
+# TOURIST ID CREDENTIALS
+# -----------------------------
+# Signed IDs that checkpoints verify offline (api.credentials). HS256
+# uses a shared secret, derived from SECRET_KEY when left empty. Ed25519
+# needs the 'cryptography' package and a base64 raw private key (see
+# `manage.py generate_tourist_id_key`); checkpoints then verify with the
+# public key from /api/credentials/keys/.
+TOURIST_ID_ALGORITHM = "HS256"
+TOURIST_ID_KEY_ID = 1
+TOURIST_ID_HMAC_SECRET = ""
+TOURIST_ID_ED25519_PRIVATE_KEY = ""
+# Earlier keys still accepted after a rotation:
+# {key id: ("Ed25519", "<base64 public key>") or ("HS256", "<secret>")}
+TOURIST_ID_RETIRED_KEYS = {}
+TOURIST_ID_VALID_DAYS = 30  # or to the end of the stay, if sooner
+TOURIST_ID_RENEW_DAYS = 1  # reissue when the current one expires sooner than this
+TOURIST_ID_REVOCATION_PATH = BASE_DIR / "var" / "revoked_ids.bloom"
+TOURIST_ID_REVOCATION_FALSE_POSITIVE_RATE = 0.001
+TOURIST_ID_REVOCATION_RECHECK_SECONDS = 1
+
+
+# -----------------------------
+# MOBILE DELTA SYNC
+# -----------------------------
+# /api/tourist/sync/ returns rows changed after the client's cursor.
+# Deletions are replayed for SYNC_TOMBSTONE_DAYS (`manage.py
+# prune_sync_log` drops older tombstones); a client away for longer
+# gets a full resync.
+SYNC_BATCH_SIZE = 500  # changes per response (clients may ask for fewer)
+SYNC_MAX_BATCH_SIZE = 2000
+SYNC_TOMBSTONE_DAYS = 30
+SYNC_REREAD_SECONDS = 30  # how far behind a cursor each sync looks for late commits
+SYNC_BROTLI_QUALITY = 5  # per request, so far below the static-file level
+
+
+# -----------------------------
+# LOCATION TRACKS
+# -----------------------------
+# Pings are buffered as rows and packed into compressed chunks by
+# `manage.py compact_tracks` (run it every few minutes from cron).
+TRACK_BUFFER_SECONDS = 300  # pings younger than this stay in the buffer
+TRACK_CHUNK_POINTS = 720
+TRACK_CHUNK_SECONDS = 3600
+TRACK_MAX_UPLOAD_POINTS = 1000
+TRACK_MAX_CLOCK_SKEW_SECONDS = 300
+TRACK_INCIDENT_WINDOW_MINUTES = 30  # trail shown before and after an incident
+TRACK_MAX_WINDOW_HOURS = 24
+TRACK_SIMPLIFY_PIXELS = 0.5  # Douglas-Peucker tolerance at the requested zoom
+
+
+# -----------------------------
+# INCIDENT ARCHIVE
+# -----------------------------
+# `manage.py archive_incidents` (run daily from cron) moves resolved
+# incidents older than INCIDENT_ARCHIVE_AFTER_DAYS out of the Incident
+# table into gzipped NDJSON files under INCIDENT_ARCHIVE_DIR, one
+# directory per shard and month. Incident lists and exports read them
+# back when the requested dates reach that far.
+INCIDENT_ARCHIVE_AFTER_DAYS = 90
+INCIDENT_LIST_PAGE_SIZE = 100
+INCIDENT_ARCHIVE_BATCH_SIZE = 5000
+INCIDENT_ARCHIVE_DIR = BASE_DIR / "var" / "incident_archive"
+
+
+# -----------------------------
+# ADMIN
+# -----------------------------
+# Unfiltered changelists of tables with more rows than this show the
+# planner's row estimate (pg_class.reltuples; sqlite_stat1 after ANALYZE)
+# instead of running COUNT(*).
+ADMIN_EXACT_COUNT_LIMIT = 50000
+
 
 # -----------------------------
 # DEFAULT PRIMARY KEY
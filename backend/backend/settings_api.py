@@ -0,0 +1,55 @@
+"""API-only settings profile.
+
+For workers and scripts that only serve or touch the JSON API: the admin,
+sessions, messages, templates and static files apps are left out, so
+neither they nor their middleware are imported at startup. Run with
+DJANGO_SETTINGS_MODULE=backend.settings_api. Migrations still need the
+full profile (backend.settings).
+"""
+from .settings import *  # noqa: F401,F403
+
+
+# -----------------------------
+# INSTALLED APPS
+# -----------------------------
+INSTALLED_APPS = [
+    app for app in INSTALLED_APPS  # noqa: F405
+    if app not in (
+        "django.contrib.admin",
+        "django.contrib.sessions",
+        "django.contrib.messages",
+        "django.contrib.staticfiles",
+    )
+]
+
+
+# -----------------------------
+# MIDDLEWARE
+# -----------------------------
+# AuthenticationMiddleware depends on sessions; the API authenticates
+# nothing through Django's session layer.
+MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware",
+    "api.db_routing.ReadReplicaMiddleware",
+    "api.sharding.ShardMiddleware",
+    "corsheaders.middleware.CorsMiddleware",
+    "django.middleware.common.CommonMiddleware",
+]
+
+
+# -----------------------------
+# URL configuration / TEMPLATES
+# -----------------------------
+ROOT_URLCONF = "backend.urls_api"
+TEMPLATES = []
+
+
+# -----------------------------
+# REST FRAMEWORK
+# -----------------------------
+# JSON only: the browsable API needs templates and sessions
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,  # noqa: F405
+    "DEFAULT_AUTHENTICATION_CLASSES": [],
+    "DEFAULT_RENDERER_CLASSES": ["rest_framework.renderers.JSONRenderer"],
+}
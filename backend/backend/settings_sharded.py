@@ -0,0 +1,30 @@
+"""Two-region sharded settings profile for local setups.
+
+Tourists registering in southern India go to var/shard_south.sqlite3,
+northern ones to var/shard_north.sqlite3; everyone else and all national
+data (authorities, places, photo blobs) stay in db.sqlite3. Run with
+DJANGO_SETTINGS_MODULE=backend.settings_sharded, after
+`manage.py init_shards` has migrated the shard files and set their id
+ranges. See api.sharding.
+"""
+from .settings import *  # noqa: F401,F403
+
+
+# -----------------------------
+# DATABASE
+# -----------------------------
+DATABASES.update({  # noqa: F405
+    "south": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "var" / "shard_south.sqlite3",  # noqa: F405
+    },
+    "north": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "var" / "shard_north.sqlite3",  # noqa: F405
+    },
+})
+SHARD_REGIONS = {
+    "national": {"database": "default", "bbox": None},
+    "south": {"database": "south", "bbox": [6.0, 68.0, 20.0, 98.0]},
+    "north": {"database": "north", "bbox": [20.0, 68.0, 37.5, 98.0]},
+}
@@ -5,6 +5,8 @@ from django.conf.urls.static import static
 from django.views.generic import TemplateView
 from django.contrib.staticfiles.views import serve
 from django.views.static import serve as static_serve
+from api.assets import serve_asset
+from api.media import serve_media
 from api.views import index
 
 urlpatterns = [
@@ -18,8 +20,16 @@ if settings.DEBUG:
     urlpatterns += [
         re_path(r'^static/(?P<path>.*)$', serve),
     ]
-    # Serve media files
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+else:
+    # Hashed, pre-compressed files written by collectstatic
+    urlpatterns += [
+        re_path(r'^static/(?P<path>.*)$', serve_asset),
+    ]
+
+# Uploaded media with ETag, Last-Modified and Range support
+urlpatterns += [
+    re_path(r'^media/(?P<path>.*)$', serve_media),
+]
 
 # Serve React app for all other routes (must be last)
 urlpatterns += [
@@ -0,0 +1,8 @@
+from django.urls import path, include, re_path
+from api.media import serve_media
+
+# URLconf for the API-only settings profile (backend.settings_api)
+urlpatterns = [
+    path('api/', include('api.urls')),
+    re_path(r'^media/(?P<path>.*)$', serve_media),
+]
@@ -0,0 +1,52 @@
+# Production server settings: `gunicorn -c gunicorn.conf.py backend.wsgi`
+#
+# The app is imported once in the master (preload_app) and the spatial
+# indexes are warmed there, so every forked worker shares those pages
+# copy-on-write. Values can be overridden with GUNICORN_* variables.
+import multiprocessing
+import os
+
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+timeout = 30
+keepalive = 5
+# Recycle workers now and then to bound memory growth
+max_requests = 10000
+max_requests_jitter = 1000
+accesslog = "-"
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from api.warmup import warm
+
+    timings = warm()
+    server.log.info(
+        "Warmed shared caches: %s",
+        ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items()),
+    )
+
+
+def worker_exit(server, worker):
+    # Let in-flight SOS notifications finish; whatever does not is sent
+    # again from the outbox once its claim expires
+    from api import notifications
+
+    notifications.flush(timeout=10)
+
+
+def post_worker_init(worker):
+    from api import sos_queue
+
+    if not preload_app:
+        from api.warmup import warm
+
+        warm()
+    # Drain SOS records a crashed or restarted worker left in the log,
+    # rather than waiting for the next SOS to wake the writer
+    sos_queue.start_writer()
@@ -0,0 +1,48 @@
+#!/bin/bash
+
+# Smart Tourist Safety Portal - Production Server Startup Script
+# Runs Django under gunicorn with several worker processes (see gunicorn.conf.py)
+
+echo "=========================================="
+echo "Smart Tourist Safety Portal - Backend"
+echo "Production server (gunicorn)"
+echo "=========================================="
+echo ""
+
+# Production mode: hashed static assets and the cached index page
+export DJANGO_DEBUG="${DJANGO_DEBUG:-0}"
+
+# Check if virtual environment exists
+if [ ! -d ".venv" ]; then
+    echo "Creating virtual environment..."
+    python3 -m venv .venv
+fi
+
+source .venv/bin/activate
+
+# Check if requirements are installed
+if ! python -c "import django, gunicorn" 2>/dev/null; then
+    echo "Installing requirements..."
+    pip install -r requirements.txt
+fi
+
+# Run migrations (always with the full settings profile)
+echo "Running database migrations..."
+DJANGO_SETTINGS_MODULE=backend.settings python manage.py migrate --noinput
+
+# Precompile bytecode so workers do not compile modules on startup
+echo "Compiling Python modules..."
+python -m compileall -q .
+
+# Collect static files
+echo "Collecting static files..."
+DJANGO_SETTINGS_MODULE=backend.settings python manage.py collectstatic --noinput
+
+echo ""
+echo "=========================================="
+echo "Starting gunicorn on ${GUNICORN_BIND:-0.0.0.0:8000}"
+echo "Workers: ${GUNICORN_WORKERS:-2 x CPUs + 1}, threads per worker: ${GUNICORN_THREADS:-4}"
+echo "=========================================="
+echo ""
+
+exec gunicorn -c gunicorn.conf.py backend.wsgi
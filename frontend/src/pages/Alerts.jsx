@@ -6,12 +6,15 @@ import api from '../api'
 export default function Alerts() {
     const [incidents, setIncidents] = React.useState([])
     const [loading, setLoading] = React.useState(true)
+    const [next, setNext] = React.useState(null)
+    const [loadingMore, setLoadingMore] = React.useState(false)
 
     React.useEffect(() => {
         const fetch = async () => {
             try {
                 const res = await api.get('/incidents/')
-                setIncidents(res.data)
+                setIncidents(res.data.results)
+                setNext(res.data.next)
             } catch (err) {
                 console.error(err)
             } finally {
@@ -21,6 +24,19 @@ export default function Alerts() {
         fetch()
     }, [])
 
+    const loadMore = async () => {
+        setLoadingMore(true)
+        try {
+            const res = await api.get(`/incidents/?after=${next}`)
+            setIncidents(prev => [...prev, ...res.data.results])
+            setNext(res.data.next)
+        } catch (err) {
+            console.error(err)
+        } finally {
+            setLoadingMore(false)
+        }
+    }
+
     if (loading) {
         return (
             <div className="flex items-center justify-center min-h-screen">
@@ -83,6 +99,17 @@ export default function Alerts() {
                             </motion.div>
                         ))
                     )}
+                    {next && (
+                        <div className="text-center">
+                            <button
+                                onClick={loadMore}
+                                disabled={loadingMore}
+                                className="px-6 py-3 bg-blue-600 text-white rounded-lg font-semibold hover:bg-blue-700 transition-colors shadow-md disabled:opacity-50"
+                            >
+                                {loadingMore ? 'Loading...' : 'Load more'}
+                            </button>
+                        </div>
+                    )}
                 </div>
             </div>
         </div>
@@ -154,7 +154,13 @@ export default function Dashboard() {
     const [center, setCenter] = React.useState([12.9716, 77.5946])
     const [touristProfile, setTouristProfile] = React.useState(null)
     const [allTourists, setAllTourists] = React.useState([])
+    const [touristCount, setTouristCount] = React.useState(0)
     const [sosAlerts, setSosAlerts] = React.useState([])
+    const sosAlertsRef = React.useRef(sosAlerts) // Read by the change-feed poller
+    sosAlertsRef.current = sosAlerts
+    const [openAlertCount, setOpenAlertCount] = React.useState(0)
+    const [alertsNext, setAlertsNext] = React.useState(null)
+    const [alertsLoading, setAlertsLoading] = React.useState(false)
     const [loading, setLoading] = React.useState(true)
     const [placesLoading, setPlacesLoading] = React.useState(false)
     const [placesError, setPlacesError] = React.useState(null)
@@ -188,21 +194,25 @@ export default function Dashboard() {
 
     // Fetch user-specific data
     React.useEffect(() => {
+        let cursor = null // Alert change-feed position (authority only)
+        const applied = new Set() // Event ids applied; the feed resends recent ones
+
         const fetchUserData = async () => {
             try {
                 // Fetch user-specific data
                 if (userType === 'tourist' && userId) {
                     // Fetch tourist's own profile
-                    const profileRes = await api.get(`/tourist/profile/?user_id=${userId}`)
-                    setTouristProfile(profileRes.data)
+                    const dashboardRes = await api.get(`/tourist/dashboard/?user_id=${userId}`)
+                    setTouristProfile(dashboardRes.data.profile)
                 } else if (userType === 'authority' && userId) {
-                    // Fetch all tourists for authority dashboard
-                    const touristsRes = await api.get('/authority/tourists/')
-                    setAllTourists(touristsRes.data.tourists || [])
-                    
-                    // Fetch SOS alerts
-                    const alertsRes = await api.get('/authority/sos-alerts/')
-                    setSosAlerts(alertsRes.data.alerts || [])
+                    // Summary, recent tourists and SOS alerts in one request
+                    const dashboardRes = await api.get('/authority/dashboard/')
+                    setAllTourists(dashboardRes.data.tourists || [])
+                    setTouristCount(dashboardRes.data.summary?.tourists || 0)
+                    setSosAlerts(dashboardRes.data.alerts || [])
+                    setOpenAlertCount(dashboardRes.data.summary?.open_alerts || 0)
+                    setAlertsNext(dashboardRes.data.alerts_next || null)
+                    cursor = dashboardRes.data.cursor || 0
                 }
             } catch (err) {
                 console.error('Error fetching user data:', err)
@@ -210,13 +220,46 @@ export default function Dashboard() {
                 setLoading(false)
             }
         }
+
+        // Apply alert changes since the last cursor instead of re-fetching the list
+        const applyChanges = (changes) => {
+            changes = changes.filter(({ event_id }) => !applied.has(event_id))
+            changes.forEach(({ event_id }) => applied.add(event_id))
+            for (const eventId of applied) {
+                if (applied.size <= 5000) break
+                applied.delete(eventId)
+            }
+            // Counts alerts not loaded yet too; a deleted one only if it was shown open
+            const shown = new Set(sosAlertsRef.current.map(alert => alert.id))
+            setOpenAlertCount(prev => changes.reduce(
+                (count, { kind, alert_id }) => count + (
+                    kind === 'created' ? 1 : kind === 'resolved' || (kind === 'deleted' && shown.has(alert_id)) ? -1 : 0
+                ),
+                prev
+            ))
+            setSosAlerts(prev => {
+                const alerts = new Map(prev.map(alert => [alert.id, alert]))
+                changes.forEach(({ alert_id, alert }) => {
+                    if (!alert || alert.resolved) {
+                        alerts.delete(alert_id)
+                    } else {
+                        alerts.set(alert.id, alert)
+                    }
+                })
+                return [...alerts.values()].sort((a, b) => new Date(b.created_at) - new Date(a.created_at))
+            })
+        }
         fetchUserData()
 
-        // Poll for new SOS alerts (authority only)
+        // Poll for SOS alert changes (authority only)
         if (userType === 'authority') {
             const interval = setInterval(() => {
-                api.get('/authority/sos-alerts/')
-                    .then(res => setSosAlerts(res.data.alerts || []))
+                if (cursor === null) return
+                api.get(`/authority/sos-alerts/changes/?since=${cursor}`)
+                    .then(res => {
+                        cursor = res.data.cursor
+                        if (res.data.changes.length > 0) applyChanges(res.data.changes)
+                    })
                     .catch(err => console.error('Error fetching alerts:', err))
             }, 5000) // Poll every 5 seconds
 
@@ -224,6 +267,24 @@ export default function Dashboard() {
         }
     }, [userId, userType])
 
+    // Page in open alerts older than the ones the dashboard returned
+    const loadMoreAlerts = async () => {
+        if (!alertsNext) return
+        setAlertsLoading(true)
+        try {
+            const res = await api.get(`/authority/sos-alerts/?limit=100&before=${encodeURIComponent(alertsNext)}`)
+            setSosAlerts(prev => {
+                const seen = new Set(prev.map(alert => alert.id))
+                return [...prev, ...res.data.alerts.filter(alert => !seen.has(alert.id))]
+            })
+            setAlertsNext(res.data.next)
+        } catch (err) {
+            console.error('Error loading more alerts:', err)
+        } finally {
+            setAlertsLoading(false)
+        }
+    }
+
     // Fetch nearby places from Overpass API when location changes
     React.useEffect(() => {
         const fetchPlaces = async () => {
@@ -283,13 +344,15 @@ export default function Dashboard() {
         }
 
         setSosLoading(true)
+        // Same key for retries of this alert so the server stores it once
+        const idempotencyKey = window.crypto?.randomUUID?.() || `${Date.now()}-${Math.random().toString(36).slice(2)}`
         try {
             await api.post('/tourist/sos/', {
                 user_id: userId,
                 lat: liveLocation[0],
                 lng: liveLocation[1],
                 description: 'Emergency SOS Alert'
-            })
+            }, { headers: { 'Idempotency-Key': idempotencyKey } })
             alert('SOS Alert sent! Authorities have been notified.')
         } catch (err) {
             console.error('SOS error:', err)
@@ -329,7 +392,7 @@ export default function Dashboard() {
                     </div>
 
                     {/* SOS Alerts Section */}
-                    {sosAlerts.length > 0 && (
+                    {(sosAlerts.length > 0 || openAlertCount > 0) && (
                         <motion.div
                             initial={{ opacity: 0, scale: 0.95 }}
                             animate={{ opacity: 1, scale: 1 }}
@@ -339,8 +402,13 @@ export default function Dashboard() {
                                 <div className="flex items-center justify-between mb-3">
                                     <h3 className="text-2xl font-bold text-red-700 flex items-center gap-2">
                                         <span className="animate-pulse">🚨</span>
-                                        Active SOS Alerts ({sosAlerts.length})
+                                        Active SOS Alerts ({Math.max(openAlertCount, sosAlerts.length)})
                                     </h3>
+                                    {sosAlerts.length < openAlertCount && (
+                                        <span className="text-sm text-red-700">
+                                            Showing newest {sosAlerts.length}
+                                        </span>
+                                    )}
                                 </div>
                                 <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-4">
                                     {sosAlerts.map((alert) => (
@@ -371,6 +439,17 @@ export default function Dashboard() {
                                         </motion.div>
                                     ))}
                                 </div>
+                                {alertsNext && (
+                                    <div className="mt-4 text-center">
+                                        <button
+                                            onClick={loadMoreAlerts}
+                                            disabled={alertsLoading}
+                                            className="px-4 py-2 bg-red-600 text-white rounded-lg hover:bg-red-700 disabled:opacity-50"
+                                        >
+                                            {alertsLoading ? 'Loading...' : 'Load older alerts'}
+                                        </button>
+                                    </div>
+                                )}
                             </div>
                         </motion.div>
                     )}
@@ -416,10 +495,10 @@ export default function Dashboard() {
                         </div>
                     </Card>
 
-                    {/* All Tourists List */}
+                    {/* Recently registered tourists */}
                     <div className="mt-6">
                         <h3 className="text-2xl font-semibold mb-4 text-gray-800">
-                            All Registered Tourists ({allTourists.length})
+                            Recent Tourists ({allTourists.length} of {touristCount} registered)
                         </h3>
                         <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-4">
                             {allTourists.map((tourist, index) => (
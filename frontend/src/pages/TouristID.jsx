@@ -5,13 +5,17 @@ import api from '../api'
 
 export default function TouristID() {
     const [profile, setProfile] = React.useState(null)
+    const [credential, setCredential] = React.useState(null)
     const [loading, setLoading] = React.useState(true)
 
     React.useEffect(() => {
         const fetch = async () => {
             try {
-                const res = await api.get('/profiles/')
-                if (res.data.length) setProfile(res.data[0])
+                // Only this tourist's profile and signed ID, not the whole profile list
+                const userId = localStorage.getItem('userId')
+                const res = await api.get(`/tourist/id-card/?user_id=${userId}`)
+                setProfile(res.data.profile)
+                setCredential(res.data.credential)
             } catch (err) {
                 console.error(err)
             } finally {
@@ -42,7 +46,7 @@ export default function TouristID() {
                 </motion.div>
 
                 <Card className="shadow-xl">
-                    {profile ? (
+                    {profile && credential ? (
                         <div className="space-y-6">
                             <div className="flex items-center gap-6">
                                 {profile.profile_photo && (
@@ -63,11 +67,17 @@ export default function TouristID() {
                             <div className="pt-6 border-t border-gray-200">
                                 <div className="bg-gradient-to-r from-blue-50 to-indigo-50 p-4 rounded-lg">
                                     <p className="text-sm font-semibold text-gray-700 mb-2">
-                                        Blockchain ID:
+                                        Tourist ID #{credential.serial}
+                                        <span className="font-normal text-gray-500">
+                                            {' '}valid until {new Date(credential.expires_at).toLocaleDateString()}
+                                        </span>
                                     </p>
-                                    <code className="bg-white px-4 py-2 rounded-lg text-blue-600 font-mono text-sm border border-blue-200">
-                                        {profile.blockchain_id || 'Not set'}
+                                    <code className="block bg-white px-4 py-2 rounded-lg text-blue-600 font-mono text-xs break-all border border-blue-200">
+                                        {credential.qr_payload}
                                     </code>
+                                    <p className="text-xs text-gray-500 mt-2">
+                                        Signed credential: checkpoints scan or enter this code to verify you.
+                                    </p>
                                 </div>
                             </div>
                         </div>